@@ -0,0 +1,82 @@
+import argparse
+import random
+import time
+from typing import Callable, Dict, List, Sequence, Tuple
+
+from src.ext_services.jsql_parser import JSQLParser
+from src.metrics.partial_match_eval.utils import get_item_index_in_list, count_matches
+
+
+def _count_matched_items_by_deleting(items: Sequence, search_items: Sequence) -> int:
+    # how calculate_score used to match items: a linear lookup and a delete per search item
+    remaining_items = list(items)
+    matched = 0
+    for search_item in search_items:
+        item_index = get_item_index_in_list(remaining_items, search_item)
+        if item_index > -1:
+            del remaining_items[item_index]
+            matched += 1
+    return matched
+
+
+def _create_sql(size: int, rnd: random.Random) -> str:
+    # a long select list, and a long IN list in the where clause (long AND chains are nested instead of long)
+    names = [f"c{rnd.randrange(size)}" for _ in range(size)]
+    values = [str(rnd.randrange(size)) for _ in range(size)]
+    conditions = [f"c{rnd.randrange(size)} > {rnd.randrange(100)}" for _ in range(3)]
+    return f"select {', '.join(names)} from t where c0 in ({', '.join(values)}) and {' and '.join(conditions)}"
+
+
+def _count_matches_by_deleting(gold_items: Sequence, predicted_items: Sequence) -> Tuple[int, int]:
+    return (
+        _count_matched_items_by_deleting(gold_items, predicted_items),
+        _count_matched_items_by_deleting(predicted_items, gold_items),
+    )
+
+
+def _time_matching(
+    count: Callable[[Sequence, Sequence], Tuple[int, int]], pairs: List[Tuple[Dict, Dict]], clause: str, repeat: int
+) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for gold, predicted in pairs:
+            count(gold["select_body_0"][0][clause], predicted["select_body_0"][0][clause])
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run_benchmark(sizes: List[int], pairs_count: int, repeat: int) -> None:
+    rnd = random.Random(0)
+    jsql_parser = JSQLParser.create(backend="python")
+    for size in sizes:
+        sql_list = [_create_sql(size, rnd) for _ in range(pairs_count * 2)]
+        translated = jsql_parser.translate_batch(sql_list, parse_on_clause=False)
+        pairs = list(zip(translated[::2], translated[1::2]))
+
+        for clause in ("select_items", "where_items"):
+            for gold, predicted in pairs:
+                gold_items = gold["select_body_0"][0][clause]
+                predicted_items = predicted["select_body_0"][0][clause]
+                assert count_matches(gold_items, predicted_items) == _count_matches_by_deleting(
+                    gold_items, predicted_items
+                )
+
+            items_count = len(pairs[0][0]["select_body_0"][0][clause])
+            deleting_time = _time_matching(_count_matches_by_deleting, pairs, clause, repeat)
+            multiset_time = _time_matching(count_matches, pairs, clause, repeat)
+            print(
+                f"{clause} with ~{items_count} items: deleting {deleting_time * 1000:.2f}ms, "
+                f"multiset {multiset_time * 1000:.2f}ms ({deleting_time / multiset_time:.2f}x)"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[10, 100, 1000], help="Number of selected columns and IN values"
+    )
+    parser.add_argument("--pairs", type=int, default=20, help="Number of gold/predicted pairs per size")
+    parser.add_argument("--repeat", type=int, default=5, help="Number of rounds, the best one is reported")
+    args = parser.parse_args()
+    run_benchmark(args.sizes, args.pairs, args.repeat)
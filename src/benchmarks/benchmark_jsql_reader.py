@@ -0,0 +1,86 @@
+import argparse
+import time
+from typing import Any, Callable, Dict, List
+
+import srsly
+
+from src.ext_services.jsql_parser import JSQLParser
+from src.metrics.partial_match_eval.iterative_jsql_reader import IterativeJSQLReader
+from src.metrics.partial_match_eval.jsql_reader import JSQLReader
+
+
+def _json_depth(value: Any) -> int:
+    depth = 0
+    stack = [(value, 1)]
+    while stack:
+        value, value_depth = stack.pop()
+        depth = max(depth, value_depth)
+        if isinstance(value, dict):
+            stack.extend((child, value_depth + 1) for child in value.values())
+        elif isinstance(value, list):
+            stack.extend((child, value_depth + 1) for child in value)
+    return depth
+
+
+VARIANTS = [(False, True), (True, True)]
+
+
+def _read_separately(reader: Any) -> Callable[[Dict], List[Dict]]:
+    def read(parsed_sql: Dict) -> List[Dict]:
+        return [reader.parse_sql_to_parsed_body(parsed_sql, *variant) for variant in VARIANTS]
+
+    return read
+
+
+def _read_in_one_walk(parsed_sql: Dict) -> List[Dict]:
+    return IterativeJSQLReader.parse_sql_to_parsed_bodies(parsed_sql, VARIANTS)
+
+
+def _time_round(read: Callable[[Dict], List[Dict]], parsed_sql_list: List[Dict]) -> float:
+    start = time.perf_counter()
+    for parsed_sql in parsed_sql_list:
+        read(parsed_sql)
+    return time.perf_counter() - start
+
+
+def _time_readers(readers: List[Callable], parsed_sql_list: List[Dict], repeat: int) -> List[float]:
+    # the readers take turns so they run under the same load, and like timeit the best round is reported since the
+    # slower rounds were slowed down by other processes
+    timings: List[List[float]] = [[] for _ in readers]
+    for _ in range(repeat):
+        for reader, reader_timings in zip(readers, timings):
+            reader_timings.append(_time_round(reader, parsed_sql_list))
+    return [min(reader_timings) for reader_timings in timings]
+
+
+def run_benchmark(sede_file: str, top: int, repeat: int, backend: str) -> None:
+    jsql_parser = JSQLParser.create(backend=backend)
+    queries = [sample["QueryBody"] for sample in srsly.read_jsonl(sede_file)]
+    parsed_sql_list = [parsed_sql for parsed_sql in jsql_parser.parse_sql_batch(queries) if parsed_sql]
+    print(f"Parsed {len(parsed_sql_list)} out of {len(queries)} queries")
+
+    # the most deeply nested queries are the ones with the deepest JSQL JSON
+    parsed_sql_list = sorted(parsed_sql_list, key=_json_depth, reverse=True)[:top]
+    depths = [_json_depth(parsed_sql) for parsed_sql in parsed_sql_list]
+    print(f"Benchmarking the {len(parsed_sql_list)} deepest queries (JSON depth {min(depths)}-{max(depths)})")
+
+    readers = [_read_separately(JSQLReader), _read_separately(IterativeJSQLReader), _read_in_one_walk]
+    for parsed_sql in parsed_sql_list:
+        expected = readers[0](parsed_sql)
+        assert all(read(parsed_sql) == expected for read in readers[1:])
+
+    # every query is read with and without values, like evaluate_predictions does
+    recursive_time, iterative_time, one_walk_time = _time_readers(readers, parsed_sql_list, repeat)
+    print(f"JSQLReader: {recursive_time * 1000:.2f}ms")
+    print(f"IterativeJSQLReader: {iterative_time * 1000:.2f}ms ({recursive_time / iterative_time:.2f}x)")
+    print(f"IterativeJSQLReader, one walk: {one_walk_time * 1000:.2f}ms ({recursive_time / one_walk_time:.2f}x)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sede-file", type=str, default="data/sede/test.jsonl", help="SEDE file with the queries")
+    parser.add_argument("--top", type=int, default=50, help="Number of most deeply nested queries to benchmark")
+    parser.add_argument("--repeat", type=int, default=20, help="Number of rounds, the best one is reported")
+    parser.add_argument("--backend", type=str, default="rest", choices=["rest", "python"], help="JSQL backend")
+    args = parser.parse_args()
+    run_benchmark(args.sede_file, args.top, args.repeat, args.backend)
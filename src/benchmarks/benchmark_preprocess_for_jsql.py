@@ -0,0 +1,107 @@
+import argparse
+import time
+from typing import Callable, List, Optional
+
+import srsly
+
+from src.preprocessing.sql_utils import (
+    _clean_rewritten_sql,
+    _rewrite_aliases_by_searching,
+    _rewrite_top_tags_by_searching,
+    _surrounded_by_apostrophes,
+    preprocess_for_jsql,
+)
+from src.sql_preprocessing.sql_patterns import TAGS_PATTERN
+
+
+def rewrite_tags_by_searching(sql: str) -> str:
+    """
+    How preprocess_for_jsql used to rewrite the aliases and parameters, searching from the start of the query after
+    every replacement. The reference output of the single pass rewriting.
+    """
+    sql = _rewrite_aliases_by_searching(sql)
+    sql = _rewrite_top_tags_by_searching(sql)
+
+    new_sql = ""
+    match = TAGS_PATTERN.search(sql)
+    while match is not None:
+        group_two = match.group(2)
+
+        if not _surrounded_by_apostrophes(sql, match.start(), match.end()):
+            new_alias = f"{match.group(1)}'{group_two}'{match.group(3)}"
+            new_sql = new_sql + sql[0 : match.start()] + new_alias
+        else:
+            new_sql = new_sql + sql[0 : match.start()] + match.group(0)
+
+        sql = sql[match.end() :]
+        match = TAGS_PATTERN.search(sql)
+    if sql:
+        new_sql = new_sql + sql
+    return new_sql
+
+
+def _preprocess_for_jsql_by_searching(sql: str) -> Optional[str]:
+    return _clean_rewritten_sql(rewrite_tags_by_searching(sql))
+
+
+def _create_sql(aliases_count: int) -> str:
+    # a long select list of bracketed aliases and parameters
+    columns = [
+        f"c{index} as [Column {index}], ##param{index}:int?{index}## as p{index}" for index in range(aliases_count)
+    ]
+    return f"select top ##topn:int?100## {', '.join(columns)} from posts order by [Column 0]"
+
+
+def _time_preprocessing(preprocess: Callable[[str], Optional[str]], sql_list: List[str], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for sql in sql_list:
+            preprocess(sql)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def check_parity(sql_list: List[str]) -> int:
+    """Asserts that preprocess_for_jsql is unchanged for every query, returns the number of queries."""
+    for sql in sql_list:
+        cleaned_sql = preprocess_for_jsql(sql)
+        expected_sql = _preprocess_for_jsql_by_searching(sql)
+        assert cleaned_sql == expected_sql, f"{sql!r}: {cleaned_sql!r} != {expected_sql!r}"
+    return len(sql_list)
+
+
+def run_benchmark(paths: List[str], sizes: List[int], repeat: int) -> None:
+    sql_list = [line["QueryBody"] for path in paths for line in srsly.read_jsonl(path)]
+    print(f"Checked {check_parity(sql_list)} SEDE queries, the outputs are identical")
+    searching_time = _time_preprocessing(_preprocess_for_jsql_by_searching, sql_list, repeat)
+    single_pass_time = _time_preprocessing(preprocess_for_jsql, sql_list, repeat)
+    print(
+        f"SEDE queries: searching {len(sql_list) / searching_time:.1f} queries/sec, "
+        f"single pass {len(sql_list) / single_pass_time:.1f} queries/sec ({searching_time / single_pass_time:.2f}x)"
+    )
+
+    for size in sizes:
+        sql = _create_sql(size)
+        check_parity([sql])
+        searching_time = _time_preprocessing(_preprocess_for_jsql_by_searching, [sql], repeat)
+        single_pass_time = _time_preprocessing(preprocess_for_jsql, [sql], repeat)
+        print(
+            f"{size * 2} aliases and parameters: searching {searching_time * 1000:.2f}ms, "
+            f"single pass {single_pass_time * 1000:.2f}ms ({searching_time / single_pass_time:.2f}x)"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--paths",
+        type=str,
+        nargs="+",
+        default=["data/sede/train.jsonl", "data/sede/val.jsonl", "data/sede/test.jsonl"],
+        help="SEDE files whose queries are checked and timed",
+    )
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000], help="Number of generated aliases")
+    parser.add_argument("--repeat", type=int, default=5, help="Number of rounds, the best one is reported")
+    args = parser.parse_args()
+    run_benchmark(args.paths, args.sizes, args.repeat)
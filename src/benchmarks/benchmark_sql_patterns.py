@@ -0,0 +1,58 @@
+import argparse
+import re
+import time
+from typing import Callable, List
+
+import srsly
+
+from src.preprocessing.sql_utils import preprocess_for_jsql
+from src.sql_preprocessing.sql_cleaning import clean_sql_query
+from src.sql_preprocessing.sql_patterns import PATTERNS
+
+
+def _time_calls(call: Callable[[str], object], queries: List[str], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for query in queries:
+            call(query)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run_pattern_benchmarks(queries: List[str], repeat: int) -> None:
+    """Times every pattern of the registry, compiled and as the inline re.sub calls used it (with the re cache)."""
+    for name, pattern in PATTERNS.items():
+        flags = pattern.flags
+        inline_time = _time_calls(lambda query: re.sub(pattern.pattern, "", query, flags=flags), queries, repeat)
+        compiled_time = _time_calls(lambda query: pattern.sub("", query), queries, repeat)
+        print(
+            f"{name}: inline {len(queries) / inline_time:.0f} queries/sec, "
+            f"compiled {len(queries) / compiled_time:.0f} queries/sec ({inline_time / compiled_time:.2f}x)"
+        )
+
+
+def compare_legacy_flags(queries: List[str], examples: int) -> None:
+    """Counts the queries whose cleaned SQL changes when the flags are no longer passed as the count."""
+    for clean in (preprocess_for_jsql, clean_sql_query):
+        changed = [query for query in queries if clean(query) != clean(query, legacy_flags=False)]
+        print(f"{clean.__name__}: {len(changed)} of {len(queries)} queries change without legacy flags")
+        for query in changed[:examples]:
+            print(f"  legacy: {clean(query)}\n  fixed:  {clean(query, legacy_flags=False)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--paths",
+        type=str,
+        nargs="+",
+        default=["data/sede/train.jsonl", "data/sede/val.jsonl", "data/sede/test.jsonl"],
+        help="SEDE files whose queries are cleaned",
+    )
+    parser.add_argument("--repeat", type=int, default=5, help="Number of rounds, the best one is reported")
+    parser.add_argument("--examples", type=int, default=3, help="Number of changed queries printed per cleaning")
+    args = parser.parse_args()
+    sql_list = [line["QueryBody"] for path in args.paths for line in srsly.read_jsonl(path)]
+    run_pattern_benchmarks(sql_list, args.repeat)
+    compare_legacy_flags(sql_list, args.examples)
@@ -52,6 +52,8 @@ class Seq2SeqDatasetReader(DatasetReader):
         replace_column_underscore: bool = True,
         filter_failed_parsed: bool = True,
         random_seed: Optional[int] = None,
+        jsql_cache_path: Optional[str] = None,
+        jsql_backend: str = "rest",
         **kwargs,
     ) -> None:
         super().__init__(**kwargs)
@@ -112,7 +114,8 @@ class Seq2SeqDatasetReader(DatasetReader):
 
         self._random = Random(random_seed)
 
-        self._sql_parser = JSQLParser.create()
+        # the parsed gold queries are kept in the metadata of every instance, so they are stored in the compact form
+        self._sql_parser = JSQLParser.create(cache_path=jsql_cache_path, backend=jsql_backend, compact_items=True)
 
     @overrides
     def _read(self, file_path: str) -> Iterable[Instance]:
@@ -1,22 +1,294 @@
 import argparse
-import re
+import json
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from contextlib import ExitStack
+from dataclasses import dataclass
 from functools import partial
-from typing import List, Dict
+from itertools import zip_longest
+from typing import Callable, Deque, List, Dict, Iterable, Iterator, NamedTuple, Optional, Sequence, TextIO, Tuple
 
+import numpy as np
 from allennlp.training.metrics import Average
+from more_itertools import chunked
+from sacrebleu import sentence_bleu
 
+from src.evaluation.query_report import QueryReportWriter
+from src.evaluation.sede_gold import load_sede_gold_index, read_sede_rows
+from src.ext_services.abstract_jsql_service import JSQLServiceError
+from src.ext_services.jsql_instrumentation import JSQLInstrumentation
 from src.ext_services.jsql_parser import JSQLParser
 from src.metrics.bleu.bleu_scorer import BleuScorer
-from src.metrics.partial_match_eval.evaluate import evaluate
+from src.metrics.partial_match_eval.batch_scorer import BatchScores, SCORED, ScoreAccumulator, score_batch
+from src.metrics.partial_match_eval.evaluate import CLAUSES
+from src.preprocessing.sql_utils import normalize_sql
 from src.spider_evaluator import evaluate_single
 
+# predicted SQL, gold SQL, Spider db id and query id (e.g. the QuerySetId of SEDE) of a row
+Row = Tuple[str, str, Optional[str], Optional[str]]
 
-# pylint: disable=too-many-branches
-def calculate_metrics(predictions: str, rat_sql: bool, rat_sql_gap: bool, spider_dev_gold: str):
+
+class Shard(NamedTuple):
+    """Consecutive rows, the db ids are set for Spider (and its exact match) only."""
+
+    predicted_lines: List[str]
+    gold_lines: List[str]
+    db_ids: Optional[List[str]] = None
+    query_ids: Optional[List[str]] = None
+
+
+# pylint: disable=too-many-instance-attributes
+@dataclass
+class _ShardMetrics:
+    # the rows that were scored, without the ones left out because their gold SQL could not be parsed
+    shard: Shard
+    unparsable_gold_count: int
+    parsable: np.ndarray
+    gold_parsable: np.ndarray
+    batch_scores: BatchScores
+    batch_scores_no_values: BatchScores
+    exact_match: Optional[List[int]]
+    instrumentation: JSQLInstrumentation
+    # parsing is done in batches, so only its time per shard is known
+    parse_seconds: float
+    exact_match_seconds: Optional[List[float]]
+    # sentence BLEU of every row, only calculated for the query report
+    bleu: Optional[List[float]]
+
+
+def _take(values: Optional[List], indices: List[int]) -> Optional[List]:
+    return [values[index] for index in indices] if values is not None else None
+
+
+def _evaluate_shard(
+    shard: Shard,
+    jsql_options: Dict,
+    jsql_instrumentation: bool,
+    query_report: bool = False,
+    skip_unparsable_gold: bool = False,
+) -> _ShardMetrics:
+    # runs in a worker process, so it creates its own JSQL client (and cache / Spider database connections)
+    predicted_lines, gold_lines, db_ids, query_ids = shard
+    instrumentation = JSQLInstrumentation(enabled=jsql_instrumentation)
+    jsql_parser = JSQLParser.create(**jsql_options, instrumentation=instrumentation, compact_items=True)
+    # every query is parsed once, and read once for both the value-preserving and the anonymized items
+    parse_start = time.perf_counter()
+    translations = jsql_parser.translate_multi(
+        predicted_lines + gold_lines, anonymize_values=(False, True), parse_on_clause=(False,)
+    )
+    parse_seconds = time.perf_counter() - parse_start
+    translated_predicted = translations[(False, False)][: len(predicted_lines)]
+    translated_gold = translations[(False, False)][len(predicted_lines) :]
+    translated_predicted_no_values = translations[(True, False)][: len(predicted_lines)]
+    translated_gold_no_values = translations[(True, False)][len(predicted_lines) :]
+
+    unparsable_gold_count = 0
+    if skip_unparsable_gold:
+        # like the dataset reader, which skips the queries whose gold SQL cannot be parsed, these rows are left out
+        kept = [index for index, translated_query in enumerate(translated_gold) if translated_query]
+        unparsable_gold_count = len(gold_lines) - len(kept)
+        if unparsable_gold_count:
+            predicted_lines, gold_lines = _take(predicted_lines, kept), _take(gold_lines, kept)
+            db_ids, query_ids = _take(db_ids, kept), _take(query_ids, kept)
+            shard = Shard(predicted_lines, gold_lines, db_ids, query_ids)
+            translated_predicted, translated_gold = _take(translated_predicted, kept), _take(translated_gold, kept)
+            translated_predicted_no_values = _take(translated_predicted_no_values, kept)
+            translated_gold_no_values = _take(translated_gold_no_values, kept)
+
+    # calculate PCM-F1 and PCM-EM, with and without values, the items of every pair are matched once for both
+    with instrumentation.timer("pcm_scoring"):
+        batch_scores = score_batch(translated_gold, translated_predicted, punish_invalid_sql=True)
+        batch_scores_no_values = score_batch(
+            translated_gold_no_values, translated_predicted_no_values, punish_invalid_sql=True
+        )
+
+    exact_match = None
+    exact_match_seconds = None
+    if db_ids is not None:
+        spider_evaluate_func = partial(
+            evaluate_single.evaluate, db_dir="data/spider/database", table="data/spider/tables.json"
+        )
+        exact_match = []
+        exact_match_seconds = []
+        for gold, pred, db_id in zip(gold_lines, predicted_lines, db_ids):
+            exact_match_start = time.perf_counter()
+            exact_match.append(int(spider_evaluate_func(gold, pred, db_id)))
+            exact_match_seconds.append(time.perf_counter() - exact_match_start)
+
+    bleu = None
+    if query_report:
+        # the lines are already lowercased
+        bleu = [sentence_bleu(pred, [gold]).score for pred, gold in zip(predicted_lines, gold_lines)]
+
+    return _ShardMetrics(
+        shard=shard,
+        unparsable_gold_count=unparsable_gold_count,
+        parsable=np.array([bool(translated_query) for translated_query in translated_predicted], dtype=bool),
+        gold_parsable=np.array([bool(translated_query) for translated_query in translated_gold], dtype=bool),
+        batch_scores=batch_scores,
+        batch_scores_no_values=batch_scores_no_values,
+        exact_match=exact_match,
+        instrumentation=instrumentation,
+        parse_seconds=parse_seconds,
+        exact_match_seconds=exact_match_seconds,
+        bleu=bleu,
+    )
+
+
+def read_spider_rows(predictions: str, spider_dev_gold: str) -> Iterator[Row]:
+    """Yields the normalized rows of Spider predictions, reading both files line by line."""
+    with open(spider_dev_gold, "r") as gold_fp, open(predictions, "r") as predicted_fp:
+        for gold_line, predicted_line in zip_longest(gold_fp, predicted_fp):
+            if gold_line is None or predicted_line is None:
+                raise ValueError(f"{predictions} and {spider_dev_gold} have a different number of lines")
+            gold_line = gold_line.strip()
+            predicted_sql = predicted_line.strip() if "\t" not in predicted_line else predicted_line.split("\t")[1]
+            yield (
+                normalize_sql(predicted_sql if predicted_sql else "a"),
+                normalize_sql(gold_line.split("\t")[0]),
+                gold_line.split("\t")[1].strip(),
+                None,
+            )
+
+
+def _chunk_rows(rows: Iterable[Row], chunk_size: int) -> Iterator[Shard]:
+    for rows_chunk in chunked(rows, chunk_size):
+        predicted_lines, gold_lines, db_ids, query_ids = (list(column) for column in zip(*rows_chunk))
+        # the ids are set for all the rows of a source or for none
+        yield Shard(
+            predicted_lines,
+            gold_lines,
+            db_ids if db_ids[0] is not None else None,
+            query_ids if query_ids[0] is not None else None,
+        )
+
+
+def _evaluate_chunks(
+    chunks: Iterator[Shard], evaluate_shard: Callable[[Shard], _ShardMetrics], workers: int
+) -> Iterator[Tuple[Shard, _ShardMetrics]]:
+    """
+    Yields the metrics of every chunk, in order. With several workers at most 2 chunks per worker are submitted
+    ahead, so the chunks are not all read into memory.
+    """
+    if workers <= 1:
+        for chunk in chunks:
+            yield chunk, evaluate_shard(chunk)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending: Deque[Tuple[Shard, Future]] = deque()
+        for chunk in chunks:
+            pending.append((chunk, executor.submit(evaluate_shard, chunk)))
+            if len(pending) >= 2 * workers:
+                chunk, future = pending.popleft()
+                yield chunk, future.result()
+        while pending:
+            chunk, future = pending.popleft()
+            yield chunk, future.result()
+
+
+def _print_exact_match_mismatches(
+    predicted_lines: List[str], gold_lines: List[str], correct_list: List[int], batch_scores_no_values: BatchScores
+) -> None:
+    pcm_em_no_values_flags = batch_scores_no_values.pcm_em_flags()
+    for index, (gold, pred, correct) in enumerate(zip(gold_lines, predicted_lines, correct_list)):
+        if batch_scores_no_values.status[index] == SCORED:
+            pcm_f1_em_score = float(pcm_em_no_values_flags[index])
+            if correct == 1 and pcm_f1_em_score < 1.0:
+                print("EM is 1 but PCM-EM-NoValues is < 1:\n")
+                print(f"Pred: {pred}")
+                print(f"Gold: {gold}\n")
+            if correct == 0 and pcm_f1_em_score == 1.0:
+                print("EM is 0 but PCM-EM-NoValues is 1:\n")
+                print(f"Pred: {pred}")
+                print(f"Gold: {gold}\n")
+
+
+def _write_row_scores(out_fp: TextIO, first_row: int, shard_metrics: _ShardMetrics) -> None:
+    # PCM scores of the rows left out of the metrics (both queries could not be parsed) are null
+    columns = {}
+    for suffix, batch_scores in (
+        ("", shard_metrics.batch_scores),
+        ("_no_values", shard_metrics.batch_scores_no_values),
+    ):
+        counted = batch_scores.counted
+        columns[f"pcm_f1{suffix}"] = [
+            float(score) if row_counted else None for score, row_counted in zip(batch_scores.pcm_f1_scores(), counted)
+        ]
+        columns[f"pcm_em{suffix}"] = [
+            float(flag) if row_counted else None for flag, row_counted in zip(batch_scores.pcm_em_flags(), counted)
+        ]
+    for index, parsable in enumerate(shard_metrics.parsable):
+        row_scores = {"row": first_row + index, "parsable": bool(parsable)}
+        row_scores.update({name: values[index] for name, values in columns.items()})
+        if shard_metrics.exact_match is not None:
+            row_scores["exact_match"] = shard_metrics.exact_match[index]
+        out_fp.write(json.dumps(row_scores) + "\n")
+
+
+def _query_report_columns(first_row: int, shard: Shard, shard_metrics: _ShardMetrics) -> Dict[str, Sequence]:
+    predicted_lines, gold_lines, db_ids, query_ids = shard
+    rows_count = len(gold_lines)
+    columns: Dict[str, Sequence] = {
+        "row": range(first_row, first_row + rows_count),
+        "query_id": query_ids if query_ids is not None else [None] * rows_count,
+        "db_id": db_ids if db_ids is not None else [None] * rows_count,
+        "predicted_sql": predicted_lines,
+        "gold_sql": gold_lines,
+        "predicted_parsable": shard_metrics.parsable.tolist(),
+        "gold_parsable": shard_metrics.gold_parsable.tolist(),
+        "bleu": shard_metrics.bleu,
+        "spider_em": shard_metrics.exact_match if shard_metrics.exact_match is not None else [None] * rows_count,
+        # the time of parsing the shard, shared evenly by its queries
+        "parse_ms": [shard_metrics.parse_seconds * 1000 / rows_count] * rows_count,
+        "pcm_ms": ((shard_metrics.batch_scores.seconds + shard_metrics.batch_scores_no_values.seconds) * 1000).tolist(),
+        "spider_em_ms": (
+            [seconds * 1000 for seconds in shard_metrics.exact_match_seconds]
+            if shard_metrics.exact_match_seconds is not None
+            else [None] * rows_count
+        ),
+    }
+    for suffix, batch_scores in (
+        ("", shard_metrics.batch_scores),
+        ("_no_values", shard_metrics.batch_scores_no_values),
+    ):
+        counted = batch_scores.counted
+        columns[f"pcm_f1{suffix}"] = batch_scores.pcm_f1_scores().tolist()
+        columns[f"pcm_em{suffix}"] = np.where(counted, batch_scores.pcm_em_flags(), np.nan).tolist()
+    for index, clause in enumerate(CLAUSES):
+        for score_name in ("precision", "recall", "f1"):
+            columns[f"{clause}_{score_name}"] = getattr(shard_metrics.batch_scores, score_name)[:, index].tolist()
+    return columns
+
+
+# pylint: disable=too-many-branches,too-many-locals,too-many-arguments
+def calculate_metrics(
+    predictions: str,
+    rat_sql: bool,
+    rat_sql_gap: bool,
+    spider_dev_gold: str,
+    jsql_workers: int = 1,
+    jsql_cache: str = None,
+    jsql_lru_cache_size: int = 100000,
+    jsql_backend: str = "rest",
+    jsql_instrumentation: bool = False,
+    workers: int = 1,
+    query_report: str = None,
+    sede_gold: List[str] = None,
+    sede_gold_cache: str = None,
+):
+    start_time = time.perf_counter()
     predicted_lines: List[str] = []
     gold_lines: List[str] = []
+    query_ids = None
 
-    if rat_sql or rat_sql_gap:
+    if sede_gold:
+        rows = list(read_sede_rows(predictions, load_sede_gold_index(sede_gold, sede_gold_cache, workers)))
+        predicted_lines = [row[0] for row in rows]
+        gold_lines = [row[1] for row in rows]
+        query_ids = [row[3] for row in rows]
+    elif rat_sql or rat_sql_gap:
         with open(spider_dev_gold, "r") as in_fp:
             spider_gold_lines = [line.strip() for line in in_fp]
             spider_gold_sqls = [line.split("\t")[0].strip() for line in spider_gold_lines]
@@ -29,116 +301,193 @@ def calculate_metrics(predictions: str, rat_sql: bool, rat_sql_gap: bool, spider
     assert len(predicted_lines) == len(gold_lines)
     print(f"Got {len(gold_lines)} queries")
 
-    predicted_lines = [line if line else "a" for line in predicted_lines]
-    predicted_lines = [re.sub(r" +", " ", line).lower().strip() for line in predicted_lines]
-    gold_lines = [re.sub(r" +", " ", line).lower().strip() for line in gold_lines]
+    predicted_lines = [normalize_sql(line if line else "a") for line in predicted_lines]
+    gold_lines = [normalize_sql(line) for line in gold_lines]
+
+    # parse and score the queries, in shards of consecutive rows when there are several worker processes
+    print("Parsing queries with JSQL parser")
+    jsql_options = {
+        "max_workers": jsql_workers,
+        "cache_path": jsql_cache,
+        "lru_cache_size": jsql_lru_cache_size,
+        "backend": jsql_backend,
+    }
+    if not JSQLParser.create(backend=jsql_backend).check_health():
+        raise JSQLServiceError("JSQL service is not available, start it or use --jsql-backend python")
+    shard_size = max(-(-len(gold_lines) // max(workers, 1)), 1)
+    shards = [
+        Shard(
+            predicted_lines[start : start + shard_size],
+            gold_lines[start : start + shard_size],
+            db_ids[start : start + shard_size] if (rat_sql or rat_sql_gap) and not sede_gold else None,
+            query_ids[start : start + shard_size] if query_ids is not None else None,
+        )
+        for start in range(0, len(gold_lines), shard_size)
+    ]
+    evaluate_shard = partial(
+        _evaluate_shard,
+        jsql_options=jsql_options,
+        jsql_instrumentation=jsql_instrumentation,
+        query_report=bool(query_report),
+        skip_unparsable_gold=bool(sede_gold),
+    )
+    if len(shards) > 1:
+        with ProcessPoolExecutor(max_workers=len(shards)) as executor:
+            # executor.map keeps the order of the shards, so the merged results do not depend on which one ends first
+            shard_metrics_list = list(executor.map(evaluate_shard, shards))
+    else:
+        shard_metrics_list = [evaluate_shard(shard) for shard in shards]
+
+    # the rows whose SEDE gold SQL could not be parsed are left out of every metric
+    unparsable_gold_count = sum(shard_metrics.unparsable_gold_count for shard_metrics in shard_metrics_list)
+    if unparsable_gold_count:
+        print(f"Skipped {unparsable_gold_count} predictions whose gold SQL could not be parsed")
+        predicted_lines = [line for shard_metrics in shard_metrics_list for line in shard_metrics.shard.predicted_lines]
+        gold_lines = [line for shard_metrics in shard_metrics_list for line in shard_metrics.shard.gold_lines]
 
     metrics: Dict[str, float] = {}
 
     # calculate BLEU score
-    blue_scorer = BleuScorer()
+    blue_scorer = BleuScorer(incremental=True)
     blue_scorer(predicted_lines, gold_lines)
     metrics.update(blue_scorer.get_metric(reset=True))
 
-    # parse queries with JSQL parser
-    print("Parsing queries with JSQL parser")
-    jsql_parser = JSQLParser.create()
-    translated_predicted = jsql_parser.translate_batch(predicted_lines, parse_on_clause=False)
-    translated_gold = jsql_parser.translate_batch(gold_lines, parse_on_clause=False)
-
-    # parse queries with JSQL parser
-    print("Parsing queries with JSQL parser without values")
-    translated_predicted_no_values = jsql_parser.translate_batch(
-        predicted_lines, anonymize_values=True, parse_on_clause=False
-    )
-    translated_gold_no_values = jsql_parser.translate_batch(gold_lines, anonymize_values=True, parse_on_clause=False)
-
-    # calculate percentage of valid SQL queries
-    parsable_queries_accuracy = Average()
-    for translated_predicted_query in translated_predicted:
-        if translated_predicted_query:
-            parsable_queries_accuracy(1.0)
-        else:
-            parsable_queries_accuracy(0.0)
-
-    # calculate PCM-F1
-    pcm_f1_metric = Average()
-    pcm_f1_scores = evaluate(translated_gold, translated_predicted, punish_invalid_sql=True)
-    pcm_f1_scores = [num for num in pcm_f1_scores if isinstance(num, (int, float))]
-    if not pcm_f1_scores:
-        pcm_f1_metric(0)
-    else:
-        pcm_f1_metric(sum(pcm_f1_scores) / len(pcm_f1_scores))
-
-    # calculate PCM-F1 no values
-    pcm_f1_no_values_metric = Average()
-    pcm_f1_no_values_scores = evaluate(
-        translated_gold_no_values, translated_predicted_no_values, punish_invalid_sql=True
+    instrumentation = JSQLInstrumentation(enabled=jsql_instrumentation)
+    for shard_metrics in shard_metrics_list:
+        instrumentation.merge(shard_metrics.instrumentation)
+    parsable = np.array(
+        [parsable for shard_metrics in shard_metrics_list for parsable in shard_metrics.parsable], dtype=bool
     )
-    pcm_f1_no_values_scores = [num for num in pcm_f1_no_values_scores if isinstance(num, (int, float))]
-    if not pcm_f1_no_values_scores:
-        pcm_f1_no_values_metric(0)
-    else:
-        pcm_f1_no_values_metric(sum(pcm_f1_no_values_scores) / len(pcm_f1_no_values_scores))
-
-    # calculate PCM-EM
-    pcm_em_metric = Average()
-    pcm_em_scores = evaluate(translated_gold, translated_predicted, punish_invalid_sql=True, exact_match=True)
-    pcm_em_scores = [num for num in pcm_em_scores if isinstance(num, (int, float))]
-    if not pcm_em_scores:
-        pcm_em_metric(0)
-    else:
-        pcm_em_metric(sum(pcm_em_scores) / len(pcm_em_scores))
-
-    # calculate PCM-EM no values
-    pcm_em_no_values_metric = Average()
-    pcm_em_no_values_scores = evaluate(
-        translated_gold_no_values, translated_predicted_no_values, punish_invalid_sql=True, exact_match=True
+    batch_scores = BatchScores.concatenate([shard_metrics.batch_scores for shard_metrics in shard_metrics_list])
+    batch_scores_no_values = BatchScores.concatenate(
+        [shard_metrics.batch_scores_no_values for shard_metrics in shard_metrics_list]
     )
-    pcm_em_no_values_scores = [num for num in pcm_em_no_values_scores if isinstance(num, (int, float))]
-    if not pcm_em_scores:
-        pcm_em_no_values_metric(0)
-    else:
-        pcm_em_no_values_metric(sum(pcm_em_no_values_scores) / len(pcm_em_no_values_scores))
+    if query_report:
+        with QueryReportWriter(query_report) as report_writer:
+            first_row = 0
+            for shard_metrics in shard_metrics_list:
+                report_writer.write(_query_report_columns(first_row, shard_metrics.shard, shard_metrics))
+                first_row += len(shard_metrics.shard.gold_lines)
 
     # calculate exact match
-    if rat_sql or rat_sql_gap:
-        spider_evaluate_func = partial(
-            evaluate_single.evaluate, db_dir="data/spider/database", table="data/spider/tables.json"
-        )
+    if (rat_sql or rat_sql_gap) and not sede_gold:
         exact_match = Average()
-
-        for (
-            index,
-            (gold, pred, db_id),
-        ) in enumerate(zip(gold_lines, predicted_lines, db_ids)):
-            correct = int(spider_evaluate_func(gold, pred, db_id))
+        correct_list = [correct for shard_metrics in shard_metrics_list for correct in shard_metrics.exact_match]
+        for correct in correct_list:
             exact_match(correct)
-
-            translated_predicted_item = translated_predicted_no_values[index]
-            translated_gold_item = translated_gold_no_values[index]
-            if translated_predicted_item and translated_gold_item:
-                pcm_f1_em_score = evaluate(
-                    [translated_gold_item], [translated_predicted_item], punish_invalid_sql=True, exact_match=True
-                )[0]
-                if correct == 1 and pcm_f1_em_score < 1.0:
-                    print("EM is 1 but PCM-EM-NoValues is < 1:\n")
-                    print(f"Pred: {pred}")
-                    print(f"Gold: {gold}\n")
-                if correct == 0 and pcm_f1_em_score == 1.0:
-                    print("EM is 0 but PCM-EM-NoValues is 1:\n")
-                    print(f"Pred: {pred}")
-                    print(f"Gold: {gold}\n")
+        _print_exact_match_mismatches(predicted_lines, gold_lines, correct_list, batch_scores_no_values)
 
         metrics["exact_match_accuracy"] = exact_match.get_metric(reset=True)
 
-    metrics["parsable_queries_accuracy"] = parsable_queries_accuracy.get_metric(reset=True)
-    metrics["partial_match_f1"] = pcm_f1_metric.get_metric(reset=True)
-    metrics["partial_match_f1_no_values"] = pcm_f1_no_values_metric.get_metric(reset=True)
-    metrics["partial_match_em"] = pcm_em_metric.get_metric(reset=True)
-    metrics["partial_match_no_values_em"] = pcm_em_no_values_metric.get_metric(reset=True)
+    # percentage of valid SQL queries
+    metrics["parsable_queries_accuracy"] = float(parsable.mean()) if len(parsable) else 0.0
+    metrics["partial_match_f1"] = batch_scores.pcm_f1() or 0.0
+    metrics["partial_match_f1_no_values"] = batch_scores_no_values.pcm_f1() or 0.0
+    metrics["partial_match_em"] = batch_scores.pcm_em() or 0.0
+    metrics["partial_match_no_values_em"] = batch_scores_no_values.pcm_em() or 0.0
+    metrics.update({f"partial_match_f1_{clause}": score for clause, score in batch_scores.clause_f1().items()})
+    metrics.update(instrumentation.get_stats())
 
     print(metrics)
+    elapsed = time.perf_counter() - start_time
+    print(f"Evaluated {len(gold_lines)} queries in {elapsed:.2f}s ({len(gold_lines) / elapsed:.1f} queries/sec)")
+
+
+# pylint: disable=too-many-locals,too-many-arguments
+def calculate_metrics_streaming(
+    rows: Iterable[Row],
+    chunk_size: int = 1000,
+    scores_output: str = None,
+    jsql_workers: int = 1,
+    jsql_cache: str = None,
+    jsql_lru_cache_size: int = 100000,
+    jsql_backend: str = "rest",
+    jsql_instrumentation: bool = False,
+    workers: int = 1,
+    query_report: str = None,
+    skip_unparsable_gold: bool = False,
+):
+    """
+    Evaluates the rows of read_spider_rows or read_sede_rows, which read the files line by line, scoring chunks of
+    `chunk_size` rows and keeping only running metrics, so memory does not depend on the number of rows. Corpus BLEU
+    is kept as sufficient statistics too (see BleuScorer). With `scores_output`, the scores of every row are written
+    to that JSONL file. With `skip_unparsable_gold` (for SEDE), the rows whose gold SQL cannot be parsed are left out.
+    """
+    start_time = time.perf_counter()
+    jsql_options = {
+        "max_workers": jsql_workers,
+        "cache_path": jsql_cache,
+        "lru_cache_size": jsql_lru_cache_size,
+        "backend": jsql_backend,
+    }
+    if not JSQLParser.create(backend=jsql_backend).check_health():
+        raise JSQLServiceError("JSQL service is not available, start it or use --jsql-backend python")
+    evaluate_shard = partial(
+        _evaluate_shard,
+        jsql_options=jsql_options,
+        jsql_instrumentation=jsql_instrumentation,
+        query_report=bool(query_report),
+        skip_unparsable_gold=skip_unparsable_gold,
+    )
+    chunks = _chunk_rows(rows, chunk_size)
+
+    bleu_scorer = BleuScorer(incremental=True)
+    parsable_queries_accuracy = Average()
+    exact_match: Optional[Average] = None
+    scores = ScoreAccumulator()
+    scores_no_values = ScoreAccumulator()
+    instrumentation = JSQLInstrumentation(enabled=jsql_instrumentation)
+    row_count = 0
+    unparsable_gold_count = 0
+    with ExitStack() as stack:
+        scores_fp = stack.enter_context(open(scores_output, "w")) if scores_output else None
+        report_writer = stack.enter_context(QueryReportWriter(query_report)) if query_report else None
+        for _, shard_metrics in _evaluate_chunks(chunks, evaluate_shard, workers):
+            # the scored rows of the chunk
+            chunk = shard_metrics.shard
+            unparsable_gold_count += shard_metrics.unparsable_gold_count
+            bleu_scorer(chunk.predicted_lines, chunk.gold_lines)
+            for parsable in shard_metrics.parsable:
+                parsable_queries_accuracy(float(parsable))
+            scores.add(shard_metrics.batch_scores)
+            scores_no_values.add(shard_metrics.batch_scores_no_values)
+            instrumentation.merge(shard_metrics.instrumentation)
+            if shard_metrics.exact_match is not None:
+                exact_match = exact_match or Average()
+                for correct in shard_metrics.exact_match:
+                    exact_match(correct)
+                _print_exact_match_mismatches(
+                    chunk.predicted_lines,
+                    chunk.gold_lines,
+                    shard_metrics.exact_match,
+                    shard_metrics.batch_scores_no_values,
+                )
+            if scores_fp:
+                _write_row_scores(scores_fp, row_count, shard_metrics)
+            if report_writer:
+                report_writer.write(_query_report_columns(row_count, chunk, shard_metrics))
+            row_count += len(chunk.gold_lines)
+    if unparsable_gold_count:
+        print(f"Skipped {unparsable_gold_count} predictions whose gold SQL could not be parsed")
+
+    metrics: Dict[str, float] = bleu_scorer.get_metric(reset=True)
+    if exact_match is not None:
+        metrics["exact_match_accuracy"] = exact_match.get_metric(reset=True)
+    metrics.update(
+        {
+            "parsable_queries_accuracy": parsable_queries_accuracy.get_metric(reset=True),
+            "partial_match_f1": scores.pcm_f1() or 0.0,
+            "partial_match_f1_no_values": scores_no_values.pcm_f1() or 0.0,
+            "partial_match_em": scores.pcm_em() or 0.0,
+            "partial_match_no_values_em": scores_no_values.pcm_em() or 0.0,
+        }
+    )
+    metrics.update({f"partial_match_f1_{clause}": score for clause, score in scores.clause_f1().items()})
+    metrics.update(instrumentation.get_stats())
+
+    print(metrics)
+    elapsed = time.perf_counter() - start_time
+    print(f"Evaluated {row_count} queries in {elapsed:.2f}s ({row_count / elapsed:.1f} queries/sec)")
 
 
 if __name__ == "__main__":
@@ -147,5 +496,79 @@ if __name__ == "__main__":
     parser.add_argument("--rat-sql", action="store_true")
     parser.add_argument("--rat-sql-gap", action="store_true")
     parser.add_argument("--spider-dev-gold", type=str, help="Spider dev file", required=False)
+    parser.add_argument(
+        "--sede-gold",
+        type=str,
+        nargs="+",
+        help="SEDE files (e.g. data/sede/test.jsonl) joined by QuerySetId to the predictions of Seq2SeqPredictor",
+    )
+    parser.add_argument("--sede-gold-cache", type=str, help="JSON file caching the cleaned SEDE gold SQLs by id")
+    parser.add_argument("--jsql-workers", type=int, default=1, help="Max concurrent calls to the JSQL service")
+    parser.add_argument("--jsql-cache", type=str, help="SQLite file caching the JSQL service results", required=False)
+    parser.add_argument(
+        "--jsql-lru-cache-size", type=int, default=100000, help="Number of translated queries kept in memory"
+    )
+    parser.add_argument(
+        "--jsql-backend",
+        type=str,
+        default="rest",
+        choices=["rest", "python"],
+        help="Parse queries with the JSQL service (rest) or in-process (python)",
+    )
+    parser.add_argument(
+        "--jsql-instrumentation", action="store_true", help="Report latencies, payload sizes and failures of parsing"
+    )
+    parser.add_argument(
+        "--workers", type=int, default=1, help="Number of processes parsing and scoring shards of the predictions"
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Read and score the predictions in chunks with bounded memory",
+    )
+    parser.add_argument("--chunk-size", type=int, default=1000, help="Number of rows scored at once with --stream")
+    parser.add_argument("--scores-output", type=str, help="JSONL file for the scores of every row with --stream")
+    parser.add_argument(
+        "--query-report",
+        type=str,
+        help="CSV (or .parquet) file with the scores and timings of every query, e.g. to compare clauses between runs",
+    )
     args = parser.parse_args()
-    calculate_metrics(args.predictions, args.rat_sql, args.rat_sql_gap, args.spider_dev_gold)
+    if args.stream:
+        if args.sede_gold:
+            row_iterator = read_sede_rows(
+                args.predictions, load_sede_gold_index(args.sede_gold, args.sede_gold_cache, args.workers)
+            )
+        elif args.rat_sql or args.rat_sql_gap:
+            row_iterator = read_spider_rows(args.predictions, args.spider_dev_gold)
+        else:
+            parser.error("--stream needs --sede-gold, --rat-sql or --rat-sql-gap")
+        calculate_metrics_streaming(
+            row_iterator,
+            args.chunk_size,
+            args.scores_output,
+            args.jsql_workers,
+            args.jsql_cache,
+            args.jsql_lru_cache_size,
+            args.jsql_backend,
+            args.jsql_instrumentation,
+            args.workers,
+            args.query_report,
+            bool(args.sede_gold),
+        )
+    else:
+        calculate_metrics(
+            args.predictions,
+            args.rat_sql,
+            args.rat_sql_gap,
+            args.spider_dev_gold,
+            args.jsql_workers,
+            args.jsql_cache,
+            args.jsql_lru_cache_size,
+            args.jsql_backend,
+            args.jsql_instrumentation,
+            args.workers,
+            args.query_report,
+            args.sede_gold,
+            args.sede_gold_cache,
+        )
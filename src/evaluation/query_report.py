@@ -0,0 +1,85 @@
+import csv
+import math
+from typing import Any, Dict, List, Sequence
+
+from src.metrics.partial_match_eval.evaluate import CLAUSES
+
+# column name -> type, the PCM scores are null for the rows left out of the metrics (both queries could not be
+# parsed), and the clause scores are null for the clauses that are empty in both queries
+QUERY_REPORT_COLUMNS: Dict[str, str] = {
+    "row": "int",
+    "query_id": "str",
+    "db_id": "str",
+    "predicted_sql": "str",
+    "gold_sql": "str",
+    "predicted_parsable": "bool",
+    "gold_parsable": "bool",
+    "pcm_f1": "float",
+    "pcm_em": "float",
+    "pcm_f1_no_values": "float",
+    "pcm_em_no_values": "float",
+    **{f"{clause}_{score}": "float" for clause in CLAUSES for score in ("precision", "recall", "f1")},
+    "bleu": "float",
+    "spider_em": "float",
+    "parse_ms": "float",
+    "pcm_ms": "float",
+    "spider_em_ms": "float",
+}
+
+
+def _to_cell(value: Any) -> Any:
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    return value
+
+
+class QueryReportWriter:
+    """
+    Writes one row per query with the scores of evaluate_predictions, to a Parquet file if the path ends with
+    .parquet (this needs pyarrow) or to a CSV file otherwise. Rows are written in chunks as they are scored, so the
+    report can be written while streaming.
+    """
+
+    def __init__(self, path: str):
+        self._path = path
+        self._parquet = path.endswith(".parquet")
+        self._schema = None
+        self._writer = None
+        self._out_fp = None
+
+    def __enter__(self) -> "QueryReportWriter":
+        if self._parquet:
+            import pyarrow  # pylint: disable=import-outside-toplevel
+            from pyarrow import parquet  # pylint: disable=import-outside-toplevel
+
+            types = {
+                "int": pyarrow.int64(),
+                "str": pyarrow.string(),
+                "bool": pyarrow.bool_(),
+                "float": pyarrow.float64(),
+            }
+            self._schema = pyarrow.schema(
+                [(name, types[type_name]) for name, type_name in QUERY_REPORT_COLUMNS.items()]
+            )
+            self._writer = parquet.ParquetWriter(self._path, self._schema)
+        else:
+            self._out_fp = open(self._path, "w", newline="")
+            self._writer = csv.writer(self._out_fp)
+            self._writer.writerow(QUERY_REPORT_COLUMNS)
+        return self
+
+    def __exit__(self, *args) -> None:
+        if self._parquet:
+            self._writer.close()
+        else:
+            self._out_fp.close()
+
+    def write(self, columns: Dict[str, Sequence]) -> None:
+        """`columns` has a sequence of values for every column of QUERY_REPORT_COLUMNS."""
+        cells: Dict[str, List] = {name: [_to_cell(value) for value in columns[name]] for name in QUERY_REPORT_COLUMNS}
+        if self._parquet:
+            import pyarrow  # pylint: disable=import-outside-toplevel
+
+            self._writer.write_table(pyarrow.Table.from_pydict(cells, schema=self._schema))
+        else:
+            self._writer.writerows(zip(*cells.values()))
@@ -0,0 +1,90 @@
+import json
+import os
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import srsly
+
+from src.preprocessing.sql_utils import normalize_sql, preprocess_for_jsql
+from src.sql_preprocessing.batch_cleaning import clean_batch
+
+
+def clean_gold_sql(query_body: str) -> Optional[str]:
+    # the target with values of the text2sql dataset reader, uncased
+    cleaned_sql = preprocess_for_jsql(query_body)
+    return cleaned_sql.lower() if cleaned_sql else None
+
+
+def _get_sources(paths: List[str]) -> Dict[str, List[float]]:
+    return {os.path.abspath(path): [os.path.getsize(path), os.path.getmtime(path)] for path in paths}
+
+
+def load_sede_gold_index(paths: List[str], cache_path: str = None, workers: int = 1) -> Dict[int, Optional[str]]:
+    """
+    Maps the QuerySetId of every query in the SEDE files (e.g. data/sede/test.jsonl) to its cleaned gold SQL, or None
+    if cleaning fails. Cleaning is the slow part, so with `cache_path` the index is stored in that JSON file and
+    reused as long as the SEDE files do not change, and with several `workers` it is done by clean_batch.
+    """
+    sources = _get_sources(paths)
+    if cache_path and os.path.exists(cache_path):
+        with open(cache_path, "r") as in_fp:
+            cached = json.load(in_fp)
+        if cached["sources"] == sources:
+            return {int(query_set_id): gold_sql for query_set_id, gold_sql in cached["gold"].items()}
+
+    query_bodies: Dict[int, str] = {}
+    for path in paths:
+        for line in srsly.read_jsonl(path):
+            # the first file wins if an id repeats
+            if line["QuerySetId"] not in query_bodies:
+                query_bodies[line["QuerySetId"]] = line["QueryBody"]
+    gold_index: Dict[int, Optional[str]] = dict(
+        zip(query_bodies, clean_batch(query_bodies.values(), workers=workers, cleaner=clean_gold_sql))
+    )
+
+    if cache_path:
+        with open(cache_path, "w") as out_fp:
+            json.dump({"sources": sources, "gold": gold_index}, out_fp)
+    return gold_index
+
+
+def _parse_sede_line(line: str) -> Optional[Tuple[int, str]]:
+    query_set_id, separator, predicted_sql = line.rstrip("\n").partition("\t")
+    if not separator:
+        return None
+    try:
+        return int(query_set_id), predicted_sql
+    except ValueError:
+        return None
+
+
+def read_sede_rows(predictions: str, gold_index: Dict[int, Optional[str]]) -> Iterator[Tuple[str, str, None, str]]:
+    """
+    Yields the normalized rows of SEDE predictions (the `query_set_id\tsql` lines of Seq2SeqPredictor.dump_line),
+    joined to their gold SQL by id (see load_sede_gold_index). Predictions without a cleaned gold SQL are skipped, the
+    dataset reader skips these queries too (the ones whose gold SQL cannot be parsed are left out when they are
+    scored). Blank lines are ignored and malformed lines are reported and skipped.
+    """
+    malformed_count = skipped_count = 0
+    with open(predictions, "r") as in_fp:
+        for line_number, line in enumerate(in_fp, start=1):
+            if not line.strip():
+                continue
+            parsed_line = _parse_sede_line(line)
+            if parsed_line is None:
+                malformed_count += 1
+                print(f"Skipped malformed line {line_number} of {predictions}: {line.rstrip()!r}")
+                continue
+            query_set_id, predicted_sql = parsed_line
+            gold_sql = gold_index.get(query_set_id)
+            if not gold_sql:
+                skipped_count += 1
+                continue
+            predicted_sql = predicted_sql.strip()
+            yield normalize_sql(predicted_sql if predicted_sql else "a"), normalize_sql(gold_sql), None, str(
+                query_set_id
+            )
+
+    if malformed_count:
+        print(f"Skipped {malformed_count} malformed lines")
+    if skipped_count:
+        print(f"Skipped {skipped_count} predictions without a gold SQL")
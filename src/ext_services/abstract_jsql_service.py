@@ -1,8 +1,59 @@
+# pylint: disable=broad-except
+
+import asyncio
 from abc import abstractmethod, ABC
-from typing import Dict, Optional
+from typing import Dict, Optional, List, Union
+
+JSQLBatchItem = Union[Dict, None, Exception]
+
+
+HEALTH_CHECK_SQL = "SELECT 1"
+
+
+class JSQLServiceError(Exception):
+    pass
+
+
+class JSQLCircuitOpenError(JSQLServiceError):
+    pass
 
 
 class AbstractJSQLService(ABC):
+    # the parser behind the service, part of the keys of CachedJSQLService so the outputs of different parsers are not
+    # mixed in one cache file. Bump it when the output of the service for the same SQL changes
+    PARSER_VERSION = "jsqlparser-as-a-service-1"
+
     @abstractmethod
     def call_jsql(self, sql: str) -> Optional[Dict]:
         raise NotImplementedError()
+
+    def call_jsql_batch(self, sql_list: List[str]) -> List[JSQLBatchItem]:
+        # every item is either the parsed JSON, None if the SQL could not be parsed, or the exception raised while
+        # parsing it, so one failing query does not fail the whole batch
+        outputs: List[JSQLBatchItem] = []
+        for sql in sql_list:
+            try:
+                outputs.append(self.call_jsql(sql))
+            except Exception as exception:
+                outputs.append(exception)
+        return outputs
+
+    async def call_jsql_async(self, sql: str) -> Optional[Dict]:
+        # services without a native async client run the blocking call in the default executor, so at least the
+        # event loop is not blocked while waiting for the response
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.call_jsql, sql)
+
+    def check_health(self) -> bool:
+        try:
+            self.call_jsql(HEALTH_CHECK_SQL)
+            return True
+        except Exception:
+            return False
+
+    def get_short_circuited_count(self) -> int:
+        # number of calls that failed fast since the service was known to be down, without reaching it
+        return 0
+
+    async def call_jsql_batch_async(self, sql_list: List[str]) -> List[Optional[Dict]]:
+        return list(await asyncio.gather(*[self.call_jsql_async(sql) for sql in sql_list]))
@@ -0,0 +1,157 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional, List
+
+from src.ext_services.abstract_jsql_service import AbstractJSQLService, JSQLBatchItem
+
+
+class CachedJSQLService(AbstractJSQLService):
+    """
+    Persistent, content-addressed cache in front of another JSQL service. Entries are keyed by a hash of the parser
+    version (by default the PARSER_VERSION of the wrapped service, so the outputs of different backends are not
+    mixed) and the SQL sent to the service, stored in a SQLite file and evicted least-recently-used first once the
+    cache holds more than `max_entries` queries. Only successful calls are cached (including the `None` returned for
+    SQL the service could not parse), errors always go to the wrapped service.
+
+    Cache hits do not write to the file: their access times are kept in memory and written with the next insert, the
+    next eviction, on close, or once `access_flush_size` hits are pending, so reads do not wait for a commit.
+    """
+
+    def __init__(
+        self,
+        jsql_service: AbstractJSQLService,
+        cache_path: str,
+        max_entries: int = 1000000,
+        parser_version: str = None,
+        access_flush_size: int = 1000,
+    ):
+        self._jsql_service = jsql_service
+        self._max_entries = max_entries
+        self._parser_version = parser_version or jsql_service.PARSER_VERSION
+        self._access_flush_size = access_flush_size
+        # key -> last access time of the hits not written to the file yet
+        self._pending_access_times: Dict[str, float] = {}
+        self._pending_hits = 0
+
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(cache_path, timeout=30, check_same_thread=False)
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS jsql_cache (key TEXT PRIMARY KEY, output TEXT NOT NULL, last_access REAL)"
+        )
+        self._connection.execute("CREATE INDEX IF NOT EXISTS jsql_cache_last_access ON jsql_cache (last_access)")
+        self._connection.commit()
+        self._size = self._count_entries()
+
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def _key(self, sql: str) -> str:
+        return hashlib.sha256(f"{self._parser_version}\n{sql}".encode("utf-8")).hexdigest()
+
+    def _count_entries(self) -> int:
+        return self._connection.execute("SELECT COUNT(*) FROM jsql_cache").fetchone()[0]
+
+    def _lookup(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._connection.execute("SELECT output FROM jsql_cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self._misses += 1
+                return None
+            self._hits += 1
+            self._pending_access_times[key] = time.time()
+            self._pending_hits += 1
+            if self._pending_hits >= self._access_flush_size:
+                self._write_access_times()
+                self._connection.commit()
+            return row[0]
+
+    def _write_access_times(self) -> None:
+        # the caller holds the lock and commits
+        if self._pending_access_times:
+            self._connection.executemany(
+                "UPDATE jsql_cache SET last_access = ? WHERE key = ?",
+                [(access_time, key) for key, access_time in self._pending_access_times.items()],
+            )
+            self._pending_access_times = {}
+        self._pending_hits = 0
+
+    def _store(self, key: str, output: Optional[Dict]) -> None:
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO jsql_cache (key, output, last_access) VALUES (?, ?, ?)",
+                (key, json.dumps(output), time.time()),
+            )
+            self._size += 1
+            self._write_access_times()
+            if self._size > self._max_entries:
+                self._evict()
+            self._connection.commit()
+
+    def _evict(self) -> None:
+        # evict a few more entries than needed so we don't have to evict again on the next insert
+        self._size = self._count_entries()
+        if self._size <= self._max_entries:
+            return
+        to_evict = self._size - self._max_entries + max(self._max_entries // 10, 1)
+        cursor = self._connection.execute(
+            "DELETE FROM jsql_cache WHERE key IN (SELECT key FROM jsql_cache ORDER BY last_access LIMIT ?)",
+            (to_evict,),
+        )
+        self._evictions += cursor.rowcount
+        self._size = self._count_entries()
+
+    def call_jsql(self, sql: str) -> Optional[Dict]:
+        key = self._key(sql)
+
+        cached_output = self._lookup(key)
+        if cached_output is not None:
+            return json.loads(cached_output)
+
+        # the wrapped service is called outside the lock, so concurrent misses are not serialized
+        output = self._jsql_service.call_jsql(sql)
+        self._store(key, output)
+        return output
+
+    def call_jsql_batch(self, sql_list: List[str]) -> List[JSQLBatchItem]:
+        outputs: List[JSQLBatchItem] = []
+        missing_indices: List[int] = []
+        for index, sql in enumerate(sql_list):
+            cached_output = self._lookup(self._key(sql))
+            if cached_output is not None:
+                outputs.append(json.loads(cached_output))
+            else:
+                outputs.append(None)
+                missing_indices.append(index)
+
+        missing_outputs = self._jsql_service.call_jsql_batch([sql_list[index] for index in missing_indices])
+        for index, output in zip(missing_indices, missing_outputs):
+            outputs[index] = output
+            if not isinstance(output, Exception):
+                self._store(self._key(sql_list[index]), output)
+        return outputs
+
+    def check_health(self) -> bool:
+        return self._jsql_service.check_health()
+
+    def get_short_circuited_count(self) -> int:
+        return self._jsql_service.get_short_circuited_count()
+
+    def get_cache_stats(self) -> Dict[str, float]:
+        total = self._hits + self._misses
+        return {
+            "hits": self._hits,
+            "misses": self._misses,
+            "hit_rate": self._hits / total if total else 0.0,
+            "evictions": self._evictions,
+            "entries": self._size,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._write_access_times()
+            self._connection.commit()
+            self._connection.close()
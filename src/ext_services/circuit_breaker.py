@@ -0,0 +1,70 @@
+import threading
+import time
+from typing import Dict
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """
+    Stops calling a service that keeps failing. After `failure_threshold` consecutive failures the circuit opens and
+    calls fail fast (without waiting for a timeout) for `reset_timeout` seconds. Then a single probe call is let
+    through (half-open): if it succeeds the circuit closes again, otherwise it stays open for another `reset_timeout`.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self._failure_threshold = failure_threshold
+        self._reset_timeout = reset_timeout
+
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+
+        self._short_circuited = 0
+        self._trips = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == OPEN and time.monotonic() - self._opened_at >= self._reset_timeout:
+                return HALF_OPEN
+            return self._state
+
+    def allow_request(self) -> bool:
+        if self._failure_threshold <= 0:
+            return True
+        with self._lock:
+            if self._state == CLOSED:
+                return True
+            if self._state == OPEN and time.monotonic() - self._opened_at >= self._reset_timeout:
+                # only the first caller after the timeout probes the service, the others keep failing fast
+                self._state = HALF_OPEN
+                return True
+            self._short_circuited += 1
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._state = CLOSED
+            self._consecutive_failures = 0
+
+    def record_failure(self) -> None:
+        if self._failure_threshold <= 0:
+            return
+        with self._lock:
+            self._consecutive_failures += 1
+            if self._state == HALF_OPEN or self._consecutive_failures >= self._failure_threshold:
+                if self._state != OPEN:
+                    self._trips += 1
+                self._state = OPEN
+                self._opened_at = time.monotonic()
+
+    def get_stats(self) -> Dict[str, int]:
+        return {
+            "short_circuited": self._short_circuited,
+            "trips": self._trips,
+            "consecutive_failures": self._consecutive_failures,
+        }
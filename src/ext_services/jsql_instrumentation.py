@@ -0,0 +1,152 @@
+import random
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from typing import Dict, List, Iterator
+
+import numpy as np
+
+# failure categories
+FAILURE_HTTP_ERROR = "http_error"
+FAILURE_TIMEOUT = "timeout"
+FAILURE_CONNECTION_ERROR = "connection_error"
+FAILURE_SHORT_CIRCUITED = "short_circuited"
+FAILURE_ERROR_PAYLOAD = "error_payload"  # the "timestamp" payload the service returns for SQL it could not parse
+FAILURE_PREPROCESS = "preprocess_none"  # preprocess_for_jsql rejected the query, so it was never sent
+
+PERCENTILES = (50, 95, 99)
+# latencies kept per stage for the percentiles, which are exact up to this many calls
+RESERVOIR_SIZE = 10000
+
+
+class _LatencyReservoir:
+    """
+    The count and total of a stage's latencies, and a uniform sample of at most `size` of them (reservoir sampling),
+    so memory and the cost of the percentiles do not grow with the number of recorded calls.
+    """
+
+    def __init__(self, size: int = RESERVOIR_SIZE):
+        self.size = size
+        self.count = 0
+        self.total = 0.0
+        self.sample: List[float] = []
+        self._random = random.Random(0)
+
+    def add(self, seconds: float) -> None:
+        self.count += 1
+        self.total += seconds
+        if len(self.sample) < self.size:
+            self.sample.append(seconds)
+        else:
+            index = self._random.randrange(self.count)
+            if index < self.size:
+                self.sample[index] = seconds
+
+    def merge(self, other: "_LatencyReservoir") -> None:
+        count = self.count + other.count
+        if len(self.sample) + len(other.sample) <= self.size:
+            self.sample = self.sample + other.sample
+        else:
+            # every sample stands for its reservoir's count, so each one keeps its share of the merged sample
+            own_size = min(round(self.size * self.count / count), len(self.sample))
+            other_size = min(self.size - own_size, len(other.sample))
+            self.sample = self._random.sample(self.sample, own_size) + self._random.sample(other.sample, other_size)
+        self.count = count
+        self.total += other.total
+
+
+def _new_payload_sizes() -> List[int]:
+    return [0, 0]
+
+
+class JSQLInstrumentation:
+    """
+    Opt-in, thread-safe recorder of where the time of parsing queries goes: latencies per stage (JSQL round trips,
+    `JSQLReader` walks, scoring), payload sizes sent to and received from the service, and failures per category.
+    A disabled instance records nothing, so it can always be passed around instead of checking for None.
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._latencies: Dict[str, _LatencyReservoir] = defaultdict(_LatencyReservoir)
+        # name -> [count, total bytes]
+        self._payload_sizes: Dict[str, List[int]] = defaultdict(_new_payload_sizes)
+        self._failures: Counter = Counter()
+
+    def record_latency(self, name: str, seconds: float) -> None:
+        if self.enabled:
+            with self._lock:
+                self._latencies[name].add(seconds)
+
+    @contextmanager
+    def timer(self, name: str) -> Iterator[None]:
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record_latency(name, time.perf_counter() - start)
+
+    def record_payload_size(self, name: str, size: int) -> None:
+        if self.enabled:
+            with self._lock:
+                payload_sizes = self._payload_sizes[name]
+                payload_sizes[0] += 1
+                payload_sizes[1] += size
+
+    def record_failure(self, category: str, count: int = 1) -> None:
+        if self.enabled:
+            with self._lock:
+                self._failures[category] += count
+
+    def __getstate__(self) -> Dict:
+        # the lock cannot be pickled, instances are sent back from the worker processes of evaluate_predictions
+        with self._lock:
+            state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state: Dict) -> None:
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def merge(self, other: "JSQLInstrumentation") -> None:
+        """Adds everything `other` recorded, e.g. in another process."""
+        if not self.enabled:
+            return
+        with self._lock:
+            for name, latencies in other._latencies.items():
+                self._latencies[name].merge(latencies)
+            for name, (count, total) in other._payload_sizes.items():
+                payload_sizes = self._payload_sizes[name]
+                payload_sizes[0] += count
+                payload_sizes[1] += total
+            self._failures.update(other._failures)
+
+    def get_stats(self, reset: bool = False) -> Dict[str, float]:
+        """
+        Flat dict (so it can be logged as metrics), e.g. jsql_http_count, jsql_http_p95_ms, jsql_http_total_s,
+        jsql_request_mean_bytes, jsql_failures_timeout. The percentiles are the ones of the latencies' reservoir sample.
+        """
+        stats: Dict[str, float] = {}
+        with self._lock:
+            for name, latencies in sorted(self._latencies.items()):
+                stats[f"{name}_count"] = latencies.count
+                stats[f"{name}_total_s"] = latencies.total
+                for percentile, value in zip(PERCENTILES, np.percentile(latencies.sample, PERCENTILES)):
+                    stats[f"{name}_p{percentile}_ms"] = float(value) * 1000
+            for name, (count, total) in sorted(self._payload_sizes.items()):
+                stats[f"{name}_mean_bytes"] = total / count
+                stats[f"{name}_total_bytes"] = total
+            for category, count in sorted(self._failures.items()):
+                stats[f"jsql_failures_{category}"] = count
+
+            if reset:
+                self._latencies.clear()
+                self._payload_sizes.clear()
+                self._failures.clear()
+        return stats
@@ -1,10 +1,18 @@
 # pylint: disable=broad-except
 
-from typing import Dict, Optional, List, Tuple
+import asyncio
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional, List, Tuple, Any, Sequence
 
 from src.ext_services.abstract_jsql_service import AbstractJSQLService
+from src.ext_services.cached_jsql_service import CachedJSQLService
+from src.ext_services.jsql_instrumentation import JSQLInstrumentation, FAILURE_PREPROCESS
+from src.ext_services.python_jsql_service import PythonJSQLService
 from src.ext_services.rest_jsql_service import RestJSQLService
-from src.metrics.partial_match_eval.jsql_reader import JSQLReader
+from src.metrics.partial_match_eval.iterative_jsql_reader import IterativeJSQLReader
+from src.metrics.partial_match_eval.parsed_items import ItemInterner
 from src.preprocessing.sql_utils import preprocess_for_jsql
 
 
@@ -23,55 +31,243 @@ def _augment_items(items: List[Tuple[int, str]], aliases_to_tables_dict: Dict[st
     return augmented_items
 
 
+_MISSING = object()
+
+
+class _LRUCache:
+    def __init__(self, capacity: int):
+        self._capacity = capacity
+        self._items: "OrderedDict[Tuple, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Tuple) -> Any:
+        if self._capacity <= 0:
+            # a disabled cache has nothing to count
+            return _MISSING
+        with self._lock:
+            value = self._items.get(key, _MISSING)
+            if value is _MISSING:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._items.move_to_end(key)
+            return value
+
+    def put(self, key: Tuple, value: Any) -> None:
+        if self._capacity <= 0:
+            return
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self._capacity:
+                self._items.popitem(last=False)
+                self.evictions += 1
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
 class JSQLParser:
-    def __init__(self, jsql_service: AbstractJSQLService):
-        self._jsql_reader = JSQLReader()
+    def __init__(
+        self,
+        jsql_service: AbstractJSQLService,
+        max_workers: int = 1,
+        lru_cache_size: int = 0,
+        instrumentation: JSQLInstrumentation = None,
+        compact_items: bool = False,
+    ):
+        self._jsql_reader = IterativeJSQLReader()
+        # with compact_items the clauses of the translations are interned tuples (see ItemInterner), which take much
+        # less memory when many translations are kept around
+        self._item_interner = ItemInterner() if compact_items else None
         self._jsql_service = jsql_service
+        self._max_workers = max(max_workers, 1)
+        # translations are memoized by (sql, clean, anonymize_values, parse_on_clause), the returned dicts are shared
+        # between callers that translate the same SQL so they should not be modified in place
+        self._lru_cache_size = lru_cache_size
+        self._cache = _LRUCache(lru_cache_size)
+        self._deduplicated_count = 0
+        self._instrumentation = instrumentation or JSQLInstrumentation(enabled=False)
 
     @classmethod
-    def create(cls, jsql_service: AbstractJSQLService = None):
+    def create(
+        cls,
+        jsql_service: AbstractJSQLService = None,
+        max_workers: int = 1,
+        cache_path: str = None,
+        lru_cache_size: int = 0,
+        backend: str = "rest",
+        instrumentation: JSQLInstrumentation = None,
+        compact_items: bool = False,
+    ):
         if not jsql_service:
-            jsql_service = RestJSQLService()
-        return cls(jsql_service)
+            if backend == "rest":
+                jsql_service = RestJSQLService(pool_size=max(max_workers, 1), instrumentation=instrumentation)
+            elif backend == "python":
+                jsql_service = PythonJSQLService()
+            else:
+                raise ValueError(f"JSQL backend {backend} is not supported")
+        if cache_path:
+            jsql_service = CachedJSQLService(jsql_service, cache_path)
+        return cls(
+            jsql_service,
+            max_workers=max_workers,
+            lru_cache_size=lru_cache_size,
+            instrumentation=instrumentation,
+            compact_items=compact_items,
+        )
+
+    def _clean_sql(self, sql: str, clean: bool) -> Optional[str]:
+        if not sql:
+            return None
+
+        if clean:
+            sql = preprocess_for_jsql(sql)
+            if not sql:
+                self._instrumentation.record_failure(FAILURE_PREPROCESS)
+                return None
 
-    def _sql_to_json(self, sql: str) -> Optional[Dict]:
         # replace apostrophes with quotes, since otherwise JSQLParser might return errors. Note that this simple replace
         # might cause wrong sql queries (e.g. if there are apostrophes as part of an escaped string), so this should
         # be replaced with a smarter fix
-        sql_to_parse = sql.replace("'", '"')
+        return sql.replace("'", '"')
 
+    def _sql_to_json(self, sql: str) -> Optional[Dict]:
         try:
-            return self._jsql_service.call_jsql(sql_to_parse)
+            with self._instrumentation.timer("jsql_call"):
+                return self._jsql_service.call_jsql(sql)
         except Exception:
             return None
 
     def parse_sql(self, sql: str, clean: bool = True) -> Optional[Dict]:
-        if not sql:
+        try:
+            sql_to_parse = self._clean_sql(sql, clean)
+            if not sql_to_parse:
+                return None
+            return self._sql_to_json(sql_to_parse)
+        except Exception:
             return None
 
+    async def parse_sql_async(self, sql: str, clean: bool = True) -> Optional[Dict]:
         try:
-            if clean:
-                sql = preprocess_for_jsql(sql)
-                if not sql:
-                    return None
-            parsed_sql = self._sql_to_json(sql)
-            return parsed_sql
+            sql_to_parse = self._clean_sql(sql, clean)
+            if not sql_to_parse:
+                return None
+            with self._instrumentation.timer("jsql_call"):
+                return await self._jsql_service.call_jsql_async(sql_to_parse)
         except Exception:
             return None
 
-    # pylint: disable=too-many-branches
-    def _translate_sql(self, sql: str, clean: bool, anonymize_values: bool, parse_on_clause: bool) -> Optional[Dict]:
-        parsed_sql = self.parse_sql(sql, clean)
+    def _call_jsql_batch(self, sql_list: List[str]) -> List[Optional[Dict]]:
+        try:
+            with self._instrumentation.timer("jsql_batch_call"):
+                outputs = self._jsql_service.call_jsql_batch(sql_list)
+        except Exception:
+            return [None] * len(sql_list)
+        return [None if isinstance(output, Exception) else output for output in outputs]
+
+    def parse_sql_batch(self, sql_list: List[str], clean: bool = True) -> List[Optional[Dict]]:
+        sql_to_parse_list: List[Optional[str]] = []
+        for sql in sql_list:
+            try:
+                sql_to_parse_list.append(self._clean_sql(sql, clean))
+            except Exception:
+                sql_to_parse_list.append(None)
+
+        indices = [index for index, sql_to_parse in enumerate(sql_to_parse_list) if sql_to_parse]
+        valid_sql_list = [sql_to_parse_list[index] for index in indices]
+
+        if self._max_workers == 1 or len(valid_sql_list) < 2:
+            outputs = self._call_jsql_batch(valid_sql_list)
+        else:
+            # only the round trips to the JSQL service run concurrently, one batch per worker, and executor.map keeps
+            # the order of the input
+            chunk_size = -(-len(valid_sql_list) // self._max_workers)
+            chunks = [valid_sql_list[start : start + chunk_size] for start in range(0, len(valid_sql_list), chunk_size)]
+            with ThreadPoolExecutor(max_workers=len(chunks)) as executor:
+                outputs = [output for chunk in executor.map(self._call_jsql_batch, chunks) for output in chunk]
+
+        parsed_sql_list: List[Optional[Dict]] = [None] * len(sql_list)
+        for index, output in zip(indices, outputs):
+            parsed_sql_list[index] = output
+        return parsed_sql_list
 
+    def _read_parsed_sql(
+        self, parsed_sql: Optional[Dict], anonymize_values: bool, parse_on_clause: bool
+    ) -> Optional[Dict]:
         if not parsed_sql:
             return None
 
-        parsed_dict = self._jsql_reader.parse_sql_to_parsed_body(
+        with self._instrumentation.timer("jsql_reader"):
+            parsed_dict = self._jsql_reader.parse_sql_to_parsed_body(
+                parsed_sql, anonymize_values=anonymize_values, parse_on_clause=parse_on_clause
+            )
+            return (
+                self._item_interner.intern_parsed_body(parsed_dict) if self._item_interner is not None else parsed_dict
+            )
+
+    def _read_parsed_sql_variants(
+        self, parsed_sql: Optional[Dict], variants: List[Tuple[bool, bool]]
+    ) -> List[Optional[Dict]]:
+        if not parsed_sql:
+            return [None] * len(variants)
+
+        with self._instrumentation.timer("jsql_reader"):
+            parsed_dicts = self._jsql_reader.parse_sql_to_parsed_bodies(parsed_sql, variants)
+            if self._item_interner is not None:
+                parsed_dicts = [self._item_interner.intern_parsed_body(parsed_dict) for parsed_dict in parsed_dicts]
+            return parsed_dicts
+
+    # pylint: disable=too-many-branches
+    def _translate_sql(self, sql: str, clean: bool, anonymize_values: bool, parse_on_clause: bool) -> Optional[Dict]:
+        cache_key = (sql, clean, anonymize_values, parse_on_clause)
+        parsed_dict = self._cache.get(cache_key)
+        if parsed_dict is not _MISSING:
+            return parsed_dict
+
+        parsed_sql = self.parse_sql(sql, clean)
+        parsed_dict = self._read_parsed_sql(
             parsed_sql, anonymize_values=anonymize_values, parse_on_clause=parse_on_clause
         )
-
+        self._cache.put(cache_key, parsed_dict)
         return parsed_dict
 
+    def _get_cached_translations(
+        self, sql_list: List[str], clean: bool, anonymize_values: bool, parse_on_clause: bool
+    ) -> Tuple[Dict[str, Optional[Dict]], List[str]]:
+        # every distinct SQL is looked up once, and only the ones missing from the cache are sent for parsing
+        unique_sql_list = list(dict.fromkeys(sql_list))
+        self._deduplicated_count += len(sql_list) - len(unique_sql_list)
+
+        translated: Dict[str, Optional[Dict]] = {}
+        missing_sql_list: List[str] = []
+        for sql in unique_sql_list:
+            parsed_dict = self._cache.get((sql, clean, anonymize_values, parse_on_clause))
+            if parsed_dict is _MISSING:
+                missing_sql_list.append(sql)
+            else:
+                translated[sql] = parsed_dict
+        return translated, missing_sql_list
+
+    def _add_translations(
+        self,
+        translated: Dict[str, Optional[Dict]],
+        sql_list: List[str],
+        parsed_sql_list: List[Optional[Dict]],
+        clean: bool,
+        anonymize_values: bool,
+        parse_on_clause: bool,
+    ) -> None:
+        for sql, parsed_sql in zip(sql_list, parsed_sql_list):
+            parsed_dict = self._read_parsed_sql(
+                parsed_sql, anonymize_values=anonymize_values, parse_on_clause=parse_on_clause
+            )
+            self._cache.put((sql, clean, anonymize_values, parse_on_clause), parsed_dict)
+            translated[sql] = parsed_dict
+
     def translate(
         self, sql: str, clean: bool = True, anonymize_values: bool = False, parse_on_clause: bool = True
     ) -> Optional[Dict]:
@@ -80,7 +276,86 @@ class JSQLParser:
     def translate_batch(
         self, sql_list: List[str], clean: bool = True, anonymize_values: bool = False, parse_on_clause: bool = True
     ) -> List[Optional[Dict]]:
-        return [
-            self._translate_sql(sql, clean=clean, anonymize_values=anonymize_values, parse_on_clause=parse_on_clause)
-            for sql in sql_list
-        ]
+        translated, missing_sql_list = self._get_cached_translations(sql_list, clean, anonymize_values, parse_on_clause)
+        parsed_sql_list = self.parse_sql_batch(missing_sql_list, clean)
+        self._add_translations(translated, missing_sql_list, parsed_sql_list, clean, anonymize_values, parse_on_clause)
+        return [translated[sql] for sql in sql_list]
+
+    async def translate_batch_async(
+        self,
+        sql_list: List[str],
+        clean: bool = True,
+        anonymize_values: bool = False,
+        parse_on_clause: bool = True,
+        max_in_flight: int = None,
+    ) -> List[Optional[Dict]]:
+        translated, missing_sql_list = self._get_cached_translations(sql_list, clean, anonymize_values, parse_on_clause)
+        semaphore = asyncio.Semaphore(max_in_flight or self._max_workers)
+
+        async def _parse(sql: str) -> Optional[Dict]:
+            async with semaphore:
+                return await self.parse_sql_async(sql, clean)
+
+        parsed_sql_list = await asyncio.gather(*[_parse(sql) for sql in missing_sql_list])
+        self._add_translations(translated, missing_sql_list, parsed_sql_list, clean, anonymize_values, parse_on_clause)
+        return [translated[sql] for sql in sql_list]
+
+    def translate_multi(
+        self,
+        sql_list: List[str],
+        clean: bool = True,
+        anonymize_values: Sequence[bool] = (False, True),
+        parse_on_clause: Sequence[bool] = (True,),
+    ) -> Dict[Tuple[bool, bool], List[Optional[Dict]]]:
+        """
+        Translates the queries for every combination of `anonymize_values` and `parse_on_clause`, sending each
+        distinct query to the JSQL service once and reading its JSON once for all the combinations. Returns the
+        translations (in the order of `sql_list`) of every (anonymize_values, parse_on_clause) variant.
+        """
+        variants = [(anonymize, parse_on) for anonymize in anonymize_values for parse_on in parse_on_clause]
+        unique_sql_list = list(dict.fromkeys(sql_list))
+        self._deduplicated_count += len(sql_list) - len(unique_sql_list)
+
+        translated: Dict[Tuple[bool, bool], Dict[str, Optional[Dict]]] = {variant: {} for variant in variants}
+        missing_sql_list: List[str] = []
+        for sql in unique_sql_list:
+            parsed_dicts = [self._cache.get((sql, clean) + variant) for variant in variants]
+            if any(parsed_dict is _MISSING for parsed_dict in parsed_dicts):
+                missing_sql_list.append(sql)
+                continue
+            for variant, parsed_dict in zip(variants, parsed_dicts):
+                translated[variant][sql] = parsed_dict
+
+        parsed_sql_list = self.parse_sql_batch(missing_sql_list, clean)
+        for sql, parsed_sql in zip(missing_sql_list, parsed_sql_list):
+            for variant, parsed_dict in zip(variants, self._read_parsed_sql_variants(parsed_sql, variants)):
+                self._cache.put((sql, clean) + variant, parsed_dict)
+                translated[variant][sql] = parsed_dict
+
+        return {variant: [translated[variant][sql] for sql in sql_list] for variant in variants}
+
+    def check_health(self) -> bool:
+        return self._jsql_service.check_health()
+
+    def get_short_circuited_count(self) -> int:
+        return self._jsql_service.get_short_circuited_count()
+
+    @property
+    def instrumentation(self) -> JSQLInstrumentation:
+        return self._instrumentation
+
+    def get_instrumentation_stats(self, reset: bool = False) -> Dict[str, float]:
+        return self._instrumentation.get_stats(reset=reset)
+
+    def get_cache_stats(self) -> Dict[str, int]:
+        if self._lru_cache_size <= 0:
+            # without an LRU cache only the duplicates within a batch are saved
+            return {"capacity": 0, "deduplicated": self._deduplicated_count}
+        return {
+            "capacity": self._lru_cache_size,
+            "size": len(self._cache),
+            "hits": self._cache.hits,
+            "misses": self._cache.misses,
+            "evictions": self._cache.evictions,
+            "deduplicated": self._deduplicated_count,
+        }
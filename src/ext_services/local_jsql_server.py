@@ -0,0 +1,97 @@
+import argparse
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+
+from src.ext_services.abstract_jsql_service import AbstractJSQLService
+from src.ext_services.replay_jsql_service import ReplayJSQLService
+
+# what JSQLParser-as-a-Service returns for SQL it can't parse
+ERROR_RESPONSE = {"timestamp": "", "status": 500, "error": "Internal Server Error"}
+
+
+def _create_handler(jsql_service: AbstractJSQLService):
+    class _JSQLRequestHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        @staticmethod
+        def _call(sql: str) -> Dict:
+            output = jsql_service.call_jsql(sql)
+            return output if output is not None else ERROR_RESPONSE
+
+        def _send_json(self, status: int, payload: Dict) -> None:
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        # pylint: disable=invalid-name,broad-except
+        def do_POST(self):
+            request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            if self.path.endswith("/batch"):
+                results = []
+                for sql in request["sqls"]:
+                    try:
+                        results.append({"output": self._call(sql)})
+                    except Exception as exception:
+                        results.append({"error": str(exception)})
+                self._send_json(200, {"results": results})
+                return
+
+            try:
+                self._send_json(200, self._call(request["sql"]))
+            except Exception:
+                self._send_json(500, ERROR_RESPONSE)
+
+        def log_message(self, *args):
+            pass
+
+    return _JSQLRequestHandler
+
+
+class LocalJSQLServer:
+    """
+    A tiny HTTP stand-in for JSQLParser-as-a-Service, answering `/sqltojson` (and the batch protocol of
+    `RestJSQLService`) from any `AbstractJSQLService`, e.g. recorded responses. Runs in a background thread.
+    """
+
+    def __init__(self, jsql_service: AbstractJSQLService, host: str = "localhost", port: int = 0):
+        self._server = ThreadingHTTPServer((host, port), _create_handler(jsql_service))
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def entry_point(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/sqltojson"
+
+    def start(self) -> "LocalJSQLServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self) -> None:
+        self._server.serve_forever()
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "LocalJSQLServer":
+        return self.start()
+
+    def __exit__(self, *args) -> None:
+        self.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--fixtures", type=str, help="JSON file with recorded JSQL responses", required=True)
+    parser.add_argument("--port", type=int, default=8079)
+    args = parser.parse_args()
+
+    local_server = LocalJSQLServer(ReplayJSQLService(args.fixtures), host="0.0.0.0", port=args.port)
+    print(f"Serving recorded JSQL responses on port {args.port}")
+    local_server.serve_forever()
@@ -0,0 +1,701 @@
+# pylint: disable=too-many-return-statements,too-many-branches,too-many-public-methods
+
+from typing import Dict, List, NamedTuple, Optional
+
+from sqlparse import tokens
+from sqlparse.lexer import tokenize
+
+from src.ext_services.abstract_jsql_service import AbstractJSQLService
+
+RESERVED_WORDS = {
+    "ALL",
+    "AND",
+    "APPLY",
+    "AS",
+    "ASC",
+    "BETWEEN",
+    "BY",
+    "CASE",
+    "CROSS",
+    "DESC",
+    "DISTINCT",
+    "ELSE",
+    "END",
+    "ESCAPE",
+    "EXCEPT",
+    "EXISTS",
+    "FETCH",
+    "FROM",
+    "FULL",
+    "GROUP",
+    "HAVING",
+    "ILIKE",
+    "IN",
+    "INNER",
+    "INTERSECT",
+    "INTO",
+    "IS",
+    "JOIN",
+    "LEFT",
+    "LIKE",
+    "LIMIT",
+    "MINUS",
+    "NATURAL",
+    "NOT",
+    "NULL",
+    "OFFSET",
+    "ON",
+    "OPTION",
+    "OR",
+    "ORDER",
+    "OUTER",
+    "OVER",
+    "RIGHT",
+    "SELECT",
+    "THEN",
+    "TOP",
+    "UNION",
+    "USING",
+    "WHEN",
+    "WHERE",
+    "WITH",
+}
+
+# reserved words that are also names of functions, e.g. LEFT(title, 10)
+FUNCTION_WORDS = {"LEFT", "RIGHT"}
+
+COMPARISON_OPERATORS = {"=", "<>", "!=", "<", ">", "<=", ">=", "!<", "!>"}
+ADDITIVE_OPERATORS = {"+", "-", "||", "&", "|", "^"}
+MULTIPLICATIVE_OPERATORS = {"*", "/", "%"}
+SET_OPERATIONS = {"UNION", "EXCEPT", "INTERSECT", "MINUS"}
+
+
+class SQLParseError(Exception):
+    pass
+
+
+class _Token(NamedTuple):
+    kind: str
+    value: str
+
+
+_EOF = _Token("eof", "")
+
+
+def _tokenize(sql: str) -> List[_Token]:
+    sql_tokens: List[_Token] = []
+    for token_type, value in tokenize(sql):
+        if token_type in tokens.Whitespace or token_type in tokens.Comment:
+            continue
+        if token_type in tokens.Error:
+            raise SQLParseError(f"Unexpected character {value}")
+
+        if token_type in tokens.Literal.String.Symbol:
+            sql_tokens.append(_Token("quoted", value))
+        elif token_type in tokens.Literal.String:
+            sql_tokens.append(_Token("string", value))
+        elif token_type in tokens.Literal.Number:
+            # signs are handled by the parser, like JSQLParser does
+            if value[0] in "+-":
+                sql_tokens.append(_Token("op", value[0]))
+                value = value[1:]
+            sql_tokens.append(_Token("number", value))
+        elif token_type in tokens.Name.Placeholder or (token_type in tokens.Name and value.startswith("@")):
+            sql_tokens.append(_Token("param", value))
+        elif token_type in tokens.Punctuation:
+            sql_tokens.append(_Token("punct", value))
+        elif token_type in tokens.Wildcard or (token_type in tokens.Operator and not value[0].isalpha()):
+            sql_tokens.append(_Token("op", value))
+        else:
+            # sqlparse merges keywords like "GROUP BY" or "NOT LIKE" into a single token
+            sql_tokens.extend(_Token("word", word) for word in value.split())
+    return sql_tokens
+
+
+def _table_json(name_parts: List[str]) -> Dict:
+    table = {
+        "name": name_parts[-1],
+        "fullyQualifiedName": ".".join(name_parts),
+        "database": {"fullyQualifiedName": name_parts[-3] if len(name_parts) > 2 else ""},
+    }
+    if len(name_parts) > 1:
+        table["schemaName"] = name_parts[-2]
+    return table
+
+
+def _binary_json(left: Dict, right: Dict, string_expression: str) -> Dict:
+    return {"leftExpression": left, "rightExpression": right, "stringExpression": string_expression}
+
+
+class _SQLToJSQLParser:
+    """
+    Recursive descent parser for SELECT statements, on top of the sqlparse lexer. It emits the subset of the JSON
+    returned by JSQLParser-as-a-Service that `JSQLReader` reads, with the same structure (e.g. parenthesis, NOT and
+    signed expressions are wrapped the same way JSQLParser wraps them).
+    """
+
+    def __init__(self, sql: str):
+        self._tokens = _tokenize(sql)
+        self._position = 0
+
+    def _peek(self, offset: int = 0) -> _Token:
+        position = self._position + offset
+        return self._tokens[position] if position < len(self._tokens) else _EOF
+
+    def _next(self) -> _Token:
+        token = self._peek()
+        if token is _EOF:
+            raise SQLParseError("Unexpected end of query")
+        self._position += 1
+        return token
+
+    def _is_word(self, *words: str, offset: int = 0) -> bool:
+        token = self._peek(offset)
+        return token.kind == "word" and token.value.upper() in words
+
+    def _is_punct(self, punct: str, offset: int = 0) -> bool:
+        token = self._peek(offset)
+        return token.kind == "punct" and token.value == punct
+
+    def _is_op(self, *operators: str, offset: int = 0) -> bool:
+        token = self._peek(offset)
+        return token.kind == "op" and token.value in operators
+
+    def _accept_word(self, *words: str) -> bool:
+        if self._is_word(*words):
+            self._position += 1
+            return True
+        return False
+
+    def _accept_punct(self, punct: str) -> bool:
+        if self._is_punct(punct):
+            self._position += 1
+            return True
+        return False
+
+    def _expect_word(self, *words: str) -> None:
+        if not self._accept_word(*words):
+            raise SQLParseError(f"Expected {' or '.join(words)} but got {self._peek().value}")
+
+    def _expect_punct(self, punct: str) -> None:
+        if not self._accept_punct(punct):
+            raise SQLParseError(f"Expected {punct} but got {self._peek().value}")
+
+    def _is_identifier(self, offset: int = 0) -> bool:
+        token = self._peek(offset)
+        return token.kind == "quoted" or (token.kind == "word" and token.value.upper() not in RESERVED_WORDS)
+
+    def _is_select_start(self, offset: int = 0) -> bool:
+        if self._is_word("SELECT", "WITH", offset=offset):
+            return True
+        return self._is_punct("(", offset=offset) and self._is_select_start(offset + 1)
+
+    def _skip_parenthesis(self) -> None:
+        self._expect_punct("(")
+        depth = 1
+        while depth > 0:
+            token = self._next()
+            if token.kind == "punct" and token.value == "(":
+                depth += 1
+            elif token.kind == "punct" and token.value == ")":
+                depth -= 1
+
+    def parse(self) -> Dict:
+        select = self._parse_select()
+        self._accept_punct(";")
+        if self._peek() is not _EOF:
+            raise SQLParseError(f"Unexpected {self._peek().value}")
+        return select
+
+    def _parse_select(self) -> Dict:
+        with_items = []
+        if self._accept_word("WITH"):
+            with_items.append(self._parse_with_item())
+            while self._accept_punct(","):
+                with_items.append(self._parse_with_item())
+
+        select = {"selectBody": self._parse_set_operation_list()}
+        if with_items:
+            select["withItemsList"] = with_items
+        return select
+
+    def _parse_with_item(self) -> Dict:
+        name = self._parse_identifier()
+        if self._is_punct("("):
+            self._skip_parenthesis()
+        self._expect_word("AS")
+        self._expect_punct("(")
+        select = self._parse_select()
+        self._expect_punct(")")
+        return {"name": name, "selectBody": select["selectBody"], "recursive": False}
+
+    def _parse_set_operation_list(self) -> Dict:
+        selects = [self._parse_select_term()]
+        while self._is_word(*SET_OPERATIONS):
+            self._next()
+            self._accept_word("ALL", "DISTINCT")
+            selects.append(self._parse_select_term())
+
+        if len(selects) == 1:
+            return selects[0]
+        return {"selects": selects}
+
+    def _parse_select_term(self) -> Dict:
+        if self._accept_punct("("):
+            select_body = self._parse_set_operation_list()
+            self._expect_punct(")")
+            return select_body
+        return self._parse_plain_select()
+
+    def _parse_plain_select(self) -> Dict:
+        self._expect_word("SELECT")
+        body: Dict = {}
+
+        while self._is_word("DISTINCT", "ALL", "TOP"):
+            if self._is_word("TOP"):
+                body["top"] = self._parse_top()
+            else:
+                self._next()
+
+        body["selectItems"] = self._parse_select_items()
+
+        if self._accept_word("INTO"):
+            self._parse_qualified_name()
+
+        if self._accept_word("FROM"):
+            body["fromItem"] = self._parse_from_item()
+            joins = self._parse_joins()
+            if joins:
+                body["joins"] = joins
+
+        if self._accept_word("WHERE"):
+            body["where"] = self._parse_expression()
+
+        if self._is_word("GROUP") and self._is_word("BY", offset=1):
+            self._position += 2
+            body["groupBy"] = {"groupByExpressions": self._parse_expression_list()}
+
+        if self._accept_word("HAVING"):
+            body["having"] = self._parse_expression()
+
+        if self._is_word("ORDER") and self._is_word("BY", offset=1):
+            self._position += 2
+            body["orderByElements"] = self._parse_order_by_elements()
+
+        self._parse_limit(body)
+
+        if self._accept_word("OPTION"):
+            self._skip_parenthesis()
+
+        return body
+
+    def _parse_top(self) -> Dict:
+        self._expect_word("TOP")
+        if self._accept_punct("("):
+            expression = self._parse_expression()
+            self._expect_punct(")")
+        else:
+            expression = self._parse_primary()
+        top = {"expression": expression, "percentage": self._accept_word("PERCENT"), "withTies": False}
+        if self._is_word("WITH") and self._is_word("TIES", offset=1):
+            self._position += 2
+            top["withTies"] = True
+        return top
+
+    def _parse_limit(self, body: Dict) -> None:
+        if self._accept_word("LIMIT"):
+            row_count = self._parse_primary()
+            if self._accept_punct(","):
+                row_count = self._parse_primary()
+            elif self._accept_word("OFFSET"):
+                self._parse_primary()
+            body["limit"] = {"rowCount": row_count}
+
+        if self._accept_word("OFFSET"):
+            self._parse_primary()
+            self._accept_word("ROW", "ROWS")
+            if self._accept_word("FETCH"):
+                self._expect_word("FIRST", "NEXT")
+                self._parse_primary()
+                self._expect_word("ROW", "ROWS")
+                self._expect_word("ONLY")
+
+    def _parse_select_items(self) -> List[Dict]:
+        select_items = [self._parse_select_item()]
+        while self._accept_punct(","):
+            select_items.append(self._parse_select_item())
+        return select_items
+
+    def _parse_select_item(self) -> Dict:
+        # JSQLReader expects "select *" items to have a single key
+        if self._is_op("*"):
+            self._next()
+            return {"allColumns": True}
+
+        name_end = self._position
+        while self._is_identifier(name_end - self._position) and self._is_punct(".", name_end - self._position + 1):
+            name_end += 2
+        if name_end > self._position and self._is_op("*", offset=name_end - self._position):
+            name_parts = self._parse_qualified_name(allow_star=True)
+            return {"table": _table_json(name_parts[:-1])}
+
+        # unlike the other nodes, the alias is kept even when missing, since JSQLReader tells the items apart by their
+        # number of keys
+        return {"expression": self._parse_expression(), "alias": self._parse_alias()}
+
+    def _parse_alias(self) -> Optional[Dict]:
+        if self._accept_word("AS"):
+            return {"name": self._next().value, "useAs": True}
+        if self._is_identifier() or self._peek().kind == "string":
+            return {"name": self._next().value, "useAs": False}
+        return None
+
+    def _parse_identifier(self) -> str:
+        if not self._is_identifier():
+            raise SQLParseError(f"Expected a name but got {self._peek().value}")
+        return self._next().value
+
+    def _parse_qualified_name(self, allow_star: bool = False) -> List[str]:
+        name_parts = [self._parse_identifier()]
+        while self._is_punct("."):
+            self._next()
+            if allow_star and self._is_op("*"):
+                name_parts.append(self._next().value)
+                break
+            # T-SQL allows skipping the schema, e.g. db..table
+            if self._is_punct("."):
+                name_parts.append("")
+                continue
+            name_parts.append(self._parse_identifier())
+        return name_parts
+
+    def _parse_from_item(self) -> Dict:
+        if self._is_select_start():
+            self._expect_punct("(")
+            select = self._parse_select()
+            self._expect_punct(")")
+            from_item = {"selectBody": select["selectBody"], "useBrackets": True}
+            if "withItemsList" in select:
+                from_item["withItemsList"] = select["withItemsList"]
+        else:
+            name_parts = self._parse_qualified_name()
+            if self._is_punct("("):
+                from_item = {"function": self._parse_function(".".join(name_parts))}
+            else:
+                from_item = _table_json(name_parts)
+
+        alias = self._parse_alias()
+        if alias:
+            from_item["alias"] = alias
+
+        # table hints, e.g. WITH (NOLOCK)
+        if self._is_word("WITH") and self._is_punct("(", offset=1):
+            self._next()
+            self._skip_parenthesis()
+
+        return from_item
+
+    def _parse_joins(self) -> List[Dict]:
+        joins = []
+        while True:
+            if self._accept_punct(","):
+                joins.append({"rightItem": self._parse_from_item(), "simple": True})
+                continue
+
+            if not self._is_word("JOIN", "INNER", "LEFT", "RIGHT", "FULL", "OUTER", "CROSS", "NATURAL"):
+                return joins
+
+            join: Dict = {}
+            while self._is_word("INNER", "LEFT", "RIGHT", "FULL", "OUTER", "CROSS", "NATURAL"):
+                join[self._next().value.lower()] = True
+            if not self._accept_word("APPLY"):
+                self._expect_word("JOIN")
+
+            join["rightItem"] = self._parse_from_item()
+            if self._accept_word("ON"):
+                join["onExpression"] = self._parse_expression()
+            elif self._accept_word("USING"):
+                self._expect_punct("(")
+                join["usingColumns"] = [{"columnName": name} for name in self._parse_identifier_list()]
+                self._expect_punct(")")
+            joins.append(join)
+
+    def _parse_identifier_list(self) -> List[str]:
+        identifiers = [self._parse_identifier()]
+        while self._accept_punct(","):
+            identifiers.append(self._parse_identifier())
+        return identifiers
+
+    def _parse_order_by_elements(self) -> List[Dict]:
+        order_by_elements = []
+        while True:
+            order_by_element = {"expression": self._parse_expression(), "asc": True, "ascDescPresent": False}
+            if self._is_word("ASC", "DESC"):
+                order_by_element["asc"] = self._next().value.upper() == "ASC"
+                order_by_element["ascDescPresent"] = True
+            if self._accept_word("NULLS"):
+                self._expect_word("FIRST", "LAST")
+            order_by_elements.append(order_by_element)
+            if not self._accept_punct(","):
+                return order_by_elements
+
+    def _parse_expression_list(self) -> List[Dict]:
+        expressions = [self._parse_expression()]
+        while self._accept_punct(","):
+            expressions.append(self._parse_expression())
+        return expressions
+
+    def _parse_expression(self) -> Dict:
+        left = self._parse_and()
+        while self._accept_word("OR"):
+            left = _binary_json(left, self._parse_and(), "OR")
+        return left
+
+    def _parse_and(self) -> Dict:
+        left = self._parse_not()
+        while self._accept_word("AND"):
+            left = _binary_json(left, self._parse_not(), "AND")
+        return left
+
+    def _parse_not(self) -> Dict:
+        if self._accept_word("NOT"):
+            return {"expression": self._parse_not(), "exclamationMark": False}
+        return self._parse_condition()
+
+    def _parse_condition(self) -> Dict:
+        if self._accept_word("EXISTS"):
+            return {"rightExpression": self._parse_primary(), "not": False, "stringExpression": "EXISTS"}
+
+        left = self._parse_additive()
+
+        if self._peek().kind == "op" and self._peek().value in COMPARISON_OPERATORS:
+            operator = self._next().value
+            return _binary_json(left, self._parse_additive(), operator)
+
+        if self._accept_word("IS"):
+            is_not = self._accept_word("NOT")
+            self._expect_word("NULL")
+            return {"leftExpression": left, "not": is_not, "useIsNull": False}
+
+        is_not = False
+        if self._is_word("NOT") and self._is_word("LIKE", "ILIKE", "IN", "BETWEEN", offset=1):
+            self._next()
+            is_not = True
+
+        if self._is_word("LIKE", "ILIKE"):
+            case_insensitive = self._next().value.upper() == "ILIKE"
+            like = _binary_json(left, self._parse_additive(), "ILIKE" if case_insensitive else "LIKE")
+            like["not"] = is_not
+            if self._accept_word("ESCAPE"):
+                self._parse_primary()
+            return like
+
+        if self._accept_word("IN"):
+            return {"leftExpression": left, "rightItemsList": self._parse_in_items(), "not": is_not}
+
+        if self._accept_word("BETWEEN"):
+            start = self._parse_additive()
+            self._expect_word("AND")
+            end = self._parse_additive()
+            return {
+                "leftExpression": left,
+                "betweenExpressionStart": start,
+                "betweenExpressionEnd": end,
+                "not": is_not,
+            }
+
+        return left
+
+    def _parse_in_items(self) -> Dict:
+        if self._is_select_start():
+            return self._parse_primary()
+        self._expect_punct("(")
+        expressions = self._parse_expression_list()
+        self._expect_punct(")")
+        return {"expressions": expressions}
+
+    def _parse_additive(self) -> Dict:
+        left = self._parse_multiplicative()
+        while self._peek().kind == "op" and self._peek().value in ADDITIVE_OPERATORS:
+            operator = self._next().value
+            left = _binary_json(left, self._parse_multiplicative(), operator)
+        return left
+
+    def _parse_multiplicative(self) -> Dict:
+        left = self._parse_unary()
+        while self._peek().kind == "op" and self._peek().value in MULTIPLICATIVE_OPERATORS:
+            operator = self._next().value
+            left = _binary_json(left, self._parse_unary(), operator)
+        return left
+
+    def _parse_unary(self) -> Dict:
+        if self._is_op("-", "+", "~"):
+            sign = self._next().value
+            return {"sign": sign, "expression": self._parse_unary()}
+        return self._parse_primary()
+
+    def _parse_primary(self) -> Dict:
+        token = self._peek()
+
+        if token.kind == "number":
+            self._next()
+            if token.value.isdigit():
+                return {"value": int(token.value), "stringValue": token.value}
+            try:
+                return {"value": float(token.value)}
+            except ValueError:
+                return {"value": token.value, "stringValue": token.value}
+
+        if token.kind == "string":
+            self._next()
+            return {"value": token.value[1:-1]}
+
+        if token.kind == "param":
+            self._next()
+            if token.value.startswith("@"):
+                return {"name": token.value.lstrip("@"), "doubleAdd": token.value.startswith("@@")}
+            if token.value == "?":
+                return {"useFixedIndex": False}
+            return {"name": token.value.lstrip(":")}
+
+        if token.kind == "punct" and token.value == "(":
+            if self._is_select_start():
+                self._next()
+                select = self._parse_select()
+                self._expect_punct(")")
+                sub_select = {"selectBody": select["selectBody"], "useBrackets": True}
+                if "withItemsList" in select:
+                    sub_select["withItemsList"] = select["withItemsList"]
+                return sub_select
+            self._next()
+            expression = self._parse_expression()
+            self._expect_punct(")")
+            return {"expression": expression}
+
+        if self._is_word("CASE"):
+            return self._parse_case()
+
+        if self._is_word("CAST") and self._is_punct("(", offset=1):
+            return self._parse_cast()
+
+        if self._accept_word("NULL"):
+            return {}
+
+        if self._is_word(*FUNCTION_WORDS) and self._is_punct("(", offset=1):
+            return self._parse_function(self._next().value)
+
+        if self._is_identifier():
+            name_parts = self._parse_qualified_name()
+            if self._is_punct("("):
+                return self._parse_function(".".join(name_parts))
+            column = {"columnName": name_parts[-1]}
+            if len(name_parts) > 1:
+                column["table"] = _table_json(name_parts[:-1])
+            return column
+
+        raise SQLParseError(f"Unexpected {token.value}")
+
+    def _parse_function(self, name: str) -> Dict:
+        function: Dict = {"name": name, "allColumns": False, "distinct": False}
+        self._expect_punct("(")
+        if self._is_op("*"):
+            self._next()
+            function["allColumns"] = True
+        elif not self._is_punct(")"):
+            if self._accept_word("DISTINCT"):
+                function["distinct"] = True
+            self._accept_word("ALL")
+            function["parameters"] = {"expressions": self._parse_expression_list()}
+        self._expect_punct(")")
+
+        if self._is_word("WITHIN") and self._is_word("GROUP", offset=1):
+            self._position += 2
+            self._skip_parenthesis()
+
+        if self._accept_word("OVER"):
+            return self._parse_analytic_expression(function)
+
+        return function
+
+    def _parse_analytic_expression(self, function: Dict) -> Dict:
+        analytic_expression = {
+            "name": function["name"],
+            "type": "OVER",
+            "allColumns": function["allColumns"],
+            "distinct": function["distinct"],
+        }
+        parameters = function.get("parameters", {}).get("expressions", [])
+        if parameters:
+            analytic_expression["expression"] = parameters[0]
+
+        self._expect_punct("(")
+        if self._is_word("PARTITION") and self._is_word("BY", offset=1):
+            self._position += 2
+            analytic_expression["partitionExpressionList"] = {"expressions": self._parse_expression_list()}
+        if self._is_word("ORDER") and self._is_word("BY", offset=1):
+            self._position += 2
+            analytic_expression["orderByElements"] = self._parse_order_by_elements()
+        # window frames like ROWS BETWEEN UNBOUNDED PRECEDING AND CURRENT ROW are not used by JSQLReader
+        while not self._is_punct(")"):
+            if self._is_punct("("):
+                self._skip_parenthesis()
+            else:
+                self._next()
+        self._expect_punct(")")
+
+        return analytic_expression
+
+    def _parse_case(self) -> Dict:
+        self._expect_word("CASE")
+        case_expression: Dict = {}
+        if not self._is_word("WHEN"):
+            case_expression["switchExpression"] = self._parse_expression()
+
+        when_clauses = []
+        while self._accept_word("WHEN"):
+            when_expression = self._parse_expression()
+            self._expect_word("THEN")
+            when_clauses.append({"whenExpression": when_expression, "thenExpression": self._parse_expression()})
+        if not when_clauses:
+            raise SQLParseError("CASE without WHEN")
+        case_expression["whenClauses"] = when_clauses
+
+        if self._accept_word("ELSE"):
+            case_expression["elseExpression"] = self._parse_expression()
+        self._expect_word("END")
+        return case_expression
+
+    def _parse_cast(self) -> Dict:
+        self._expect_word("CAST")
+        self._expect_punct("(")
+        expression = self._parse_expression()
+        self._expect_word("AS")
+        data_type_words = []
+        while self._peek().kind == "word":
+            data_type_words.append(self._next().value)
+        if not data_type_words:
+            raise SQLParseError(f"Expected a data type but got {self._peek().value}")
+        data_type: Dict = {"dataType": " ".join(data_type_words)}
+        if self._accept_punct("("):
+            arguments = [self._next().value]
+            while self._accept_punct(","):
+                arguments.append(self._next().value)
+            self._expect_punct(")")
+            data_type["argumentsStringList"] = arguments
+        self._expect_punct(")")
+        return {"leftExpression": expression, "type": data_type, "useCastKeyword": True}
+
+
+class PythonJSQLService(AbstractJSQLService):
+    """
+    In-process replacement for JSQLParser-as-a-Service, parsing SELECT statements in Python (with the sqlparse lexer)
+    into the part of the JSQLParser JSON that `JSQLReader` uses. Like the service, returns None for SQL it can't parse.
+    """
+
+    PARSER_VERSION = "python-jsql-service-1"
+
+    def call_jsql(self, sql: str) -> Optional[Dict]:
+        try:
+            return _SQLToJSQLParser(sql).parse()
+        except (SQLParseError, RecursionError):
+            return None
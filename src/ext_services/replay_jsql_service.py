@@ -0,0 +1,44 @@
+import json
+import os
+import threading
+from typing import Dict, Optional
+
+from src.ext_services.abstract_jsql_service import AbstractJSQLService, JSQLServiceError
+
+
+class ReplayJSQLService(AbstractJSQLService):
+    """
+    Serves JSQL responses recorded in a JSON fixture file (a dict from the SQL sent to the service to its response).
+    When created with a `recorded_service`, queries missing from the fixtures are sent to that service and the
+    responses are added to the fixture file, so the fixtures can be recorded once against the real service.
+    """
+
+    def __init__(self, fixtures_path: str, recorded_service: AbstractJSQLService = None):
+        self._fixtures_path = fixtures_path
+        self._recorded_service = recorded_service
+        self._lock = threading.Lock()
+
+        self._responses: Dict[str, Optional[Dict]] = {}
+        if os.path.exists(fixtures_path):
+            with open(fixtures_path) as in_fp:
+                self._responses = json.load(in_fp)
+
+    def call_jsql(self, sql: str) -> Optional[Dict]:
+        if sql in self._responses:
+            return self._responses[sql]
+
+        if not self._recorded_service:
+            raise JSQLServiceError(f"No recorded JSQL response for: {sql}")
+
+        output = self._recorded_service.call_jsql(sql)
+        with self._lock:
+            self._responses[sql] = output
+            self.save()
+        return output
+
+    def check_health(self) -> bool:
+        return self._recorded_service.check_health() if self._recorded_service else True
+
+    def save(self) -> None:
+        with open(self._fixtures_path, "w") as out_fp:
+            json.dump(self._responses, out_fp, indent=1, sort_keys=True)
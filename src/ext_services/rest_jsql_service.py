@@ -1,21 +1,211 @@
+import asyncio
 import http
-from typing import Optional, Dict
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, List
 
 import requests
+from requests.adapters import HTTPAdapter
 
-from src.ext_services.abstract_jsql_service import AbstractJSQLService
+from src.ext_services.abstract_jsql_service import (
+    AbstractJSQLService,
+    JSQLBatchItem,
+    JSQLServiceError,
+    JSQLCircuitOpenError,
+    HEALTH_CHECK_SQL,
+)
+from src.ext_services.circuit_breaker import CircuitBreaker
+from src.ext_services.jsql_instrumentation import (
+    JSQLInstrumentation,
+    FAILURE_CONNECTION_ERROR,
+    FAILURE_ERROR_PAYLOAD,
+    FAILURE_HTTP_ERROR,
+    FAILURE_SHORT_CIRCUITED,
+    FAILURE_TIMEOUT,
+)
 
+DEFAULT_ENTRY_POINT = "http://localhost:8079/sqltojson"
+RETRY_STATUS_CODES = frozenset([502, 503, 504])
+BATCH_NOT_SUPPORTED_STATUS_CODES = frozenset([404, 405, 501])
 
+
+# pylint: disable=too-many-arguments
 class RestJSQLService(AbstractJSQLService):
-    def __init__(self):
-        self._entry_point = "http://localhost:8079/sqltojson"
+    def __init__(
+        self,
+        entry_point: str = DEFAULT_ENTRY_POINT,
+        pool_size: int = 10,
+        timeout: float = 3.0,
+        max_retries: int = 0,
+        backoff_factor: float = 0.0,
+        batch_entry_point: str = None,
+        max_batch_size: int = 100,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        instrumentation: JSQLInstrumentation = None,
+    ):
+        self._entry_point = entry_point
+        self._batch_entry_point = batch_entry_point or f"{entry_point}/batch"
+        self._max_batch_size = max_batch_size
+        # unknown until the first batch call, older services don't have the batch endpoint
+        self._batch_supported: Optional[bool] = None
+        self._timeout = timeout
+        self._max_retries = max_retries
+        self._backoff_factor = backoff_factor
+        # when the service is down, calls fail fast instead of each one waiting for the timeout
+        self._circuit_breaker = CircuitBreaker(failure_threshold=failure_threshold, reset_timeout=reset_timeout)
+        self._instrumentation = instrumentation or JSQLInstrumentation(enabled=False)
+
+        # a single session keeps the TCP connections to the service alive between calls, instead of opening a new
+        # connection (and paying for the handshake) for every parsed query
+        self._session = requests.Session()
+        self._session.headers.update({"Connection": "keep-alive"})
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+
+        # async calls get their own executor sized like the connection pool, so they never wait for a free connection
+        # and don't compete with other users of the event loop's default executor
+        self._async_executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="jsql")
+
+    def _post(self, url: str, json_body: Dict) -> requests.Response:
+        if not self._circuit_breaker.allow_request():
+            self._instrumentation.record_failure(FAILURE_SHORT_CIRCUITED)
+            raise JSQLCircuitOpenError(f"JSQL service at {url} is unavailable")
+
+        try:
+            response = self._post_with_retries(url, json_body)
+        except Exception:
+            # whatever failed, a half-open circuit must not keep its probe slot taken
+            self._circuit_breaker.record_failure()
+            raise
+
+        # only the gateway / unavailable errors mean the service is down, a 500 is an answer about the query itself
+        # (e.g. an error payload for SQL it could not parse), so a batch of invalid predictions does not open the circuit
+        if response.status_code in RETRY_STATUS_CODES:
+            self._circuit_breaker.record_failure()
+        else:
+            self._circuit_breaker.record_success()
+        return response
+
+    def _post_with_retries(self, url: str, json_body: Dict) -> requests.Response:
+        attempt = 0
+        while True:
+            try:
+                response = self._send(url, json_body)
+                if response.status_code not in RETRY_STATUS_CODES or attempt >= self._max_retries:
+                    return response
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt >= self._max_retries:
+                    raise
+            time.sleep(self._backoff_factor * (2 ** attempt))
+            attempt += 1
+
+    def _send(self, url: str, json_body: Dict) -> requests.Response:
+        start = time.perf_counter()
+        try:
+            response = self._session.post(url, json=json_body, timeout=self._timeout)
+        except requests.Timeout:
+            self._instrumentation.record_failure(FAILURE_TIMEOUT)
+            raise
+        except requests.ConnectionError:
+            self._instrumentation.record_failure(FAILURE_CONNECTION_ERROR)
+            raise
+
+        if self._instrumentation.enabled:
+            self._instrumentation.record_latency("jsql_http", time.perf_counter() - start)
+            self._instrumentation.record_payload_size("jsql_request", len(response.request.body or b""))
+            self._instrumentation.record_payload_size("jsql_response", len(response.content))
+            if response.status_code != http.HTTPStatus.OK:
+                self._instrumentation.record_failure(FAILURE_HTTP_ERROR)
+        return response
+
+    def _read_output(self, output: Optional[Dict]) -> Optional[Dict]:
+        # the service returns an error payload (with a timestamp) for SQL it could not parse
+        if output is None or "timestamp" in output.keys():
+            self._instrumentation.record_failure(FAILURE_ERROR_PAYLOAD)
+            return None
+        return output
 
     def call_jsql(self, sql: str) -> Optional[Dict]:
-        response = requests.post(self._entry_point, json={"sql": sql}, timeout=3)
+        response = self._post(self._entry_point, {"sql": sql})
         if response.status_code != http.HTTPStatus.OK:
-            raise Exception("")
-        output = response.json()
-        if "timestamp" not in output.keys():
-            return output
-        else:
+            raise JSQLServiceError(f"JSQL service returned HTTP {response.status_code}")
+        return self._read_output(response.json())
+
+    def _call_batch_endpoint(self, sql_list: List[str]) -> Optional[List[JSQLBatchItem]]:
+        """
+        Batch protocol: POST {"sqls": [sql, ...]} returns {"results": [item, ...]} in the same order, where every item
+        is either {"output": <parsed JSON>} or {"error": <message>}. Returns None if the service has no batch endpoint.
+        """
+        try:
+            response = self._post(self._batch_entry_point, {"sqls": sql_list})
+        except (requests.ConnectionError, requests.Timeout, JSQLCircuitOpenError) as exception:
+            return [exception] * len(sql_list)
+
+        if response.status_code in BATCH_NOT_SUPPORTED_STATUS_CODES:
+            self._batch_supported = False
             return None
+        if response.status_code != http.HTTPStatus.OK:
+            return [JSQLServiceError(f"JSQL service returned HTTP {response.status_code}")] * len(sql_list)
+        self._batch_supported = True
+
+        results = response.json()["results"]
+        if len(results) != len(sql_list):
+            return [JSQLServiceError("JSQL service returned a wrong number of results")] * len(sql_list)
+
+        outputs: List[JSQLBatchItem] = []
+        for result in results:
+            if "error" in result:
+                outputs.append(JSQLServiceError(result["error"]))
+            else:
+                outputs.append(self._read_output(result.get("output")))
+        return outputs
+
+    def call_jsql_batch(self, sql_list: List[str]) -> List[JSQLBatchItem]:
+        outputs: List[JSQLBatchItem] = []
+        while self._batch_supported is not False and len(outputs) < len(sql_list):
+            batch_outputs = self._call_batch_endpoint(sql_list[len(outputs) : len(outputs) + self._max_batch_size])
+            if batch_outputs is not None:
+                outputs.extend(batch_outputs)
+
+        # fall back to a call per query for whatever is left when the service does not support batches
+        return outputs + super().call_jsql_batch(sql_list[len(outputs) :])
+
+    async def call_jsql_async(self, sql: str) -> Optional[Dict]:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._async_executor, self.call_jsql, sql)
+
+    def check_health(self) -> bool:
+        # bypasses the circuit breaker, so it can also be used to check whether a service that was down is back
+        try:
+            response = self._session.post(self._entry_point, json={"sql": HEALTH_CHECK_SQL}, timeout=self._timeout)
+        except requests.RequestException:
+            # any failure of the probe (connection, timeout, broken response, bad URL) means the service is unhealthy
+            self._circuit_breaker.record_failure()
+            return False
+
+        if response.status_code != http.HTTPStatus.OK:
+            self._circuit_breaker.record_failure()
+            return False
+        self._circuit_breaker.record_success()
+        return True
+
+    def get_short_circuited_count(self) -> int:
+        return self._circuit_breaker.get_stats()["short_circuited"]
+
+    def get_connection_stats(self) -> Dict[str, int]:
+        # urllib3 counts every request sent through the pool and every new connection it had to open, so all the
+        # other requests were sent over an already open (kept alive) connection
+        pools = self._session.get_adapter(self._entry_point).poolmanager.pools
+        num_requests = sum(pools[key].num_requests for key in pools.keys())
+        num_connections = sum(pools[key].num_connections for key in pools.keys())
+        return {
+            "requests": num_requests,
+            "new_connections": num_connections,
+            "reused_connections": max(num_requests - num_connections, 0),
+        }
+
+    def close(self) -> None:
+        self._async_executor.shutdown(wait=False)
+        self._session.close()
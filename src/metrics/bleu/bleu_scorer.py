@@ -1,31 +1,97 @@
+from argparse import Namespace
 from typing import Dict, List
 
-from sacrebleu import corpus_bleu
+from sacrebleu import corpus_bleu, DEFAULT_TOKENIZER
+from sacrebleu.metrics import BLEU
 
-from metrics.abstract_scorer import AbstractScorer
+from src.metrics.abstract_scorer import AbstractScorer
 
 
 class BleuScorer(AbstractScorer):
-    def __init__(self, lowercase: bool = True):
+    """
+    Corpus BLEU of sacrebleu. With `incremental`, the lines are not kept: every call adds their sufficient statistics
+    (n-gram matches and totals, hypothesis and reference lengths) and get_metric computes BLEU from them, instead of
+    running corpus_bleu over all the lines so far, which AllenNLP does after every batch.
+    """
+
+    def __init__(self, lowercase: bool = True, incremental: bool = False):
         self._predicted_lines: List[str] = []
         self._target_lines: List[str] = []
         self._lowercase = lowercase
+        self._incremental = incremental
+        # the same settings corpus_bleu uses by default
+        self._bleu = BLEU(
+            Namespace(
+                smooth_method="exp",
+                smooth_value=None,
+                force=False,
+                short=False,
+                lc=lowercase,
+                tokenize=DEFAULT_TOKENIZER,
+            )
+        )
+        self._correct = [0] * BLEU.NGRAM_ORDER
+        self._total = [0] * BLEU.NGRAM_ORDER
+        self._sys_len = 0
+        self._ref_len = 0
 
     # pylint: disable=no-self-use
     def get_name(self) -> str:
         return "bleu"
 
     def __call__(self, pred_lns: List[str], tgt_lns: List[str]) -> None:
-        self._predicted_lines.extend(pred_lns)
-        self._target_lines.extend(tgt_lns)
+        if not self._incremental:
+            self._predicted_lines.extend(pred_lns)
+            self._target_lines.extend(tgt_lns)
+            return
+
+        assert len(pred_lns) == len(tgt_lns)
+        for predicted_line, target_line in zip(pred_lns, tgt_lns):
+            self._add_statistics(predicted_line, target_line)
+
+    def _add_statistics(self, predicted_line: str, target_line: str) -> None:
+        # the loop of BLEU.corpus_score for a single reference
+        if target_line is None or target_line == "":
+            raise EOFError("No valid references for a sentence!")
+        if self._lowercase:
+            predicted_line = predicted_line.lower()
+            target_line = target_line.lower()
+        output = self._bleu.tokenizer(predicted_line.rstrip())
+        reference = self._bleu.tokenizer(target_line.rstrip())
+
+        output_len = len(output.split())
+        ref_ngrams, _, closest_len = BLEU.reference_stats([reference], output_len)
+        self._sys_len += output_len
+        self._ref_len += closest_len
+
+        sys_ngrams = BLEU.extract_ngrams(output)
+        for ngram, count in sys_ngrams.items():
+            order = len(ngram.split())
+            self._correct[order - 1] += min(count, ref_ngrams.get(ngram, 0))
+            self._total[order - 1] += count
 
     def reset(self) -> None:
         self._predicted_lines = []
         self._target_lines = []
+        self._correct = [0] * BLEU.NGRAM_ORDER
+        self._total = [0] * BLEU.NGRAM_ORDER
+        self._sys_len = 0
+        self._ref_len = 0
 
     def get_metric(self, reset: bool = False) -> Dict[str, float]:
-        assert len(self._predicted_lines) == len(self._target_lines)
-        bleu = round(corpus_bleu(self._predicted_lines, [self._target_lines], lowercase=self._lowercase).score, 4)
+        if self._incremental:
+            score = BLEU.compute_bleu(
+                self._correct,
+                self._total,
+                self._sys_len,
+                self._ref_len,
+                smooth_method=self._bleu.smooth_method,
+                smooth_value=self._bleu.smooth_value,
+            )
+        else:
+            assert len(self._predicted_lines) == len(self._target_lines)
+            score = corpus_bleu(self._predicted_lines, [self._target_lines], lowercase=self._lowercase)
+        bleu = round(score.score, 4)
         if reset:
             self.reset()
 
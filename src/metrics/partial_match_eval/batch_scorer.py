@@ -0,0 +1,155 @@
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from src.metrics.partial_match_eval.evaluate import CLAUSES, calculate_clause_scores
+
+# status of a gold/predicted pair
+SCORED = 0
+JSQL_ERROR = 1  # the pair is left out, like the "JSQLError" scores of evaluate
+INVALID_PREDICTION = 2  # the prediction could not be parsed and invalid SQL is punished, its scores are 0
+
+
+class BatchScores:
+    """
+    Partial match scores of a batch of gold/predicted pairs, calculated once for both PCM-F1 and PCM-EM.
+    `precision`, `recall` and `f1` have a row per pair and a column per clause of CLAUSES, with NaN for the clauses
+    that are not scored (empty in both queries), and `status` tells which pairs count. `seconds` is the time spent
+    scoring every pair.
+    """
+
+    # pylint: disable=too-many-arguments
+    def __init__(
+        self, precision: np.ndarray, recall: np.ndarray, f1: np.ndarray, status: np.ndarray, seconds: np.ndarray = None
+    ):
+        self.precision = precision
+        self.recall = recall
+        self.f1 = f1
+        self.status = status
+        self.seconds = np.zeros(len(status)) if seconds is None else seconds
+
+    @staticmethod
+    def concatenate(batch_scores_list: List["BatchScores"]) -> "BatchScores":
+        """The scores of consecutive batches, in order, as one batch."""
+        if not batch_scores_list:
+            empty = np.empty((0, len(CLAUSES)))
+            return BatchScores(empty, empty.copy(), empty.copy(), np.empty(0, dtype=np.int8), np.empty(0))
+        return BatchScores(
+            np.concatenate([batch_scores.precision for batch_scores in batch_scores_list]),
+            np.concatenate([batch_scores.recall for batch_scores in batch_scores_list]),
+            np.concatenate([batch_scores.f1 for batch_scores in batch_scores_list]),
+            np.concatenate([batch_scores.status for batch_scores in batch_scores_list]),
+            np.concatenate([batch_scores.seconds for batch_scores in batch_scores_list]),
+        )
+
+    def __len__(self) -> int:
+        return len(self.status)
+
+    @property
+    def counted(self) -> np.ndarray:
+        return self.status != JSQL_ERROR
+
+    def pcm_f1_scores(self) -> np.ndarray:
+        """The score of evaluate for every pair, NaN for the pairs it reports as "JSQLError"."""
+        scored = ~np.isnan(self.f1)
+        scored_count = scored.sum(axis=1)
+        f1_sum = np.where(scored, self.f1, 0.0).sum(axis=1)
+        scores = np.divide(f1_sum, scored_count, out=np.zeros(len(self)), where=scored_count > 0)
+        scores[self.status == INVALID_PREDICTION] = 0.0
+        scores[self.status == JSQL_ERROR] = np.nan
+        return scores
+
+    def pcm_em_flags(self) -> np.ndarray:
+        """Whether every scored clause of the pair is an exact match, False for pairs without a scored clause."""
+        scored = ~np.isnan(self.f1)
+        exact = np.where(scored, self.f1 == 1.0, True).all(axis=1) & scored.any(axis=1)
+        return exact & (self.status == SCORED)
+
+    def pcm_f1(self) -> Optional[float]:
+        """Mean PCM-F1 of the counted pairs, None if no pair counts."""
+        if not self.counted.any():
+            return None
+        return float(self.pcm_f1_scores()[self.counted].mean())
+
+    def pcm_em(self) -> Optional[float]:
+        """Mean PCM-EM of the counted pairs, None if no pair counts."""
+        if not self.counted.any():
+            return None
+        return float(self.pcm_em_flags()[self.counted].mean())
+
+    def clause_f1(self) -> Dict[str, float]:
+        """Mean F1 of every clause over the pairs in which it is scored."""
+        rows = self.f1[self.status == SCORED]
+        return {
+            clause: float(np.nanmean(rows[:, index]))
+            for index, clause in enumerate(CLAUSES)
+            if not np.isnan(rows[:, index]).all()
+        }
+
+
+def score_batch(
+    parsed_gold: List[Optional[Dict]], parsed_predicted: List[Optional[Dict]], punish_invalid_sql: bool = False
+) -> BatchScores:
+    """
+    Matches the items of every pair once, the pairs are handled as evaluate handles them.
+    :param parsed_gold: List[Dict]
+    :param parsed_predicted: List[Dict]
+    :param punish_invalid_sql: bool
+    :return: BatchScores
+    """
+    shape = (min(len(parsed_gold), len(parsed_predicted)), len(CLAUSES))
+    precision = np.full(shape, np.nan)
+    recall = np.full(shape, np.nan)
+    f1 = np.full(shape, np.nan)
+    status = np.full(shape[0], SCORED, dtype=np.int8)
+    seconds = np.zeros(shape[0])
+    for row, (gold, predicted) in enumerate(zip(parsed_gold, parsed_predicted)):
+        start = time.perf_counter()
+        if not gold or (not predicted and not punish_invalid_sql):
+            # a gold query that could not be parsed is a failure of JSQL, not of the model
+            status[row] = JSQL_ERROR
+        elif not predicted:
+            status[row] = INVALID_PREDICTION
+        else:
+            for clause, clause_scores in calculate_clause_scores(gold, predicted).items():
+                column = CLAUSES.index(clause)
+                precision[row, column], recall[row, column], f1[row, column] = clause_scores
+        seconds[row] = time.perf_counter() - start
+    return BatchScores(precision, recall, f1, status, seconds)
+
+
+class ScoreAccumulator:
+    """
+    Running sums of BatchScores, so the scores of a stream of batches can be aggregated without keeping the batches.
+    The means are the ones of BatchScores.concatenate of all the added batches.
+    """
+
+    def __init__(self):
+        self.counted = 0
+        self.pcm_f1_sum = 0.0
+        self.pcm_em_sum = 0
+        self.clause_f1_sum = np.zeros(len(CLAUSES))
+        self.clause_count = np.zeros(len(CLAUSES), dtype=np.int64)
+
+    def add(self, batch_scores: BatchScores) -> None:
+        counted = batch_scores.counted
+        self.counted += int(counted.sum())
+        self.pcm_f1_sum += float(batch_scores.pcm_f1_scores()[counted].sum())
+        self.pcm_em_sum += int(batch_scores.pcm_em_flags()[counted].sum())
+        rows = batch_scores.f1[batch_scores.status == SCORED]
+        self.clause_f1_sum += np.nansum(rows, axis=0)
+        self.clause_count += (~np.isnan(rows)).sum(axis=0)
+
+    def pcm_f1(self) -> Optional[float]:
+        return self.pcm_f1_sum / self.counted if self.counted else None
+
+    def pcm_em(self) -> Optional[float]:
+        return self.pcm_em_sum / self.counted if self.counted else None
+
+    def clause_f1(self) -> Dict[str, float]:
+        return {
+            clause: float(self.clause_f1_sum[index] / self.clause_count[index])
+            for index, clause in enumerate(CLAUSES)
+            if self.clause_count[index]
+        }
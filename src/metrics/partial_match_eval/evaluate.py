@@ -1,6 +1,6 @@
-from typing import Dict, List
+from typing import Dict, List, Tuple
 
-from src.metrics.partial_match_eval.utils import get_item_index_in_list
+from src.metrics.partial_match_eval.utils import count_matches
 
 
 def _get_combined_select_items(parsed: dict) -> dict:
@@ -14,25 +14,27 @@ def _get_combined_select_items(parsed: dict) -> dict:
     return combined
 
 
+CLAUSES = (
+    "select_items",
+    "top_items",
+    "from_items",
+    "groupby_items",
+    "having_items",
+    "where_items",
+    "order_items",
+)
+
+
 # pylint: disable=too-many-branches,too-many-boolean-expressions
-def calculate_score(parsed_gold: Dict, parsed_predicted: Dict, exact_match: bool = False) -> float:
+def calculate_clause_scores(parsed_gold: Dict, parsed_predicted: Dict) -> Dict[str, Tuple[float, float, float]]:
 
     """:arg
     # precision : how many of the words in the predicted occur in reference
     # recall " how many of the words in reference occur in predicted
     F1 = 2 * p * r / (p+r)
+    :return: (precision, recall, F1) of every clause that is scored, clauses that are empty in both are not scored
     """
 
-    items = [
-        "select_items",
-        "top_items",
-        "from_items",
-        "groupby_items",
-        "having_items",
-        "where_items",
-        "order_items",
-    ]
-
     scores = {}
     if len(parsed_gold) > 1:
         combined = _get_combined_select_items(parsed_gold)
@@ -45,7 +47,7 @@ def calculate_score(parsed_gold: Dict, parsed_predicted: Dict, exact_match: bool
     for select_body_gold_list, select_body_predicted_list in zip(parsed_gold.values(), parsed_predicted.values()):
         select_body_gold_dict = select_body_gold_list[0]
         select_body_predicted_dict = select_body_predicted_list[0]
-        for item in items:
+        for item in CLAUSES:
             if item in select_body_gold_dict and item in select_body_predicted_dict:
                 gold_items = select_body_gold_dict[item]
                 predicted_items = select_body_predicted_dict[item]
@@ -56,24 +58,11 @@ def calculate_score(parsed_gold: Dict, parsed_predicted: Dict, exact_match: bool
                 if (len(gold_items) == 0 and len(predicted_items) != 0) or (
                     len(gold_items) != 0 and len(predicted_items) == 0
                 ):
-                    scores[item] = 0
+                    scores[item] = (0.0, 0.0, 0)
                     continue
 
-                temp_precision = 0
-                temp_gold_items = gold_items.copy()
-                for predicted_item in predicted_items:
-                    item_index = get_item_index_in_list(temp_gold_items, predicted_item)
-                    if item_index > -1:
-                        del temp_gold_items[item_index]
-                        temp_precision += 1
-
-                temp_recall = 0.0
-                temp_predicted_items = predicted_items.copy()
-                for gold_item in gold_items:
-                    item_index = get_item_index_in_list(temp_predicted_items, gold_item)
-                    if item_index > -1:
-                        del temp_predicted_items[item_index]
-                        temp_recall += 1
+                # every matched item is removed, so repeated items have to be matched as many times
+                temp_precision, temp_recall = count_matches(gold_items, predicted_items)
 
                 recall = float(temp_recall) / len(gold_items)
                 precision = float(temp_precision) / len(predicted_items)
@@ -82,19 +71,25 @@ def calculate_score(parsed_gold: Dict, parsed_predicted: Dict, exact_match: bool
                     f1_score = 0
                 else:
                     f1_score = 2 * recall * precision / (recall + precision)
-                scores[item] = f1_score
+                scores[item] = (precision, recall, f1_score)
             else:
                 continue
 
+    return scores
+
+
+def calculate_score(parsed_gold: Dict, parsed_predicted: Dict, exact_match: bool = False) -> float:
+    scores = [f1_score for _, _, f1_score in calculate_clause_scores(parsed_gold, parsed_predicted).values()]
+
     final_score = 0.0
     if scores:
         if exact_match:
-            for score in scores.values():
+            for score in scores:
                 if score != 1.0:
                     return 0.0
             final_score = 1.0
         else:
-            final_score = sum(list(scores.values())) / len(scores.values())
+            final_score = sum(scores) / len(scores)
 
     return final_score
 
@@ -0,0 +1,739 @@
+from types import GeneratorType
+from typing import List, Dict, Optional, Union, Generator, Any, Sequence, Tuple
+
+from src.metrics.partial_match_eval.jsql_reader import JSQLReader
+
+# a visit either returns its items right away (for leaves) or is a generator that yields the visits of its children,
+# gets their items sent back, and returns its own items (one entry per variant in _VariantsWalk)
+Visit = Union[List, Dict, Generator[Any, Any, Any]]
+
+# the (anonymize_values, parse_on_clause) flags of one output of a walk
+Variant = Tuple[bool, bool]
+
+# keys of the JSQL nodes that JSQLReader descends into, an expression without any of them is a leaf
+CHILD_KEYS = frozenset(
+    [
+        "leftExpression",
+        "rightExpression",
+        "rightItemsList",
+        "selectBody",
+        "withItemsList",
+        "parameters",
+        "whenClauses",
+        "orderByElements",
+    ]
+)
+
+
+def _run(visit: Visit) -> Any:
+    # the stack holds the send methods of the visits in progress, every visit is resumed with the items of the child
+    # it yielded once they are ready
+    stack = [visit.send]
+    push = stack.append
+    pop = stack.pop
+    value = None
+    while stack:
+        try:
+            child = stack[-1](value)
+        except StopIteration as stop:
+            pop()
+            value = stop.value
+            continue
+        if child.__class__ is GeneratorType:
+            push(child.send)
+            value = None
+        else:
+            value = child
+    return value
+
+
+def _is_leaf(expression: Dict) -> bool:
+    return CHILD_KEYS.isdisjoint(expression)
+
+
+class IterativeJSQLReader(JSQLReader):
+    """
+    Produces the same items as JSQLReader, but walks the JSQL JSON with an explicit stack instead of recursion, so
+    deeply nested queries never hit the recursion limit. Every node is visited once, and leaves (columns, values) are
+    read directly without scheduling any visit.
+
+    parse_sql_to_parsed_bodies produces the parsed bodies of several (anonymize_values, parse_on_clause) variants in a
+    single walk (see _VariantsWalk), a single variant is read by the walk of parse_sql_to_parsed_body, which does not
+    pay for keeping items per variant.
+    """
+
+    @staticmethod
+    def parse_sql_to_parsed_body(parsed_sql: Dict, anonymize_values: bool, parse_on_clause: bool) -> Dict:
+        return _run(IterativeJSQLReader._visit_sql(parsed_sql, anonymize_values, parse_on_clause))
+
+    @staticmethod
+    def parse_sql_to_parsed_bodies(parsed_sql: Dict, variants: Sequence[Variant]) -> List[Dict]:
+        """
+        Returns the parsed body of every (anonymize_values, parse_on_clause) variant, in the order of `variants`.
+        """
+        if len(variants) == 1:
+            return [IterativeJSQLReader.parse_sql_to_parsed_body(parsed_sql, *variants[0])]
+        return _run(_VariantsWalk._visit_sql(parsed_sql, tuple(variants)))
+
+    @staticmethod
+    def _get_select_bodies(parsed_sql: Dict) -> List[Dict]:
+        select_bodies = []
+        for key, value in parsed_sql.items():
+            if key == "selectBody":
+                select_bodies.extend(value["selects"] if "selects" in value else [value])
+            elif key == "withItemsList":
+                for with_value in value:
+                    select_body = with_value["selectBody"]
+                    select_bodies.extend(select_body["selects"] if "selects" in select_body else [select_body])
+        return select_bodies
+
+    @staticmethod
+    def _visit_sql(parsed_sql: Dict, anonymize_values: bool, parse_on_clause: bool) -> Visit:
+        select_bodies = IterativeJSQLReader._get_select_bodies(parsed_sql)
+        parsed_dict = {"select_body_{}".format(i): [] for i in range(len(select_bodies))}
+
+        for num, body in enumerate(select_bodies):
+            while isinstance(body, list):
+                body = body[0]
+            body_dict = yield IterativeJSQLReader._visit_body(body, anonymize_values, parse_on_clause)
+            parsed_dict["select_body_{}".format(num)].append(body_dict)
+
+        return parsed_dict
+
+    @staticmethod
+    def _visit_body(body: Dict, anonymize_values: bool, parse_on_clause: bool) -> Visit:
+        select_items = yield IterativeJSQLReader._visit_select_items(
+            body.get("selectItems", []), anonymize_values, parse_on_clause
+        )
+        top_items = JSQLReader._get_top_clause(body.get("top", {}), body.get("limit", {}))
+        from_items = yield IterativeJSQLReader._visit_from_clause(
+            body.get("fromItem", {}), body.get("joins", []), anonymize_values, parse_on_clause
+        )
+        where = body.get("where")
+        where_items = (
+            (yield IterativeJSQLReader._visit_left_right(where, anonymize_values, parse_on_clause)) if where else []
+        )
+        order_by_items = yield IterativeJSQLReader._visit_order_items(
+            body.get("orderByElements", []), anonymize_values, parse_on_clause
+        )
+        group_by_items = yield IterativeJSQLReader._visit_group_by(
+            body.get("groupBy", {}), anonymize_values, parse_on_clause
+        )
+        having = body.get("having", {})
+        having_items = (
+            (yield IterativeJSQLReader._visit_left_right(having, anonymize_values, parse_on_clause)) if having else []
+        )
+
+        return {
+            "select_items": select_items,
+            "top_items": top_items,
+            "from_items": from_items,
+            "where_items": where_items,
+            "order_items": order_by_items,
+            "groupby_items": group_by_items,
+            "having_items": having_items,
+        }
+
+    @staticmethod
+    def _visit_inner_sql(expression: Dict, anonymize_values: bool, parse_on_clause: bool) -> Visit:
+        if "selectBody" not in expression and "withItemsList" not in expression:
+            return []
+        return IterativeJSQLReader._visit_inner_sql_children(expression, anonymize_values, parse_on_clause)
+
+    @staticmethod
+    def _visit_inner_sql_children(expression: Dict, anonymize_values: bool, parse_on_clause: bool) -> Visit:
+        inner_select_body_items = yield IterativeJSQLReader._visit_sql(expression, anonymize_values, parse_on_clause)
+        items = []
+        for select_body_list in inner_select_body_items.values():
+            for clause_items in select_body_list[0].values():
+                items.extend(clause_items)
+        return items
+
+    @staticmethod
+    def _visit_left_right(expression: Dict, anonymize_values: bool, parse_on_clause: bool) -> Visit:
+        if "leftExpression" in expression or "rightExpression" in expression or "rightItemsList" in expression:
+            return IterativeJSQLReader._visit_left_right_children(expression, anonymize_values, parse_on_clause)
+        string_expression = expression.get("stringExpression")
+        return [string_expression] if string_expression else []
+
+    @staticmethod
+    def _visit_left_right_children(expression: Dict, anonymize_values: bool, parse_on_clause: bool) -> Visit:
+        # leaves are read right away, only the visits of subtrees go through the stack
+        visit = IterativeJSQLReader._visit_column_items_inner(
+            expression.get("leftExpression"), anonymize_values, parse_on_clause, left_expression=True
+        )
+        left_expression_items = visit if isinstance(visit, list) else (yield visit)
+        visit = IterativeJSQLReader._visit_column_items_inner(
+            expression.get("rightExpression"), anonymize_values, parse_on_clause, left_expression=False
+        )
+        right_expression_items = visit if isinstance(visit, list) else (yield visit)
+        items = left_expression_items + right_expression_items
+
+        right_items_list_dict = expression.get("rightItemsList", {})
+        if right_items_list_dict:
+            items.append("IN")
+            for right_item_expression in right_items_list_dict.get("expressions", []):
+                visit = IterativeJSQLReader._visit_column_items_inner(
+                    right_item_expression, anonymize_values, parse_on_clause, left_expression=False
+                )
+                items.extend(visit if isinstance(visit, list) else (yield visit))
+
+        string_expression = expression.get("stringExpression")
+        if string_expression:
+            items.append(string_expression)
+            if left_expression_items and right_expression_items:
+                items.append([left_expression_items, right_expression_items, string_expression])
+
+        return items
+
+    @staticmethod
+    def _visit_column_items_inner(
+        expression: Optional[Dict], anonymize_values: bool, parse_on_clause: bool, left_expression: bool
+    ) -> Visit:
+        if not expression:
+            return []
+        if _is_leaf(expression):
+            items = IterativeJSQLReader._visit_left_right(expression, anonymize_values, parse_on_clause)
+            return IterativeJSQLReader._add_terminal_items(items, expression, anonymize_values, left_expression)
+        return IterativeJSQLReader._visit_column_items_inner_children(
+            expression, anonymize_values, parse_on_clause, left_expression
+        )
+
+    @staticmethod
+    def _visit_column_items_inner_children(
+        expression: Dict, anonymize_values: bool, parse_on_clause: bool, left_expression: bool
+    ) -> Visit:
+        visit = IterativeJSQLReader._visit_left_right(expression, anonymize_values, parse_on_clause)
+        items = visit if isinstance(visit, list) else (yield visit)
+        visit = IterativeJSQLReader._visit_inner_sql(expression, anonymize_values, parse_on_clause)
+        items = items + (visit if isinstance(visit, list) else (yield visit))
+        return IterativeJSQLReader._add_terminal_items(items, expression, anonymize_values, left_expression)
+
+    @staticmethod
+    def _add_terminal_items(items: List, expression: Dict, anonymize_values: bool, left_expression: bool) -> List:
+        if "leftExpression" not in expression and "rightExpression" not in expression:
+            column_name = JSQLReader._get_terminal(expression, "columnName")
+            if column_name:
+                items.append("terminal" if anonymize_values and not left_expression else column_name)
+            string_expression = JSQLReader._get_terminal(expression, "stringExpression")
+            if string_expression:
+                items.append("terminal" if anonymize_values else string_expression)
+            value_value = JSQLReader._get_terminal(expression, "value")
+            if value_value:
+                items.append("terminal" if anonymize_values else value_value)
+            if expression.get("allColumns"):
+                items.append("*")
+
+        aggregator = expression.get("name")
+        if aggregator:
+            items.append(aggregator)
+        if expression.get("not"):
+            items.append("not")
+        return items
+
+    @staticmethod
+    def _visit_expression(expression: Dict, anonymize_values: bool, parse_on_clause: bool) -> Visit:
+        if _is_leaf(expression):
+            left_right_items = IterativeJSQLReader._visit_left_right(expression, anonymize_values, parse_on_clause)
+            order_by_items = [] if expression.get("type") == "OVER" else None
+            return IterativeJSQLReader._get_expression_items(
+                expression, expression.get("columnName"), [], [], left_right_items, order_by_items
+            )
+        return IterativeJSQLReader._visit_expression_children(expression, anonymize_values, parse_on_clause)
+
+    @staticmethod
+    def _visit_expression_children(expression: Dict, anonymize_values: bool, parse_on_clause: bool) -> Visit:
+        if "parameters" in expression:
+            column_name = []
+            for parameter_expression in expression["parameters"]["expressions"]:
+                visit = IterativeJSQLReader._visit_expression(parameter_expression, anonymize_values, parse_on_clause)
+                column_name.extend(visit if isinstance(visit, list) else (yield visit))
+        else:
+            column_name = expression.get("columnName")
+
+        visit = IterativeJSQLReader._visit_inner_sql(expression, anonymize_values, parse_on_clause)
+        inner_sql_items = visit if isinstance(visit, list) else (yield visit)
+
+        when_items = []
+        for when_clause in expression.get("whenClauses", []):
+            when_items.append("case")
+            when_expression = when_clause.get("whenExpression", {})
+            if when_expression:
+                when_items.extend(
+                    (yield IterativeJSQLReader._visit_expression(when_expression, anonymize_values, parse_on_clause))
+                )
+            then_expression = when_clause.get("thenExpression", {})
+            if then_expression:
+                when_items.extend(
+                    (yield IterativeJSQLReader._visit_expression(then_expression, anonymize_values, parse_on_clause))
+                )
+
+        visit = IterativeJSQLReader._visit_left_right(expression, anonymize_values, parse_on_clause)
+        left_right_items = visit if isinstance(visit, list) else (yield visit)
+
+        order_by_items = None
+        if expression.get("type") == "OVER":
+            order_by_items = yield IterativeJSQLReader._visit_order_items(
+                expression.get("orderByElements", []), anonymize_values, parse_on_clause
+            )
+
+        return IterativeJSQLReader._get_expression_items(
+            expression, column_name, inner_sql_items, when_items, left_right_items, order_by_items
+        )
+
+    # pylint: disable=too-many-arguments
+    @staticmethod
+    def _get_expression_items(
+        expression: Dict,
+        column_name: Any,
+        inner_sql_items: List,
+        when_items: List,
+        left_right_items: List,
+        order_by_items: Optional[List],
+    ) -> List:
+        items = []
+        if column_name:
+            if isinstance(column_name, list):
+                if len(column_name) == 1:
+                    column_name = column_name[0]
+                    items.append(column_name)
+                else:
+                    items.extend(column_name)
+            else:
+                items.append(column_name)
+
+        items.extend(inner_sql_items)
+        items.extend(when_items)
+
+        aggregator = expression.get("name")
+        if aggregator:
+            items.append(aggregator)
+            if column_name:
+                items.append([aggregator, column_name])
+            elif expression.get("allColumns"):
+                items.append("*")
+                items.append([aggregator, "*"])
+
+        items.extend(left_right_items)
+
+        # order_by_items is None unless this is an OVER expression
+        if order_by_items is not None:
+            items.append("OVER")
+            items.extend(order_by_items)
+
+        return items
+
+    @staticmethod
+    def _visit_select_items(select_items: List[Dict], anonymize_values: bool, parse_on_clause: bool) -> Visit:
+        items = []
+        for select_item in select_items:
+            if len(select_item.keys()) == 1:  # select * from ..
+                items.append("*")
+                continue
+            expression = select_item.get("expression")
+            if expression:
+                visit = IterativeJSQLReader._visit_expression(expression, anonymize_values, parse_on_clause)
+                items.extend(visit if isinstance(visit, list) else (yield visit))
+
+        if len(items) > 1:
+            items.append(items.copy())
+        return items
+
+    @staticmethod
+    def _visit_from_clause(from_dict: Dict, join_list: List, anonymize_values: bool, parse_on_clause: bool) -> Visit:
+        items = []
+
+        if "fullyQualifiedName" in from_dict:
+            items.append(from_dict["fullyQualifiedName"])
+        elif "multipartName" in from_dict:
+            items.append(from_dict["multipartName"])
+        elif "name" in from_dict:
+            items.append(from_dict["name"])
+
+        items.extend((yield IterativeJSQLReader._visit_inner_sql(from_dict, anonymize_values, parse_on_clause)))
+
+        for join_dict in join_list:
+            items.extend((yield IterativeJSQLReader._visit_join(join_dict, anonymize_values, parse_on_clause)))
+
+        if len(items) > 1:
+            items.append(items.copy())
+        return items
+
+    @staticmethod
+    def _visit_join(join_dict: Dict, anonymize_values: bool, parse_on_clause: bool) -> Visit:
+        items = []
+        if "rightItem" in join_dict:
+            right_item = join_dict["rightItem"]
+            if "name" in right_item:
+                items.append(right_item["name"])
+            if "selectBody" in right_item:
+                items.extend(
+                    (yield IterativeJSQLReader._visit_inner_sql(right_item, anonymize_values, parse_on_clause))
+                )
+
+        if "onExpression" in join_dict and parse_on_clause:
+            on_expression = join_dict["onExpression"]
+            items.extend(
+                (yield IterativeJSQLReader._visit_left_right(on_expression, anonymize_values, parse_on_clause))
+            )
+            if "selectBody" in on_expression:
+                items.extend(
+                    (yield IterativeJSQLReader._visit_inner_sql(on_expression, anonymize_values, parse_on_clause))
+                )
+
+        if len(items) > 1:
+            items.append(items.copy())
+        return items
+
+    @staticmethod
+    def _visit_group_by(group_by_dict: Dict, anonymize_values: bool, parse_on_clause: bool) -> Visit:
+        items = []
+        for group_by_expression in group_by_dict.get("groupByExpressions", []):
+            items.extend(JSQLReader._get_items_from_group_by_expression(group_by_expression, anonymize_values))
+            items.extend(
+                (yield IterativeJSQLReader._visit_expression(group_by_expression, anonymize_values, parse_on_clause))
+            )
+
+        if len(items) > 1:
+            items.append(items.copy())
+        return items
+
+    @staticmethod
+    def _visit_order_items(order_by_elements: List[Dict], anonymize_values: bool, parse_on_clause: bool) -> Visit:
+        items = []
+        for order_by_element in order_by_elements:
+            expression = order_by_element.get("expression")
+            if expression:
+                expression_items = yield IterativeJSQLReader._visit_expression(
+                    expression, anonymize_values, parse_on_clause
+                )
+                expression_items.append("asc" if order_by_element.get("asc") else "desc")
+                items.extend(expression_items)
+                if len(expression_items) > 1:
+                    items.append(expression_items)
+
+        if len(items) > 1:
+            items.append(items.copy())
+        return items
+
+
+class _VariantsWalk:
+    """
+    The walk of IterativeJSQLReader for several variants at once: they only differ in the terminals and in whether
+    the ON clauses of joins are read, so every visit keeps one item list per variant.
+    """
+
+    @staticmethod
+    def _visit_sql(parsed_sql: Dict, variants: Tuple[Variant, ...]) -> Visit:
+        select_bodies = IterativeJSQLReader._get_select_bodies(parsed_sql)
+        parsed_dicts = [{"select_body_{}".format(i): [] for i in range(len(select_bodies))} for _ in variants]
+
+        for num, body in enumerate(select_bodies):
+            while isinstance(body, list):
+                body = body[0]
+            body_dicts = yield _VariantsWalk._visit_body(body, variants)
+            for parsed_dict, body_dict in zip(parsed_dicts, body_dicts):
+                parsed_dict["select_body_{}".format(num)].append(body_dict)
+
+        return parsed_dicts
+
+    @staticmethod
+    def _visit_body(body: Dict, variants: Tuple[Variant, ...]) -> Visit:
+        select_items = yield _VariantsWalk._visit_select_items(body.get("selectItems", []), variants)
+        from_items = yield _VariantsWalk._visit_from_clause(body.get("fromItem", {}), body.get("joins", []), variants)
+        where = body.get("where")
+        where_items = (yield _VariantsWalk._visit_left_right(where, variants)) if where else [[] for _ in variants]
+        order_by_items = yield _VariantsWalk._visit_order_items(body.get("orderByElements", []), variants)
+        group_by_items = yield _VariantsWalk._visit_group_by(body.get("groupBy", {}), variants)
+        having = body.get("having", {})
+        having_items = (yield _VariantsWalk._visit_left_right(having, variants)) if having else [[] for _ in variants]
+
+        return [
+            {
+                "select_items": select_items[i],
+                "top_items": JSQLReader._get_top_clause(body.get("top", {}), body.get("limit", {})),
+                "from_items": from_items[i],
+                "where_items": where_items[i],
+                "order_items": order_by_items[i],
+                "groupby_items": group_by_items[i],
+                "having_items": having_items[i],
+            }
+            for i in range(len(variants))
+        ]
+
+    @staticmethod
+    def _visit_inner_sql(expression: Dict, variants: Tuple[Variant, ...]) -> Visit:
+        if "selectBody" not in expression and "withItemsList" not in expression:
+            return [[] for _ in variants]
+        return _VariantsWalk._visit_inner_sql_children(expression, variants)
+
+    @staticmethod
+    def _visit_inner_sql_children(expression: Dict, variants: Tuple[Variant, ...]) -> Visit:
+        inner_parsed_dicts = yield _VariantsWalk._visit_sql(expression, variants)
+        items_list = [[] for _ in variants]
+        for items, inner_select_body_items in zip(items_list, inner_parsed_dicts):
+            for select_body_list in inner_select_body_items.values():
+                for clause_items in select_body_list[0].values():
+                    items.extend(clause_items)
+        return items_list
+
+    @staticmethod
+    def _visit_left_right(expression: Dict, variants: Tuple[Variant, ...]) -> Visit:
+        if "leftExpression" in expression or "rightExpression" in expression or "rightItemsList" in expression:
+            return _VariantsWalk._visit_left_right_children(expression, variants)
+        string_expression = expression.get("stringExpression")
+        return [[string_expression] if string_expression else [] for _ in variants]
+
+    @staticmethod
+    def _visit_left_right_children(expression: Dict, variants: Tuple[Variant, ...]) -> Visit:
+        # leaves are read right away, only the visits of subtrees go through the stack
+        visit = _VariantsWalk._visit_column_items_inner(
+            expression.get("leftExpression"), variants, left_expression=True
+        )
+        left_expression_items_list = visit if isinstance(visit, list) else (yield visit)
+        visit = _VariantsWalk._visit_column_items_inner(
+            expression.get("rightExpression"), variants, left_expression=False
+        )
+        right_expression_items_list = visit if isinstance(visit, list) else (yield visit)
+        items_list = [left + right for left, right in zip(left_expression_items_list, right_expression_items_list)]
+
+        right_items_list_dict = expression.get("rightItemsList", {})
+        if right_items_list_dict:
+            for items in items_list:
+                items.append("IN")
+            for right_item_expression in right_items_list_dict.get("expressions", []):
+                visit = _VariantsWalk._visit_column_items_inner(right_item_expression, variants, left_expression=False)
+                for items, right_item_items in zip(items_list, visit if isinstance(visit, list) else (yield visit)):
+                    items.extend(right_item_items)
+
+        string_expression = expression.get("stringExpression")
+        if string_expression:
+            for items, left_expression_items, right_expression_items in zip(
+                items_list, left_expression_items_list, right_expression_items_list
+            ):
+                items.append(string_expression)
+                if left_expression_items and right_expression_items:
+                    items.append([left_expression_items, right_expression_items, string_expression])
+
+        return items_list
+
+    @staticmethod
+    def _visit_column_items_inner(
+        expression: Optional[Dict], variants: Tuple[Variant, ...], left_expression: bool
+    ) -> Visit:
+        if not expression:
+            return [[] for _ in variants]
+        if _is_leaf(expression):
+            items_list = _VariantsWalk._visit_left_right(expression, variants)
+            return _VariantsWalk._add_terminal_items(items_list, expression, variants, left_expression)
+        return _VariantsWalk._visit_column_items_inner_children(expression, variants, left_expression)
+
+    @staticmethod
+    def _visit_column_items_inner_children(
+        expression: Dict, variants: Tuple[Variant, ...], left_expression: bool
+    ) -> Visit:
+        visit = _VariantsWalk._visit_left_right(expression, variants)
+        left_right_items_list = visit if isinstance(visit, list) else (yield visit)
+        visit = _VariantsWalk._visit_inner_sql(expression, variants)
+        inner_sql_items_list = visit if isinstance(visit, list) else (yield visit)
+        items_list = [left_right + inner for left_right, inner in zip(left_right_items_list, inner_sql_items_list)]
+        return _VariantsWalk._add_terminal_items(items_list, expression, variants, left_expression)
+
+    @staticmethod
+    def _add_terminal_items(
+        items_list: List[List], expression: Dict, variants: Tuple[Variant, ...], left_expression: bool
+    ) -> List[List]:
+        if "leftExpression" not in expression and "rightExpression" not in expression:
+            column_name = JSQLReader._get_terminal(expression, "columnName")
+            string_expression = JSQLReader._get_terminal(expression, "stringExpression")
+            value_value = JSQLReader._get_terminal(expression, "value")
+            all_columns = expression.get("allColumns")
+            for items, (anonymize_values, _) in zip(items_list, variants):
+                if column_name:
+                    items.append("terminal" if anonymize_values and not left_expression else column_name)
+                if string_expression:
+                    items.append("terminal" if anonymize_values else string_expression)
+                if value_value:
+                    items.append("terminal" if anonymize_values else value_value)
+                if all_columns:
+                    items.append("*")
+
+        aggregator = expression.get("name")
+        is_not = expression.get("not")
+        if aggregator or is_not:
+            for items in items_list:
+                if aggregator:
+                    items.append(aggregator)
+                if is_not:
+                    items.append("not")
+        return items_list
+
+    @staticmethod
+    def _visit_expression(expression: Dict, variants: Tuple[Variant, ...]) -> Visit:
+        if _is_leaf(expression):
+            column_name = expression.get("columnName")
+            is_over = expression.get("type") == "OVER"
+            return [
+                IterativeJSQLReader._get_expression_items(
+                    expression, column_name, [], [], left_right_items, [] if is_over else None
+                )
+                for left_right_items in _VariantsWalk._visit_left_right(expression, variants)
+            ]
+        return _VariantsWalk._visit_expression_children(expression, variants)
+
+    @staticmethod
+    def _visit_expression_children(expression: Dict, variants: Tuple[Variant, ...]) -> Visit:
+        if "parameters" in expression:
+            column_name_list = [[] for _ in variants]
+            for parameter_expression in expression["parameters"]["expressions"]:
+                visit = _VariantsWalk._visit_expression(parameter_expression, variants)
+                for column_name, parameter_items in zip(
+                    column_name_list, visit if isinstance(visit, list) else (yield visit)
+                ):
+                    column_name.extend(parameter_items)
+        else:
+            column_name_list = [expression.get("columnName")] * len(variants)
+
+        visit = _VariantsWalk._visit_inner_sql(expression, variants)
+        inner_sql_items_list = visit if isinstance(visit, list) else (yield visit)
+
+        when_items_list = [[] for _ in variants]
+        for when_clause in expression.get("whenClauses", []):
+            for when_items in when_items_list:
+                when_items.append("case")
+            when_expression = when_clause.get("whenExpression", {})
+            if when_expression:
+                for when_items, expression_items in zip(
+                    when_items_list, (yield _VariantsWalk._visit_expression(when_expression, variants))
+                ):
+                    when_items.extend(expression_items)
+            then_expression = when_clause.get("thenExpression", {})
+            if then_expression:
+                for when_items, expression_items in zip(
+                    when_items_list, (yield _VariantsWalk._visit_expression(then_expression, variants))
+                ):
+                    when_items.extend(expression_items)
+
+        visit = _VariantsWalk._visit_left_right(expression, variants)
+        left_right_items_list = visit if isinstance(visit, list) else (yield visit)
+
+        order_by_items_list = [None] * len(variants)
+        if expression.get("type") == "OVER":
+            order_by_items_list = yield _VariantsWalk._visit_order_items(
+                expression.get("orderByElements", []), variants
+            )
+
+        return [
+            IterativeJSQLReader._get_expression_items(
+                expression, column_name, inner_sql_items, when_items, left_right_items, order_by_items
+            )
+            for column_name, inner_sql_items, when_items, left_right_items, order_by_items in zip(
+                column_name_list, inner_sql_items_list, when_items_list, left_right_items_list, order_by_items_list
+            )
+        ]
+
+    @staticmethod
+    def _copy_items_if_many(items_list: List[List]) -> List[List]:
+        for items in items_list:
+            if len(items) > 1:
+                items.append(items.copy())
+        return items_list
+
+    @staticmethod
+    def _visit_select_items(select_items: List[Dict], variants: Tuple[Variant, ...]) -> Visit:
+        items_list = [[] for _ in variants]
+        for select_item in select_items:
+            if len(select_item.keys()) == 1:  # select * from ..
+                for items in items_list:
+                    items.append("*")
+                continue
+            expression = select_item.get("expression")
+            if expression:
+                visit = _VariantsWalk._visit_expression(expression, variants)
+                for items, expression_items in zip(items_list, visit if isinstance(visit, list) else (yield visit)):
+                    items.extend(expression_items)
+
+        return _VariantsWalk._copy_items_if_many(items_list)
+
+    @staticmethod
+    def _visit_from_clause(from_dict: Dict, join_list: List, variants: Tuple[Variant, ...]) -> Visit:
+        items_list = [[] for _ in variants]
+
+        name = None
+        if "fullyQualifiedName" in from_dict:
+            name = from_dict["fullyQualifiedName"]
+        elif "multipartName" in from_dict:
+            name = from_dict["multipartName"]
+        elif "name" in from_dict:
+            name = from_dict["name"]
+        if name is not None:
+            for items in items_list:
+                items.append(name)
+
+        for items, inner_sql_items in zip(items_list, (yield _VariantsWalk._visit_inner_sql(from_dict, variants))):
+            items.extend(inner_sql_items)
+
+        for join_dict in join_list:
+            for items, join_items in zip(items_list, (yield _VariantsWalk._visit_join(join_dict, variants))):
+                items.extend(join_items)
+
+        return _VariantsWalk._copy_items_if_many(items_list)
+
+    @staticmethod
+    def _visit_join(join_dict: Dict, variants: Tuple[Variant, ...]) -> Visit:
+        items_list = [[] for _ in variants]
+        if "rightItem" in join_dict:
+            right_item = join_dict["rightItem"]
+            if "name" in right_item:
+                for items in items_list:
+                    items.append(right_item["name"])
+            if "selectBody" in right_item:
+                for items, inner_sql_items in zip(
+                    items_list, (yield _VariantsWalk._visit_inner_sql(right_item, variants))
+                ):
+                    items.extend(inner_sql_items)
+
+        if "onExpression" in join_dict and any(parse_on_clause for _, parse_on_clause in variants):
+            # the ON clause is walked once for all the variants, and only added to the ones that parse it
+            on_expression = join_dict["onExpression"]
+            on_items_list = yield _VariantsWalk._visit_left_right(on_expression, variants)
+            if "selectBody" in on_expression:
+                for on_items, inner_sql_items in zip(
+                    on_items_list, (yield _VariantsWalk._visit_inner_sql(on_expression, variants))
+                ):
+                    on_items.extend(inner_sql_items)
+            for items, on_items, (_, parse_on_clause) in zip(items_list, on_items_list, variants):
+                if parse_on_clause:
+                    items.extend(on_items)
+
+        return _VariantsWalk._copy_items_if_many(items_list)
+
+    @staticmethod
+    def _visit_group_by(group_by_dict: Dict, variants: Tuple[Variant, ...]) -> Visit:
+        items_list = [[] for _ in variants]
+        for group_by_expression in group_by_dict.get("groupByExpressions", []):
+            for items, (anonymize_values, _) in zip(items_list, variants):
+                items.extend(JSQLReader._get_items_from_group_by_expression(group_by_expression, anonymize_values))
+            for items, expression_items in zip(
+                items_list, (yield _VariantsWalk._visit_expression(group_by_expression, variants))
+            ):
+                items.extend(expression_items)
+
+        return _VariantsWalk._copy_items_if_many(items_list)
+
+    @staticmethod
+    def _visit_order_items(order_by_elements: List[Dict], variants: Tuple[Variant, ...]) -> Visit:
+        items_list = [[] for _ in variants]
+        for order_by_element in order_by_elements:
+            expression = order_by_element.get("expression")
+            if expression:
+                order = "asc" if order_by_element.get("asc") else "desc"
+                for items, expression_items in zip(
+                    items_list, (yield _VariantsWalk._visit_expression(expression, variants))
+                ):
+                    expression_items.append(order)
+                    items.extend(expression_items)
+                    if len(expression_items) > 1:
+                        items.append(expression_items)
+
+        return _VariantsWalk._copy_items_if_many(items_list)
@@ -0,0 +1,78 @@
+import sys
+from typing import Any, Dict, List, Tuple, Union
+
+# an item of a clause is a name or a value, or a tuple of items for the composite items JSQLReader adds, e.g.
+# (aggregator, column_name) or (left_items, right_items, operator)
+Item = Union[str, Tuple["Item", ...]]
+
+# the items of every clause of a select body, e.g. {"select_items": (...), "where_items": (...)}
+CompactBody = Dict[str, Tuple[Item, ...]]
+
+
+def _intern_leaf(item: Any) -> Any:
+    return sys.intern(item) if isinstance(item, str) else item
+
+
+class ItemInterner:
+    """
+    Converts the nested lists of items produced by JSQLReader to a compact, hashable form: composite items become
+    tuples and the clauses of a select body become tuples of items. Equal items are interned, so the copies
+    JSQLReader adds (e.g. every clause ends with a copy of its items) and the items that repeat across queries are
+    stored once, and equal items of the same interner are the same object.
+
+    Composite items are interned by the identity of their (already interned) children, so interning never hashes a
+    whole nested item, which can be huge when expanded even though JSQLReader shares its sub-lists.
+    """
+
+    def __init__(self):
+        self._composite_items: Dict[Tuple[int, ...], Tuple[Item, ...]] = {}
+
+    def __len__(self) -> int:
+        return len(self._composite_items)
+
+    def _intern_composite(self, children: Tuple[Item, ...]) -> Tuple[Item, ...]:
+        # the interned tuple keeps its children alive, so their ids in the key are never reused
+        key = tuple(map(id, children))
+        interned = self._composite_items.get(key)
+        if interned is None:
+            interned = self._composite_items[key] = children
+        return interned
+
+    def intern_item(self, item: Any, converted: Dict[int, Item] = None) -> Item:
+        """
+        `converted` maps the ids of lists that were already interned, it can be shared between the items of a query
+        since JSQLReader reuses the same lists in several places.
+        """
+        if not isinstance(item, list):
+            return _intern_leaf(item)
+
+        converted = {} if converted is None else converted
+        # post-order walk with an explicit stack, since items are nested as deep as the query
+        stack = [item]
+        while stack:
+            current = stack[-1]
+            if id(current) in converted:
+                stack.pop()
+                continue
+            pending = [child for child in current if isinstance(child, list) and id(child) not in converted]
+            if pending:
+                stack.extend(pending)
+                continue
+            stack.pop()
+            children = [converted[id(child)] if isinstance(child, list) else _intern_leaf(child) for child in current]
+            converted[id(current)] = self._intern_composite(tuple(children))
+        return converted[id(item)]
+
+    def intern_parsed_body(self, parsed_dict: Dict[str, List[Dict[str, List]]]) -> Dict[str, List[CompactBody]]:
+        """
+        Converts the output of JSQLReader.parse_sql_to_parsed_body, keeping its layout (select body name -> list of
+        clause dicts), with the items of every clause as an interned tuple.
+        """
+        converted: Dict[int, Item] = {}
+        return {
+            select_body_name: [
+                {clause: self.intern_item(items, converted) for clause, items in body_dict.items()}
+                for body_dict in body_dict_list
+            ]
+            for select_body_name, body_dict_list in parsed_dict.items()
+        }
@@ -1,7 +1,8 @@
-from typing import List, Union
+from collections import defaultdict, deque
+from typing import Any, List, Union, Sequence, Tuple, Dict, Deque, FrozenSet
 
 
-def get_item_index_in_list(items: List, search_item: Union[str, List]) -> int:
+def get_item_index_in_list(items: Sequence, search_item: Union[str, List, Tuple]) -> int:
     if isinstance(search_item, str):  # str type
         index = -1
         try:
@@ -9,7 +10,7 @@ def get_item_index_in_list(items: List, search_item: Union[str, List]) -> int:
         except ValueError:
             pass
         return index
-    elif isinstance(search_item, list):  # str type
+    elif isinstance(search_item, (list, tuple)):  # list type, or a composite item of the compact form
         if all(isinstance(inner_item, str) for inner_item in items):  # we compare a List[str] to List[str]
             for inner_search_item in search_item:
                 inner_found_index = get_item_index_in_list(items, inner_search_item)
@@ -18,7 +19,7 @@ def get_item_index_in_list(items: List, search_item: Union[str, List]) -> int:
             return 0
 
         for index, item in enumerate(items):
-            if not isinstance(item, list):
+            if not isinstance(item, (list, tuple)):
                 continue
 
             found = False
@@ -35,6 +36,177 @@ def get_item_index_in_list(items: List, search_item: Union[str, List]) -> int:
     return -1
 
 
+# count_matches scans the items directly when len(items) * len(search_items) is at most this
+SCAN_THRESHOLD = 256
+
+
+class _NestedMatcher:
+    """
+    Answers get_item_index_in_list(item, search_item) > -1 for composite items without the linear scans: the strings
+    of every composite item are kept in a set, and the answers are memoized, since the same nested items are compared
+    again and again (JSQLReader repeats them in the copies it adds). Items are identified by id, so the matcher should
+    only be used while the compared items are alive.
+    """
+
+    def __init__(self):
+        # id of a composite item -> (its strings, whether it has only strings, its first composite item)
+        self._indexes: Dict[int, Tuple[FrozenSet[str], bool, Any]] = {}
+        self._leaves: Dict[int, FrozenSet[str]] = {}
+        self._found: Dict[Tuple[int, int], bool] = {}
+
+    def _get_index(self, item: Union[List, Tuple]) -> Tuple[FrozenSet[str], bool, Any]:
+        index = self._indexes.get(id(item))
+        if index is None:
+            strings = frozenset(inner_item for inner_item in item if isinstance(inner_item, str))
+            first_composite = next((inner_item for inner_item in item if isinstance(inner_item, (list, tuple))), None)
+            all_strings = all(isinstance(inner_item, str) for inner_item in item)
+            index = self._indexes[id(item)] = (strings, all_strings, first_composite)
+        return index
+
+    def get_leaves(self, search_item: Union[List, Tuple]) -> FrozenSet[str]:
+        # post-order walk with an explicit stack, the leaves of the nested items that JSQLReader shares are collected
+        # once
+        stack = [search_item]
+        while stack:
+            current = stack[-1]
+            if id(current) in self._leaves:
+                stack.pop()
+                continue
+            pending = [child for child in current if isinstance(child, (list, tuple)) and id(child) not in self._leaves]
+            if pending:
+                stack.extend(pending)
+                continue
+            stack.pop()
+            leaves = set()
+            for child in current:
+                if isinstance(child, str):
+                    leaves.add(child)
+                elif isinstance(child, (list, tuple)):
+                    leaves.update(self._leaves[id(child)])
+                else:
+                    raise ValueError("Value should be of type str or list only")
+            self._leaves[id(current)] = frozenset(leaves)
+        return self._leaves[id(search_item)]
+
+    def is_found(self, item: Union[List, Tuple], search_item: Union[str, List, Tuple]) -> bool:
+        strings, all_strings, first_composite = self._get_index(item)
+        if isinstance(search_item, str):
+            return search_item in strings
+        if not isinstance(search_item, (list, tuple)):
+            raise ValueError("Value should be of type str or list only")
+
+        key = (id(item), id(search_item))
+        found = self._found.get(key)
+        if found is None:
+            if all_strings:
+                found = self.get_leaves(search_item) <= strings
+            elif first_composite is None:
+                found = False
+            else:
+                # only the first composite item is compared
+                found = any(self.is_found(first_composite, inner_search_item) for inner_search_item in search_item)
+            self._found[key] = found
+        return found
+
+
+class _RemainingItems:
+    """
+    The items that were not matched yet, indexed so that every lookup of get_item_index_in_list followed by deleting
+    the found item takes constant time: the positions of every string and of the composite (list/tuple) items are
+    kept in order, since a match always removes the first remaining occurrence.
+    """
+
+    def __init__(self, items: Sequence, nested_matcher: _NestedMatcher):
+        self._items = items
+        self._nested_matcher = nested_matcher
+        self._alive = [True] * len(items)
+        self._first_alive = 0
+        self._string_positions: Dict[str, Deque[int]] = defaultdict(deque)
+        self._composite_positions: Deque[int] = deque()
+        self._other_count = 0
+        for position, item in enumerate(items):
+            if isinstance(item, str):
+                self._string_positions[item].append(position)
+            elif isinstance(item, (list, tuple)):
+                self._composite_positions.append(position)
+            else:
+                self._other_count += 1
+
+    def _remove(self, position: int) -> None:
+        item = self._items[position]
+        if isinstance(item, str):
+            self._string_positions[item].popleft()
+        else:
+            self._composite_positions.popleft()
+        self._alive[position] = False
+        while self._first_alive < len(self._alive) and not self._alive[self._first_alive]:
+            self._first_alive += 1
+
+    def _find(self, search_item: Union[str, List, Tuple]) -> int:
+        if isinstance(search_item, str):
+            positions = self._string_positions.get(search_item)
+            return positions[0] if positions else -1
+        if not isinstance(search_item, (list, tuple)):
+            raise ValueError("Value should be of type str or list only")
+
+        if not self._composite_positions and not self._other_count:
+            # only strings remain: every string in search_item has to be there, and the first item is the match
+            leaves = self._nested_matcher.get_leaves(search_item)
+            if all(self._string_positions.get(leaf) for leaf in leaves) and self._first_alive < len(self._alive):
+                return self._first_alive
+            return -1
+
+        # only the first remaining composite item is compared
+        if not self._composite_positions:
+            return -1
+        position = self._composite_positions[0]
+        item = self._items[position]
+        if any(self._nested_matcher.is_found(item, inner_search_item) for inner_search_item in search_item):
+            return position
+        return -1
+
+    def match(self, search_item: Union[str, List, Tuple]) -> bool:
+        position = self._find(search_item)
+        if position == -1:
+            return False
+        self._remove(position)
+        return True
+
+
+def _count_matched_items_by_scanning(items: Sequence, search_items: Sequence) -> int:
+    remaining_items = list(items)
+    matched = 0
+    for search_item in search_items:
+        item_index = get_item_index_in_list(remaining_items, search_item)
+        if item_index > -1:
+            del remaining_items[item_index]
+            matched += 1
+    return matched
+
+
+def count_matches(gold_items: Sequence, predicted_items: Sequence) -> Tuple[int, int]:
+    """
+    Returns the number of predicted items found in the gold items (for precision) and the number of gold items found
+    in the predicted items (for recall), when every found item is removed. This is the result of calling
+    get_item_index_in_list for every item and deleting the found item, without its quadratic scans.
+    """
+    if len(gold_items) * len(predicted_items) <= SCAN_THRESHOLD:
+        # indexing does not pay off for short clauses, which are most of them
+        return (
+            _count_matched_items_by_scanning(gold_items, predicted_items),
+            _count_matched_items_by_scanning(predicted_items, gold_items),
+        )
+
+    # both directions compare the same nested items, so they share the matcher
+    nested_matcher = _NestedMatcher()
+    remaining_gold_items = _RemainingItems(gold_items, nested_matcher)
+    remaining_predicted_items = _RemainingItems(predicted_items, nested_matcher)
+    return (
+        sum(1 for predicted_item in predicted_items if remaining_gold_items.match(predicted_item)),
+        sum(1 for gold_item in gold_items if remaining_predicted_items.match(gold_item)),
+    )
+
+
 def get_recursively1(search_object, field, search_within_field: bool = False, max_depth=100000):
     """
     Takes a dict with nested lists and dicts,
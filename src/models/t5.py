@@ -1,3 +1,4 @@
+import logging
 from functools import partial
 from typing import Dict, Tuple, Any, List
 
@@ -14,11 +15,14 @@ from transformers import T5ForConditionalGeneration
 
 from src.metrics.abstract_scorer import AbstractScorer
 from src.metrics.bleu.bleu_scorer import BleuScorer
-from src.metrics.partial_match_eval.evaluate import evaluate
+from src.metrics.partial_match_eval.batch_scorer import score_batch
+from src.ext_services.jsql_instrumentation import JSQLInstrumentation
 from src.ext_services.jsql_parser import JSQLParser
 from src.spider_evaluator import evaluate_single
 from src.preprocessing.restore_oov import fix_oov
 
+logger = logging.getLogger(__name__)
+
 
 # pylint: disable=too-many-instance-attributes,too-many-arguments
 @Model.register("t5")
@@ -42,6 +46,10 @@ class T5(Model):
         measure_sql_match: bool = False,
         label_smoothing: float = None,
         cross_entropy_average: str = "batch",
+        jsql_workers: int = 1,
+        jsql_lru_cache_size: int = 10000,
+        jsql_backend: str = "rest",
+        jsql_instrumentation: bool = False,
     ):
         super().__init__(vocab)
         self.model = T5ForConditionalGeneration.from_pretrained(model_name)
@@ -58,9 +66,16 @@ class T5(Model):
         self._measure_partial_match = measure_partial_match
         self._pcm_f1 = Average()
         self._pcm_em = Average()
-        self._jsql_parser = JSQLParser.create()
+        self._jsql_parser = JSQLParser.create(
+            max_workers=jsql_workers,
+            lru_cache_size=jsql_lru_cache_size,
+            backend=jsql_backend,
+            instrumentation=JSQLInstrumentation(enabled=jsql_instrumentation),
+        )
+        if measure_partial_match and not self._jsql_parser.check_health():
+            logger.warning("JSQL service is not available, partial match metrics will count queries as invalid")
 
-        self._metric: AbstractScorer = BleuScorer()
+        self._metric: AbstractScorer = BleuScorer(incremental=True)
 
         self._punish_invalid_sql = punish_invalid_sql
         self._debug_mode = debug_mode
@@ -185,23 +200,18 @@ class T5(Model):
                 else:
                     self._parsable_queries_accuracy(0.0)
 
-            # PCM-F1
-            pcm_f1_scores = evaluate(translated_gold, translated_predicted, self._punish_invalid_sql)
-            pcm_f1_scores = [num for num in pcm_f1_scores if isinstance(num, (int, float))]
-            if not pcm_f1_scores:
+            # PCM-F1 and PCM-EM, the items of every pair are matched once for both
+            with self._jsql_parser.instrumentation.timer("pcm_scoring"):
+                batch_scores = score_batch(translated_gold, translated_predicted, self._punish_invalid_sql)
+            pcm_f1 = batch_scores.pcm_f1()
+            pcm_em = batch_scores.pcm_em()
+            if pcm_f1 is None:
                 if self._punish_invalid_sql:
                     self._pcm_f1(0)
-            else:
-                self._pcm_f1(sum(pcm_f1_scores) / len(pcm_f1_scores))
-
-            # PCM-EM
-            pcm_em_scores = evaluate(translated_gold, translated_predicted, self._punish_invalid_sql, exact_match=True)
-            pcm_em_scores = [num for num in pcm_em_scores if isinstance(num, (int, float))]
-            if not pcm_em_scores:
-                if self._punish_invalid_sql:
                     self._pcm_em(0)
             else:
-                self._pcm_em(sum(pcm_em_scores) / len(pcm_em_scores))
+                self._pcm_f1(pcm_f1)
+                self._pcm_em(pcm_em)
 
         # Spider's Exact-Match
         if self._measure_sql_match:
@@ -361,6 +371,8 @@ class T5(Model):
                 metrics["partial_match_f1"] = self._pcm_f1.get_metric(reset=reset)
                 metrics["partial_match_em"] = self._pcm_em.get_metric(reset=reset)
                 metrics["parsable_queries_accuracy"] = self._parsable_queries_accuracy.get_metric(reset=reset)
+                metrics["jsql_short_circuited_calls"] = self._jsql_parser.get_short_circuited_count()
+                metrics.update(self._jsql_parser.get_instrumentation_stats(reset=reset))
             if self._measure_sql_match:
                 metrics["exact_match_accuracy"] = self._accuracy.get_metric(reset=reset)
         return metrics
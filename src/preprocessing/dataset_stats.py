@@ -0,0 +1,238 @@
+import argparse
+import json
+import time
+from collections import Counter, deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from functools import partial
+from typing import Any, Callable, Deque, Dict, Iterable, Iterator, List, Optional
+
+import srsly
+from more_itertools import chunked
+
+from src.ext_services.jsql_parser import JSQLParser
+from src.metrics.partial_match_eval.evaluate import CLAUSES
+from src.preprocessing.sql_utils import (
+    get_sample_sql,
+    nesting_depth_and_breadth,
+    preprocess_for_jsql,
+    standardise_blank_spaces,
+    tokenize_sql,
+)
+
+# one parser per backend in every process, so the chunks of a worker share it
+_PARSERS: Dict[str, JSQLParser] = {}
+
+
+def _get_parser(jsql_backend: str) -> JSQLParser:
+    if jsql_backend not in _PARSERS:
+        _PARSERS[jsql_backend] = JSQLParser.create(backend=jsql_backend)
+    return _PARSERS[jsql_backend]
+
+
+def _rate(count: int, total: int) -> Optional[float]:
+    return count / total if total else None
+
+
+def _mean(histogram: Counter) -> Optional[float]:
+    total = sum(histogram.values())
+    return sum(value * count for value, count in histogram.items()) / total if total else None
+
+
+def _sorted_histogram(histogram: Counter) -> Dict[int, int]:
+    return {value: histogram[value] for value in sorted(histogram)}
+
+
+class DatasetStats:
+    """
+    Statistics of the SQL of a dataset, kept as counts so the statistics of chunks of the dataset can be computed
+    separately (e.g. in worker processes) and merged:
+    - the nesting depth and breadth of nesting_depth_and_breadth, for the queries it can handle
+    - a histogram of the number of tokens of tokenize_sql, in buckets of `token_bucket_size`
+    - the queries preprocess_for_jsql fails to clean
+    - with a JSQL backend, the cleaned queries that cannot be parsed (the queries that fail to clean are not sent to
+      the parser), and how many of the parsed queries have items in every clause of the partial component match
+      (CLAUSES)
+    """
+
+    def __init__(self, token_bucket_size: int = 10, jsql_backend: str = None):
+        self.token_bucket_size = token_bucket_size
+        self.jsql_backend = jsql_backend
+        self.queries = 0
+        self.nesting_failures = 0
+        self.depths: Counter = Counter()
+        self.breadths: Counter = Counter()
+        self.token_lengths: Counter = Counter()
+        self.token_length_sum = 0
+        self.max_token_length = 0
+        self.cleaning_failures = 0
+        self.parse_failures = 0
+        self.clauses: Counter = Counter()
+
+    def add(self, sql: str) -> None:
+        self.queries += 1
+        standardised_sql = standardise_blank_spaces(sql)
+        try:
+            depth, breadth = nesting_depth_and_breadth(standardised_sql)
+            self.depths[depth] += 1
+            self.breadths[breadth] += 1
+        except IndexError:
+            # unbalanced brackets, like calculate_nesting_level
+            self.nesting_failures += 1
+
+        token_length = len(tokenize_sql(standardised_sql).split())
+        self.token_lengths[token_length // self.token_bucket_size * self.token_bucket_size] += 1
+        self.token_length_sum += token_length
+        self.max_token_length = max(self.max_token_length, token_length)
+
+        cleaned_sql = preprocess_for_jsql(sql)
+        if not cleaned_sql:
+            self.cleaning_failures += 1
+        elif self.jsql_backend:
+            self._add_parsed(cleaned_sql)
+
+    def _add_parsed(self, cleaned_sql: str) -> None:
+        parsed_sql = _get_parser(self.jsql_backend).translate(cleaned_sql, clean=False)
+        if not parsed_sql:
+            self.parse_failures += 1
+            return
+        for clause in CLAUSES:
+            if any(select_body[0].get(clause) for select_body in parsed_sql.values()):
+                self.clauses[clause] += 1
+
+    def merge(self, other: "DatasetStats") -> None:
+        assert self.token_bucket_size == other.token_bucket_size and self.jsql_backend == other.jsql_backend
+        self.queries += other.queries
+        self.nesting_failures += other.nesting_failures
+        self.depths.update(other.depths)
+        self.breadths.update(other.breadths)
+        self.token_lengths.update(other.token_lengths)
+        self.token_length_sum += other.token_length_sum
+        self.max_token_length = max(self.max_token_length, other.max_token_length)
+        self.cleaning_failures += other.cleaning_failures
+        self.parse_failures += other.parse_failures
+        self.clauses.update(other.clauses)
+
+    def get_report(self) -> Dict[str, Any]:
+        report = {
+            "queries": self.queries,
+            "nesting": {
+                "failures": self.nesting_failures,
+                "mean_depth": _mean(self.depths),
+                "depth": _sorted_histogram(self.depths),
+                "mean_breadth": _mean(self.breadths),
+                "breadth": _sorted_histogram(self.breadths),
+            },
+            "tokens": {
+                "mean": _rate(self.token_length_sum, self.queries),
+                "max": self.max_token_length,
+                "bucket_size": self.token_bucket_size,
+                "histogram": _sorted_histogram(self.token_lengths),
+            },
+            "cleaning_failures": self.cleaning_failures,
+            "cleaning_failure_rate": _rate(self.cleaning_failures, self.queries),
+        }
+        if self.jsql_backend:
+            cleaned = self.queries - self.cleaning_failures
+            parsed = cleaned - self.parse_failures
+            report.update(
+                {
+                    "parse_failures": self.parse_failures,
+                    "parse_failure_rate": _rate(self.parse_failures, cleaned),
+                    "clauses": {clause: self.clauses[clause] for clause in CLAUSES},
+                    "clause_rates": {clause: _rate(self.clauses[clause], parsed) for clause in CLAUSES},
+                }
+            )
+        return report
+
+
+def read_samples(path: str) -> Iterator[Dict]:
+    """The samples of a SEDE JSONL file, read line by line, or of a Spider JSON file (a list of samples)."""
+    if path.endswith(".jsonl"):
+        yield from srsly.read_jsonl(path)
+    else:
+        with open(path, "r") as in_fp:
+            yield from json.load(in_fp)
+
+
+def _chunk_stats(queries: List[str], token_bucket_size: int, jsql_backend: Optional[str]) -> DatasetStats:
+    stats = DatasetStats(token_bucket_size, jsql_backend)
+    for sql in queries:
+        stats.add(sql)
+    return stats
+
+
+def _map_chunks(
+    chunks: Iterable[List[str]], chunk_stats: Callable[[List[str]], DatasetStats], workers: int
+) -> Iterator[DatasetStats]:
+    # like clean_batch, at most 2 chunks per worker are submitted ahead, so the file is not read into memory
+    if workers <= 1:
+        for chunk in chunks:
+            yield chunk_stats(chunk)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending: Deque[Future] = deque()
+        for chunk in chunks:
+            pending.append(executor.submit(chunk_stats, chunk))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def calculate_dataset_stats(
+    paths: List[str],
+    workers: int = 1,
+    chunk_size: int = 1000,
+    token_bucket_size: int = 10,
+    jsql_backend: str = "python",
+) -> Dict[str, Any]:
+    """
+    The DatasetStats report of every file, streamed in chunks of `chunk_size` queries computed by `workers`
+    processes, and of all the files together. `jsql_backend` ("python", "rest", or None to skip parsing) is the one of
+    JSQLParser.create.
+    """
+    chunk_stats = partial(_chunk_stats, token_bucket_size=token_bucket_size, jsql_backend=jsql_backend)
+    total = DatasetStats(token_bucket_size, jsql_backend)
+    reports: Dict[str, Any] = {}
+    for path in paths:
+        file_stats = DatasetStats(token_bucket_size, jsql_backend)
+        queries = (get_sample_sql(sample) for sample in read_samples(path))
+        for stats in _map_chunks(chunked(queries, chunk_size), chunk_stats, workers):
+            file_stats.merge(stats)
+        total.merge(file_stats)
+        reports[path] = file_stats.get_report()
+    return {"files": reports, "total": total.get_report()}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Statistics of the SQL of SEDE (.jsonl) and Spider (.json) files")
+    parser.add_argument("paths", type=str, nargs="+", help="Dataset files, e.g. data/sede/train.jsonl")
+    parser.add_argument("--output", type=str, help="JSON file for the report", required=True)
+    parser.add_argument("--workers", type=int, default=1, help="Number of processes computing chunks of the queries")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="Number of queries computed at once")
+    parser.add_argument("--token-bucket-size", type=int, default=10, help="Bucket size of the token length histogram")
+    parser.add_argument(
+        "--jsql-backend",
+        type=str,
+        default="python",
+        choices=["rest", "python", "none"],
+        help="Parse queries with the JSQL service (rest), in-process (python), or not at all (none)",
+    )
+    args = parser.parse_args()
+
+    start_time = time.perf_counter()
+    dataset_stats = calculate_dataset_stats(
+        args.paths,
+        args.workers,
+        args.chunk_size,
+        args.token_bucket_size,
+        None if args.jsql_backend == "none" else args.jsql_backend,
+    )
+    with open(args.output, "w") as out_fp:
+        json.dump(dataset_stats, out_fp, indent=2)
+    elapsed = time.perf_counter() - start_time
+    query_count = dataset_stats["total"]["queries"]
+    print(
+        f"Computed the statistics of {query_count} queries in {elapsed:.2f}s ({query_count / elapsed:.1f} queries/sec)"
+    )
@@ -0,0 +1,71 @@
+import re
+from bisect import bisect_right
+from typing import List, NamedTuple, Optional, Tuple
+
+# token kinds
+STRING = "string"
+OPERATOR = "operator"
+TEXT = "text"
+
+# a quote opens a string that ends with the same quote, or with the query, like update_quotes tracks them
+_STRING = r"""'[^']*'?|"[^"]*"?"""
+_STRING_PATTERN = re.compile(_STRING)
+# a run of comparison/arithmetic characters is one operator, as standardise_blank_spaces keeps them together, and
+# everything else (words, numbers, blank spaces) is text
+_TOKEN_PATTERN = re.compile(
+    rf"(?P<{STRING}>{_STRING})"
+    rf"|(?P<{OPERATOR}>[!=<>+*]+|[,;()\[\]{{}}/\\#])"
+    rf"""|(?P<{TEXT}>[^'"!=<>,;()\[\]{{}}+*/\\#]+)"""
+)
+_PART_PATTERN = re.compile(r"\S+")
+
+
+class SqlToken(NamedTuple):
+    kind: str
+    start: int
+    end: int
+    # the quote character of a string
+    quote: Optional[str] = None
+    # whether a string ends with its quote, the last string of a query may not
+    closed: bool = True
+
+
+def _string_token(match: re.Match) -> SqlToken:
+    text = match.group()
+    return SqlToken(STRING, match.start(), match.end(), text[0], len(text) > 1 and text[-1] == text[0])
+
+
+def lex_sql(query: str) -> List[SqlToken]:
+    """
+    Splits the query into strings, operators and the text between them, in a single scan. The tokens cover the
+    query, so query[token.start:token.end] concatenated gives it back.
+    """
+    return [
+        _string_token(match) if match.lastgroup == STRING else SqlToken(match.lastgroup, match.start(), match.end())
+        for match in _TOKEN_PATTERN.finditer(query)
+    ]
+
+
+def lex_strings(query: str) -> List[SqlToken]:
+    """The string tokens of lex_sql, found without the other tokens (a quote is always the start or end of one)."""
+    return [_string_token(match) for match in _STRING_PATTERN.finditer(query)]
+
+
+def split_with_strings(query: str) -> List[Tuple[int, str, Optional[SqlToken]]]:
+    """
+    The start of every part of query.split(), the part, and the string token of lex_sql the part starts in (None
+    outside of strings), so the parts of a query can be handled with its quotes tracked once. The strings are lexed
+    once per query, and the string of a part is found by bisecting their starts.
+    """
+    strings = lex_strings(query)
+    if not strings:
+        return [(match.start(), match.group(), None) for match in _PART_PATTERN.finditer(query)]
+
+    string_starts = [string.start for string in strings]
+    parts = []
+    for match in _PART_PATTERN.finditer(query):
+        start = match.start()
+        index = bisect_right(string_starts, start) - 1
+        string = strings[index] if index >= 0 and start < strings[index].end else None
+        parts.append((start, match.group(), string))
+    return parts
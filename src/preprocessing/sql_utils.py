@@ -1,47 +1,68 @@
 import re
 from collections import Counter
-from typing import Optional, List
-
-ALIAS_PATTERN = re.compile(r"\[([^\]]+)]", re.MULTILINE | re.IGNORECASE)
-TAGS_PATTERN = re.compile(r"([^'%])(##[a-z0-9_?:]+##)([^'%]?)", re.MULTILINE | re.IGNORECASE)
-TOP_TAGS_PATTERN = re.compile(
-    r"(top|percentile_cont)([ ]+)?[\(]?[ ]?(##[a-z0-9_]+(:[a-z]+)?(\?([0-9.]+))?##)[ ]?[\)]?", re.IGNORECASE
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from src.preprocessing.sql_lexer import OPERATOR, STRING, lex_sql, split_with_strings
+from src.sql_preprocessing.sql_patterns import (
+    ALIAS_PATTERN,
+    BLOCK_COMMENT_PATTERN,
+    COMMENT_AT_BEGINNING_PATTERN,
+    COMMENT_AT_END_PATTERN,
+    DECLARE_BEFORE_SELECT_PATTERN,
+    DECLARE_LINE_PATTERN,
+    DECLARE_STATEMENT_PATTERN,
+    DOUBLE_BACKTICK_PATTERN,
+    DOUBLE_QUOTE_PATTERN,
+    FORMAT_FUNCTION_PATTERN,
+    LINE_COMMENT_PATTERN,
+    NEW_LINES_PATTERN,
+    NON_ASCII_PATTERN,
+    SEMICOLON_LINE_PATTERN,
+    SPACES_PATTERN,
+    TAGS_PATTERN,
+    TOP_TAGS_PATTERN,
+    UNICODE_STRING_PATTERN,
+    substitute,
 )
 
 
 def _remove_comment_at_beginning(cleaned_query: str) -> str:
-    return re.sub(r"^([- ]+|(result))+", "", cleaned_query, re.MULTILINE)
+    return COMMENT_AT_BEGINNING_PATTERN.sub("", cleaned_query)
 
 
-def remove_comments(sql: str) -> str:
+def remove_comments(sql: str, legacy_flags: bool = True) -> str:
     # remove comments at the beginning of line
     sql = _remove_comment_at_beginning(sql)
 
     # remove comments at the end of lines
-    sql = re.sub(r"--(.+)?\n", "", sql)
+    sql = LINE_COMMENT_PATTERN.sub("", sql)
 
     # remove comments at the end of lines
-    sql = re.sub(r"\n;\n", " ", sql)
+    sql = SEMICOLON_LINE_PATTERN.sub(" ", sql)
 
-    sql = re.sub(" +", " ", sql)
+    sql = SPACES_PATTERN.sub(" ", sql)
 
     return sql.strip()
 
 
-def remove_comments_after_removing_new_lines(sql: str) -> str:
+def remove_comments_after_removing_new_lines(sql: str, legacy_flags: bool = True) -> str:
     # remove comments at the end of the query
-    sql = re.sub(r"--(.?)+$", "", sql, re.MULTILINE)
+    sql = substitute(COMMENT_AT_END_PATTERN, "", sql, legacy_flags)
 
     # remove comments like /* a comment */
-    sql = re.sub(r"/\*[^*/]+\*/", "", sql, re.MULTILINE)
+    sql = substitute(BLOCK_COMMENT_PATTERN, "", sql, legacy_flags)
 
-    sql = re.sub(" +", " ", sql)
+    sql = SPACES_PATTERN.sub(" ", sql)
 
     return sql.strip()
 
 
+# number of characters _surrounded_by_apostrophes reads on each side of a match, starting with its first/next one
+_APOSTROPHE_STEPS = 10
+
+
 def _surrounded_by_apostrophes(sql: str, start_index: int, end_index: int) -> bool:
-    max_steps = 10
+    max_steps = _APOSTROPHE_STEPS
 
     starts_with_apostrophe = False
     step_count = 0
@@ -70,10 +91,8 @@ def _surrounded_by_apostrophes(sql: str, start_index: int, end_index: int) -> bo
     return starts_with_apostrophe and end_with_apostrophe
 
 
-# pylint: disable=too-many-branches
-def preprocess_for_jsql(sql: str) -> Optional[str]:
-    # replace all alias like "as [User Id]" to "as 'user_id'"
-    match = re.search(ALIAS_PATTERN, sql)
+def _rewrite_aliases_by_searching(sql: str) -> str:
+    match = ALIAS_PATTERN.search(sql)
     while match is not None:
         group_one = match.group(1)
         if not _surrounded_by_apostrophes(sql, match.start(), match.end()):
@@ -84,60 +103,168 @@ def preprocess_for_jsql(sql: str) -> Optional[str]:
         if " " in new_alias:
             new_alias = new_alias.replace(" ", "_")
         sql = sql.replace(match.group(0), new_alias)
-        match = re.search(ALIAS_PATTERN, sql)
+        match = ALIAS_PATTERN.search(sql)
+    return sql
 
-    # replace all parameters like "TOP ##topn:int?200##" to "TOP 200"
-    match = re.search(TOP_TAGS_PATTERN, sql)
+
+def _context_after_alias(sql: str, matches: List[re.Match], index: int, new_aliases: Dict[str, str]) -> str:
+    # the characters _surrounded_by_apostrophes reads after the alias, with the aliases replaced so far
+    context: List[str] = []
+    length = 0
+    position = matches[index].end()
+    for next_index in range(index + 1, len(matches)):
+        next_match = matches[next_index]
+        gap = sql[position : min(next_match.start(), position + _APOSTROPHE_STEPS - length)]
+        context.append(gap)
+        length += len(gap)
+        if length >= _APOSTROPHE_STEPS:
+            return "".join(context)
+        context.append(new_aliases.get(next_match.group(0), next_match.group(0)))
+        length += len(context[-1])
+        if length >= _APOSTROPHE_STEPS:
+            return "".join(context)[:_APOSTROPHE_STEPS]
+        position = next_match.end()
+    context.append(sql[position : position + _APOSTROPHE_STEPS - length])
+    return "".join(context)
+
+
+def _rewrite_aliases(sql: str) -> str:
+    """
+    Replaces every alias like "[User Id]" as _rewrite_aliases_by_searching does, in one pass: an alias is rewritten
+    where it first appears, seeing the aliases before it already rewritten, and its other appearances get the same
+    replacement.
+    """
+    matches = list(ALIAS_PATTERN.finditer(sql))
+    if any("[" in match.group(1) for match in matches):
+        # an alias inside brackets, replacing it changes the aliases that are found next
+        return _rewrite_aliases_by_searching(sql)
+
+    new_aliases: Dict[str, str] = {}
+    parts: List[str] = []
+    before = ""
+    position = 0
+    for index, match in enumerate(matches):
+        alias = match.group(0)
+        gap = sql[position : match.start()]
+        before = (before + gap[-_APOSTROPHE_STEPS:])[1 - _APOSTROPHE_STEPS :]
+        if alias not in new_aliases:
+            window = before + alias + _context_after_alias(sql, matches, index, new_aliases)
+            if not _surrounded_by_apostrophes(window, len(before), len(before) + len(alias)):
+                new_alias = f"'{match.group(1).lower()}'"
+            else:
+                new_alias = match.group(1).lower()
+            new_aliases[alias] = new_alias.replace(" ", "_")
+        parts.append(gap)
+        parts.append(new_aliases[alias])
+        before = (before + new_aliases[alias])[1 - _APOSTROPHE_STEPS :]
+        position = match.end()
+    parts.append(sql[position:])
+    return "".join(parts)
+
+
+def _top_tag_replacement(match: re.Match) -> str:
+    default_number = match.group(6)
+    if default_number is not None:
+        return f"{match.group(1)} ({default_number})"
+    return f"{match.group(1)} (100)"
+
+
+def _rewrite_top_tags_by_searching(sql: str) -> str:
+    match = TOP_TAGS_PATTERN.search(sql)
     while match is not None:
-        group_zero = match.group(0)
-        default_number = match.group(6)
+        sql = sql.replace(match.group(0), _top_tag_replacement(match))
+        match = TOP_TAGS_PATTERN.search(sql)
+    return sql
 
-        if default_number is not None:
-            new_alias = f"{match.group(1)} ({default_number})"
+
+def _rewrite_top_tags(sql: str) -> str:
+    """Replaces every parameter like "TOP ##topn:int?200##" as _rewrite_top_tags_by_searching does, in one pass."""
+    matches = list(TOP_TAGS_PATTERN.finditer(sql))
+    counts = Counter(match.group(0) for match in matches)
+    if any(sql.count(tag) != count for tag, count in counts.items()):
+        # a tag also appears outside of the matches, e.g. followed by a bracket the match does not include
+        return _rewrite_top_tags_by_searching(sql)
+
+    parts: List[str] = []
+    position = 0
+    for match in matches:
+        parts.append(sql[position : match.start()])
+        parts.append(_top_tag_replacement(match))
+        position = match.end()
+    parts.append(sql[position:])
+    return "".join(parts)
+
+
+def _quote_tags(sql: str) -> str:
+    # every match is checked for apostrophes in the text after the previous match only
+    parts: List[str] = []
+    position = 0
+    for match in TAGS_PATTERN.finditer(sql):
+        window_start = max(position, match.start() - _APOSTROPHE_STEPS + 1)
+        window = sql[window_start : match.end() + _APOSTROPHE_STEPS]
+        if not _surrounded_by_apostrophes(window, match.start() - window_start, match.end() - window_start):
+            new_alias = f"{match.group(1)}'{match.group(2)}'{match.group(3)}"
         else:
-            new_alias = f"{match.group(1)} (100)"
+            new_alias = match.group(0)
+        parts.append(sql[position : match.start()])
+        parts.append(new_alias)
+        position = match.end()
+    parts.append(sql[position:])
+    return "".join(parts)
+
+
+def _rewrite_tags(sql: str) -> str:
+    """
+    Rewrites the aliases and parameters in a pass over the query per pattern, with the output of the loops that
+    searched from the start of the query after every replacement (rewrite_tags_by_searching of
+    benchmark_preprocess_for_jsql).
+    """
+    # replace all alias like "as [User Id]" to "as 'user_id'"
+    if "[" in sql:
+        sql = _rewrite_aliases(sql)
 
-        sql = sql.replace(group_zero, new_alias)
-        match = re.search(TOP_TAGS_PATTERN, sql)
+    # parameters are between "##", most queries have none
+    if "##" not in sql:
+        return sql
+
+    # replace all parameters like "TOP ##topn:int?200##" to "TOP 200"
+    sql = _rewrite_top_tags(sql)
 
     # replace all parameters like ##tagName:Java## to '##tagName:Java##'
-    new_sql = ""
-    match = re.search(TAGS_PATTERN, sql)
-    while match is not None:
-        group_two = match.group(2)
+    return _quote_tags(sql)
 
-        if not _surrounded_by_apostrophes(sql, match.start(), match.end()):
-            new_alias = f"{match.group(1)}'{group_two}'{match.group(3)}"
-            new_sql = new_sql + sql[0 : match.start()] + new_alias
-        else:
-            new_sql = new_sql + sql[0 : match.start()] + match.group(0)
 
-        sql = sql[match.end() :]
-        match = re.search(TAGS_PATTERN, sql)
-    if sql:
-        new_sql = new_sql + sql
-    sql = new_sql
+def preprocess_for_jsql(sql: str, legacy_flags: bool = True) -> Optional[str]:
+    """
+    :param sql: str
+    :param legacy_flags: bool, keep the replacements of the patterns whose flags used to be passed as the count of
+    re.sub (see sql_patterns.substitute), which the datasets were cleaned with
+    :return: Optional[str]
+    """
+    return _clean_rewritten_sql(_rewrite_tags(sql), legacy_flags)
+
 
+def _clean_rewritten_sql(sql: str, legacy_flags: bool = True) -> Optional[str]:
     # convert FORMAT function to CONVERT function to support JSQL
-    sql = re.sub(r" format\(", " convert(", sql, flags=re.IGNORECASE)
+    sql = FORMAT_FUNCTION_PATTERN.sub(" convert(", sql)
 
     # remove comments from SQL
-    sql = remove_comments(sql)
+    sql = remove_comments(sql, legacy_flags)
 
     # replace N'%Kitchener%' with '%Kitchener%'
-    sql = re.sub(r" N'", " '", sql, re.IGNORECASE)
+    sql = substitute(UNICODE_STRING_PATTERN, " '", sql, legacy_flags)
 
     # remove declares with a new line
-    sql = re.sub(r"(DECLARE|declare) [^\n]+\n", " ", sql, re.IGNORECASE | re.MULTILINE | re.DOTALL)
+    sql = substitute(DECLARE_LINE_PATTERN, " ", sql, legacy_flags)
 
     # remove new lines
-    sql = re.sub(r"[\n\t\r]+", " ", sql)
+    sql = NEW_LINES_PATTERN.sub(" ", sql)
 
-    sql = remove_comments_after_removing_new_lines(sql)
+    sql = remove_comments_after_removing_new_lines(sql, legacy_flags)
 
     # remove declares
-    sql = re.sub(r"(DECLARE|declare) [^;]+;", " ", sql, re.IGNORECASE | re.MULTILINE | re.DOTALL)
-    sql = re.sub(r"(DECLARE|declare) (?:.(?!(SELECT|select)))", "SELECT", sql)
+    sql = substitute(DECLARE_STATEMENT_PATTERN, " ", sql, legacy_flags)
+    sql = DECLARE_BEFORE_SELECT_PATTERN.sub("SELECT", sql)
 
     if "))))))))))))))))))))" in sql or "((((((((((((((((((((" in sql:
         return None
@@ -145,10 +272,10 @@ def preprocess_for_jsql(sql: str) -> Optional[str]:
     if "cast(avg(cast(avg(cast(avg(cast(avg(cast(avg(cast(avg(cast(avg(" in sql:
         return None
 
-    sql = re.sub(r"[^\x00-\x7f]", r" ", sql)
-    sql = re.sub(r"``", r"'", sql)
-    sql = re.sub(r"\"", r"'", sql)
-    sql = re.sub(r" +", " ", sql).strip()
+    sql = NON_ASCII_PATTERN.sub(" ", sql)
+    sql = DOUBLE_BACKTICK_PATTERN.sub("'", sql)
+    sql = DOUBLE_QUOTE_PATTERN.sub("'", sql)
+    sql = SPACES_PATTERN.sub(" ", sql).strip()
 
     if not sql:
         return None
@@ -218,81 +345,35 @@ def update_quotes(char, in_single, in_double):
     return in_single, in_double
 
 
-# pylint: disable=too-many-branches
-def standardise_blank_spaces(query):
-    """
-    Taken from: https://github.com/jkkummerfeld/text2sql-data
-    :param query:
-    :return:
-    """
-    # split on special characters except _.:-
-    in_squote, in_dquote = False, False
-    tmp_query = []
-    pos = 0
-    while pos < len(query):
-        char = query[pos]
-        pos += 1
-        # Handle whether we are in quotes
-        if char in ["'", '"']:
-            if not (in_squote or in_dquote):
-                tmp_query.append(" ")
-            in_squote, in_dquote = update_quotes(char, in_squote, in_dquote)
-            tmp_query.append(char)
-            if not (in_squote or in_dquote):
-                tmp_query.append(" ")
-        elif in_squote or in_dquote:
-            tmp_query.append(char)
-        elif char in "!=<>,;()[]{}+*/\\#":
-            tmp_query.append(" ")
-            tmp_query.append(char)
-            while pos < len(query) and query[pos] in "!=<>+*" and char in "!=<>+*":
-                tmp_query.append(query[pos])
-                pos += 1
-            tmp_query.append(" ")
-        else:
-            tmp_query.append(char)
-    new_query = "".join(tmp_query)
+def _strip_string(text: str, closed: bool) -> str:
+    # remove blank spaces just inside the quotes of a string, and next to a "%" just inside them
+    quote = text[0]
+    inner = text[1:-1] if closed else text[1:]
+    inner = inner.lstrip(" \n")
+    if inner.startswith("%"):
+        inner = "%" + inner[1:].lstrip(" \n")
+    if closed:
+        if inner and inner[-1] in " \n":
+            inner = inner[:-1]
+        elif len(inner) > 1 and inner[-1] == "%" and inner[-2] in " \n":
+            inner = inner[:-2] + "%"
+        return quote + inner + quote
+    return quote + inner
 
-    # Remove blank spaces just inside quotes:
-    tmp_query = []
-    in_squote, in_dquote = False, False
-    prev = None
-    prev2 = None
-    for char in new_query:
-        skip = False
-        for quote, symbol in [(in_squote, "'"), (in_dquote, '"')]:
-            if quote:
-                if char in " \n" and prev == symbol:
-                    skip = True
-                    break
-                if char in " \n" and prev == "%" and prev2 == symbol:
-                    skip = True
-                    break
-                if char == symbol and prev in " \n":
-                    tmp_query.pop()
-                elif char == symbol and prev == "%" and prev2 in " \n":
-                    tmp_query.pop(len(tmp_query) - 2)
-        if skip:
-            continue
-
-        in_squote, in_dquote = update_quotes(char, in_squote, in_dquote)
-        tmp_query.append(char)
-        prev2 = prev
-        prev = char
-    new_query = "".join(tmp_query)
 
+def _replace_single_quotes(query: str) -> str:
     # Replace single quotes with double quotes where possible
     tmp_query = []
     in_squote, in_dquote = False, False
     pos = 0
-    while pos < len(new_query):
-        char = new_query[pos]
+    while pos < len(query):
+        char = query[pos]
         if (not in_dquote) and char == "'":
             to_add = [char]
             pos += 1
             saw_double = False
-            while pos < len(new_query):
-                tchar = new_query[pos]
+            while pos < len(query):
+                tchar = query[pos]
                 if tchar == '"':
                     saw_double = True
                 to_add.append(tchar)
@@ -309,43 +390,120 @@ def standardise_blank_spaces(query):
         in_squote, in_dquote = update_quotes(char, in_squote, in_dquote)
 
         pos += 1
-    new_query = "".join(tmp_query)
+    return "".join(tmp_query)
+
+
+# the functions standardise_blank_spaces writes without the blank space before the bracket
+_FUNCTION_PATTERN = re.compile(
+    r"(count|lower|max|min|sum|COUNT|LOWER|MAX|MIN|SUM) \(|COUNT\((?=\*)|YEAR \( CURDATE \( \) \)"
+)
+
+
+def _function_replacement(match: re.Match) -> str:
+    if match.group(1) is None:
+        return "COUNT( " if match.group().startswith("COUNT") else "YEAR(CURDATE())"
+    function = match.group(1).upper() + "("
+    if function == "COUNT(" and match.string.startswith("*", match.end()):
+        return "COUNT( "
+    return function
+
+
+def standardise_blank_spaces(query):
+    """
+    Taken from: https://github.com/jkkummerfeld/text2sql-data, with a single scan of lex_sql
+    :param query:
+    :return:
+    """
+    # the single quotes of a query without double quotes can be replaced while scanning
+    replace_single_quotes = '"' not in query
+    parts = []
+    for token in lex_sql(query):
+        text = query[token.start : token.end]
+        if token.kind == STRING:
+            # split on quotes, and remove blank spaces just inside them
+            parts.append(" ")
+            text = _strip_string(text, token.closed)
+            if replace_single_quotes:
+                # an unclosed string loses its last character
+                text = '"' + text[1:-1] + '"' if len(text) > 1 else '"'
+            parts.append(text)
+            if token.closed:
+                parts.append(" ")
+        elif token.kind == OPERATOR:
+            # split on special characters except _.:-
+            parts.append(" ")
+            parts.append(text)
+            parts.append(" ")
+        else:
+            parts.append(text)
+    new_query = "".join(parts)
+    if not replace_single_quotes:
+        new_query = _replace_single_quotes(new_query)
 
     # remove repeated blank spaces
     new_query = " ".join(new_query.split())
 
     # Remove spaces that would break SQL functions
-    new_query = "COUNT(".join(new_query.split("count ("))
-    new_query = "LOWER(".join(new_query.split("lower ("))
-    new_query = "MAX(".join(new_query.split("max ("))
-    new_query = "MIN(".join(new_query.split("min ("))
-    new_query = "SUM(".join(new_query.split("sum ("))
-    new_query = "COUNT(".join(new_query.split("COUNT ("))
-    new_query = "LOWER(".join(new_query.split("LOWER ("))
-    new_query = "MAX(".join(new_query.split("MAX ("))
-    new_query = "MIN(".join(new_query.split("MIN ("))
-    new_query = "SUM(".join(new_query.split("SUM ("))
-    new_query = "COUNT( *".join(new_query.split("COUNT(*"))
-    new_query = "YEAR(CURDATE())".join(new_query.split("YEAR ( CURDATE ( ) )"))
-
-    return new_query
-
-
-def update_in_quote(in_quote, token):
+    return _FUNCTION_PATTERN.sub(_function_replacement, new_query)
+
+
+# pylint: disable=too-many-branches
+def nesting_depth_and_breadth(sql: str) -> Tuple[int, int]:
     """
-    Taken from: https://github.com/jkkummerfeld/text2sql-data
-    :param in_quote:
-    :param token:
-    :return:
+    Taken from: https://github.com/jkkummerfeld/text2sql-data, the parts of strings are skipped with split_with_strings
+    :param sql: a query of standardise_blank_spaces
+    :return: the maximum depth of SELECT statements, and the maximum number of SELECT statements at the same depth
+    (e.g. 2 for a query with two subqueries)
     """
-    if '"' in token and len(token.split('"')) % 2 == 0:
-        in_quote[0] = not in_quote[0]
-    if "'" in token and len(token.split("'")) % 2 == 0:
-        in_quote[1] = not in_quote[1]
+    max_depth = 0
+    max_breadth = 0
+    depth = 0
+    prev = None
+    other_bracket = []
+    breadth = [0]
+    for start, token, string in split_with_strings(sql):
+        if string is not None and string.start < start:
+            # the rest of a string with blank spaces
+            pass
+        elif token == "SELECT":
+            depth += 1
+            max_depth = max(max_depth, depth)
+            other_bracket.append(0)
+            breadth[-1] += 1
+            max_breadth = max(max_breadth, breadth[-1])
+            breadth.append(0)
+        elif prev is not None and "(" in prev:
+            other_bracket[-1] += 1
+        elif token == ")":
+            if other_bracket[-1] == 0:
+                depth -= 1
+                other_bracket.pop()
+                breadth.pop()
+            else:
+                other_bracket[-1] -= 1
+
+        if "(" in token and ")" in token:
+            prev = "SQL_FUNCTION"
+        else:
+            prev = token
+    return max_depth, max_breadth
+
+
+def normalize_sql(sql: str) -> str:
+    """The form in which evaluate_predictions compares gold and predicted SQL: lowercased, without repeated spaces."""
+    return re.sub(r" +", " ", sql).lower().strip()
+
+
+def get_sample_sql(sample: Dict) -> str:
+    """The SQL of a Spider ("query") or SEDE ("QueryBody") sample."""
+    if "query" in sample:
+        return sample["query"]
+    if "QueryBody" in sample:
+        return sample["QueryBody"]
+    raise ValueError("Found no SQL in example")
 
 
-# pylint: disable=too-many-branches,unsupported-membership-test
-def calculate_nesting_level(train_dev_test: List, stats: Counter):
+def calculate_nesting_level(train_dev_test: Iterable[Dict], stats: Counter):
     """
     Taken from: https://github.com/jkkummerfeld/text2sql-data
     :param train_dev_test:
@@ -353,82 +511,38 @@ def calculate_nesting_level(train_dev_test: List, stats: Counter):
     :return:
     """
     for sample in train_dev_test:
+        sql = get_sample_sql(sample)
         try:
-            if "query" in sample:
-                sql = sample["query"]
-            elif "QueryBody" in sample:
-                sql = sample["QueryBody"]
-            else:
-                raise ValueError("Found no SQL in example")
-
-            sql = standardise_blank_spaces(sql)
-            max_depth = 0
-            max_breadth = 1
-            depth = 0
-            prev = None
-            other_bracket = []
-            breadth = [0]
-            in_quote = [False, False]
-            for token in sql.split():
-                if in_quote[0] or in_quote[1]:
-                    update_in_quote(in_quote, token)
-                elif token == "SELECT":
-                    depth += 1
-                    max_depth = max(max_depth, depth)
-                    other_bracket.append(0)
-                    breadth[-1] += 1
-                    breadth.append(0)
-                elif prev is not None and "(" in prev:
-                    other_bracket[-1] += 1
-                    update_in_quote(in_quote, token)
-                elif token == ")":
-                    if other_bracket[-1] == 0:
-                        depth -= 1
-                        other_bracket.pop()
-                        possible = breadth.pop()
-                        max_breadth = max(max_breadth, possible)
-                    else:
-                        other_bracket[-1] -= 1
-                else:
-                    update_in_quote(in_quote, token)
-
-                if "(" in token and ")" in token:
-                    prev = "SQL_FUNCTION"
-                else:
-                    prev = token
-            stats[max_depth] += 1
+            stats[nesting_depth_and_breadth(standardise_blank_spaces(sql))[0]] += 1
         except IndexError:
             pass
 
 
+# a table and its alias in the anonymized queries of text2sql-data, e.g. AUTHORalias0
+_ALIAS_PATTERN = re.compile(r"(?P<table>[A-Z_]+)(?P<alias>alias\d+)")
+
+
 def tokenize_sql(query):
     """
-    Taken from: https://github.com/jkkummerfeld/text2sql-data
+    Taken from: https://github.com/jkkummerfeld/text2sql-data, with the strings of split_with_strings
     :param query:
     :return:
     """
     tokens = []
-    in_squote, in_dquote = False, False
-    for token in query.split():
+    for start, token, string in split_with_strings(query):
+        quote = string.quote if string is not None else None
+
         # Handle prefixes
-        if not (in_squote or in_dquote):
+        if string is not None and string.start == start:
             if token.startswith("'%") or token.startswith('"%'):
-                if token[0] == "'":
-                    in_squote = True
-                else:
-                    in_dquote = True
                 tokens.append(token[:2])
                 token = token[2:]
-            elif token.startswith("'") or token.startswith('"'):
-                if token[0] == "'":
-                    in_squote = True
-                else:
-                    in_dquote = True
+            else:
                 tokens.append(token[0])
                 token = token[1:]
 
         # Handle mid-token aliases
-        if not (in_squote or in_dquote):
+        if quote is None:
             parts = token.split(".")
             if len(parts) == 2:
                 table = parts[0]
@@ -443,25 +557,24 @@ def tokenize_sql(query):
                 token = field
 
         # Handle aliases without field name.
-        if not (in_squote or in_dquote):
-            match = re.search(r"(?P<table>[A-Z_]+)(?P<alias>alias\d+)", token)
+        if quote is None and "alias" in token:
+            match = _ALIAS_PATTERN.search(token)
             if match:
                 tokens.append(match.group("table"))
                 tokens.append(match.group("alias"))
                 continue
 
         # Handle suffixes
-        if (in_squote and token.endswith("%'")) or (in_dquote and token.endswith('%"')):
+        if quote is not None and token.endswith("%" + quote):
             tokens.append(token[:-2])
             tokens.append(token[-2:])
-        elif (in_squote and token.endswith("'")) or (in_dquote and token.endswith('"')):
+        elif quote is not None and token.endswith(quote):
             tokens.append(token[:-1])
             tokens.append(token[-1])
-        elif (not (in_squote or in_dquote)) and len(token) > 1 and token.endswith("("):
+        elif quote is None and len(token) > 1 and token.endswith("("):
             tokens.append(token[:-1])
             tokens.append(token[-1])
         else:
             tokens.append(token)
-        in_squote, in_dquote = update_quotes(token, in_squote, in_dquote)
 
     return " ".join(tokens)
@@ -0,0 +1,37 @@
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Callable, Deque, Iterable, Iterator, List, Optional
+
+from more_itertools import chunked
+
+from src.sql_preprocessing.sql_cleaning import clean_sql_query
+
+Cleaner = Callable[[str], Optional[str]]
+
+
+def _clean_chunk(cleaner: Cleaner, queries: List[str]) -> List[Optional[str]]:
+    return [cleaner(query) for query in queries]
+
+
+def clean_batch(
+    queries: Iterable[str], workers: int = 1, chunksize: int = 1000, cleaner: Cleaner = clean_sql_query
+) -> Iterator[Optional[str]]:
+    """
+    Yields the cleaned version of every query, in order, e.g. clean_sql_query or preprocess_for_jsql (`cleaner` must
+    be a module level function, so it can be sent to the worker processes). With several workers, chunks of
+    `chunksize` queries are cleaned in a process pool, with at most 2 chunks per worker submitted ahead, so the
+    queries can be streamed from a file without reading it into memory.
+    """
+    if workers <= 1:
+        for query in queries:
+            yield cleaner(query)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending: Deque[Future] = deque()
+        for chunk in chunked(queries, chunksize):
+            pending.append(executor.submit(_clean_chunk, cleaner, chunk))
+            if len(pending) >= 2 * workers:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
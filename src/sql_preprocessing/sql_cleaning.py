@@ -1,8 +1,28 @@
-import re
 from typing import Union
 
 import ftfy
 
+from src.sql_preprocessing.sql_patterns import (
+    ALIAS_PATTERN,
+    BACKTICK_PATTERN,
+    BLOCK_COMMENT_PATTERN,
+    COMMENT_AT_BEGINNING_PATTERN,
+    COMMENT_AT_END_PATTERN,
+    DECLARE_BEFORE_SELECT_PATTERN,
+    DECLARE_LINE_PATTERN,
+    DECLARE_STATEMENT_PATTERN,
+    FROM_KEYWORD_PATTERN,
+    MODIFYING_KEYWORD_PATTERN,
+    NEW_LINES_PATTERN,
+    NON_ASCII_PATTERN,
+    NON_EMPTY_LINE_COMMENT_PATTERN,
+    QUOTED_MODIFYING_KEYWORD_PATTERN,
+    SELECT_KEYWORD_PATTERN,
+    SET_TIME_ZONE_PATTERN,
+    SPACES_PATTERN,
+    VOLT_WHERE_PATTERN,
+    substitute,
+)
 
 MAX_LENGTH = 510
 
@@ -12,34 +32,29 @@ def _preprocess(text: str) -> str:
     # normalize non UTF-8 characters to their matching UTF-8 ones
     text = ftfy.fix_text(text)
 
-    text = re.sub(r"`", "", text)
+    text = BACKTICK_PATTERN.sub("", text)
 
     # remove non ASCII characters
-    text = re.sub(r"[^\x00-\x7f]", r"", text)
+    text = NON_ASCII_PATTERN.sub("", text)
 
-    text = re.sub(r"[\n\t\r]+", " ", text)
+    text = NEW_LINES_PATTERN.sub(" ", text)
 
     # replace all alias like "as [User Id]" to "as user_id"
-    alias_pattern = re.compile(r"\[([^\]]+)]", re.MULTILINE)
-    match = re.search(alias_pattern, text)
+    match = ALIAS_PATTERN.search(text)
     while match is not None:
         group_one = match.group(1)
         new_alias = group_one.lower().replace(" ", "_")
         text = text.replace(match.group(0), new_alias)
-        match = re.search(alias_pattern, text)
+        match = ALIAS_PATTERN.search(text)
 
     # remove redundant whitespaces
-    text = re.sub(r" +", " ", text)
+    text = SPACES_PATTERN.sub(" ", text)
 
     return text.strip()
 
 
 def _clean_volt_where_clause(cleaned_query: str) -> str:
-    volt_where_pattern = re.compile(
-        r"(where|and) \(select volt_tt_[a-z0-9]+\.fl[i|o]p as fl[i|o]p " r"from volt_tt_[a-z0-9]+\) = 1( and)?",
-        re.MULTILINE | re.IGNORECASE,
-    )
-    match = re.search(volt_where_pattern, cleaned_query)
+    match = VOLT_WHERE_PATTERN.search(cleaned_query)
     while match is not None:
         group_where = match.group(1).lower()
         if group_where == "and":  # case of AND
@@ -49,20 +64,27 @@ def _clean_volt_where_clause(cleaned_query: str) -> str:
                 cleaned_query = cleaned_query.replace(match.group(0), "WHERE")
             else:  # case of WHERE without AND
                 cleaned_query = cleaned_query.replace(match.group(0), "")
-        match = re.search(volt_where_pattern, cleaned_query)
-    return re.sub(r" +", " ", cleaned_query).strip()
+        match = VOLT_WHERE_PATTERN.search(cleaned_query)
+    return SPACES_PATTERN.sub(" ", cleaned_query).strip()
 
 
 def _remove_comment_at_beginning(cleaned_query: str) -> str:
-    return re.sub(r"^([- ]+|(result))+", "", cleaned_query, re.MULTILINE)
+    return COMMENT_AT_BEGINNING_PATTERN.sub("", cleaned_query)
 
 
 # pylint: disable=too-many-return-statements,too-many-branches
-def clean_sql_query(query: str, max_length: int = MAX_LENGTH) -> Union[str, None]:
+def clean_sql_query(query: str, max_length: int = MAX_LENGTH, legacy_flags: bool = True) -> Union[str, None]:
+    """
+    :param query: str
+    :param max_length: int, queries with more tokens are dropped
+    :param legacy_flags: bool, keep the replacements of the patterns whose flags used to be passed as the count of
+    re.sub (see sql_patterns.substitute)
+    :return: Union[str, None]
+    """
     if not query:
         return None
 
-    cleaned_query = re.sub(r"(SET TIME ZONE|set time zone) '([^;]+)';", "", query, flags=re.IGNORECASE)
+    cleaned_query = SET_TIME_ZONE_PATTERN.sub("", query)
 
     if "LTRIM( REPLACE( REPLACE( REPLACE( REPLACE( REPLACE( REPLACE( REPLACE( REPLACE(" in query:
         return None
@@ -72,10 +94,10 @@ def clean_sql_query(query: str, max_length: int = MAX_LENGTH) -> Union[str, None
 
     lower_text = cleaned_query.lower()
 
-    if re.search(r"\b(select)\b", lower_text) is None:
+    if SELECT_KEYWORD_PATTERN.search(lower_text) is None:
         return None
 
-    if re.search(r"\b(from)\b", lower_text) is None:
+    if FROM_KEYWORD_PATTERN.search(lower_text) is None:
         return None
 
     # if the query starts with a temp table
@@ -89,8 +111,8 @@ def clean_sql_query(query: str, max_length: int = MAX_LENGTH) -> Union[str, None
 
     lower_text = cleaned_query.lower()
 
-    if re.search(r"\b(insert|update|delete|create|set)\b", lower_text) is not None:
-        if re.search(r"[`'\"](insert|update|delete|create|set)[`'\"]", lower_text) is None:
+    if MODIFYING_KEYWORD_PATTERN.search(lower_text) is not None:
+        if QUOTED_MODIFYING_KEYWORD_PATTERN.search(lower_text) is None:
             return None
 
     if "admin.flip_flop_switch" in lower_text or lower_text.startswith("padb_fetch_sample:"):
@@ -100,10 +122,10 @@ def clean_sql_query(query: str, max_length: int = MAX_LENGTH) -> Union[str, None
     cleaned_query = _remove_comment_at_beginning(cleaned_query)
 
     # remove comments at the end of lines
-    cleaned_query = re.sub(r"--(.+)\n", "", cleaned_query)
+    cleaned_query = NON_EMPTY_LINE_COMMENT_PATTERN.sub("", cleaned_query)
 
     # remove declares with a new line
-    cleaned_query = re.sub(r"(DECLARE|declare) [^\n]+\n", " ", cleaned_query, re.IGNORECASE | re.MULTILINE | re.DOTALL)
+    cleaned_query = substitute(DECLARE_LINE_PATTERN, " ", cleaned_query, legacy_flags)
 
     cleaned_query = _preprocess(cleaned_query)
 
@@ -111,16 +133,16 @@ def clean_sql_query(query: str, max_length: int = MAX_LENGTH) -> Union[str, None
         return None
 
     # remove declares
-    cleaned_query = re.sub(r"(DECLARE|declare) [^;]+;", " ", cleaned_query, re.IGNORECASE | re.MULTILINE | re.DOTALL)
-    cleaned_query = re.sub(r"(DECLARE|declare) (?:.(?!(SELECT|select)))", "SELECT", cleaned_query)
+    cleaned_query = substitute(DECLARE_STATEMENT_PATTERN, " ", cleaned_query, legacy_flags)
+    cleaned_query = DECLARE_BEFORE_SELECT_PATTERN.sub("SELECT", cleaned_query)
 
     # remove comments at the end of the query
-    cleaned_query = re.sub(r"--(.?)+$", "", cleaned_query, re.MULTILINE)
+    cleaned_query = substitute(COMMENT_AT_END_PATTERN, "", cleaned_query, legacy_flags)
 
     # remove comments like /* a comment */
-    cleaned_query = re.sub(r"/\*[^*/]+\*/", "", cleaned_query, re.MULTILINE)
+    cleaned_query = substitute(BLOCK_COMMENT_PATTERN, "", cleaned_query, legacy_flags)
 
-    cleaned_query = re.sub(r" +", " ", cleaned_query).strip()
+    cleaned_query = SPACES_PATTERN.sub(" ", cleaned_query).strip()
 
     # remove long sequences
     tokens = cleaned_query.split()
@@ -0,0 +1,74 @@
+import re
+from typing import Dict, Tuple
+
+# the patterns of preprocess_for_jsql (src/preprocessing/sql_utils.py) and clean_sql_query (sql_cleaning.py),
+# compiled once when the module is imported
+
+ALIAS_PATTERN = re.compile(r"\[([^\]]+)]", re.MULTILINE | re.IGNORECASE)
+TAGS_PATTERN = re.compile(r"([^'%])(##[a-z0-9_?:]+##)([^'%]?)", re.MULTILINE | re.IGNORECASE)
+TOP_TAGS_PATTERN = re.compile(
+    r"(top|percentile_cont)([ ]+)?[\(]?[ ]?(##[a-z0-9_]+(:[a-z]+)?(\?([0-9.]+))?##)[ ]?[\)]?", re.IGNORECASE
+)
+
+# only at the beginning of the query: at the beginning of every line (re.MULTILINE, which used to be passed as the
+# count) it would remove the dashes of the comment lines, but not the comments
+COMMENT_AT_BEGINNING_PATTERN = re.compile(r"^([- ]+|(result))+")
+LINE_COMMENT_PATTERN = re.compile(r"--(.+)?\n")
+NON_EMPTY_LINE_COMMENT_PATTERN = re.compile(r"--(.+)\n")
+COMMENT_AT_END_PATTERN = re.compile(r"--(.?)+$", re.MULTILINE)
+BLOCK_COMMENT_PATTERN = re.compile(r"/\*[^*/]+\*/", re.MULTILINE)
+SEMICOLON_LINE_PATTERN = re.compile(r"\n;\n")
+
+DECLARE_LINE_PATTERN = re.compile(r"(DECLARE|declare) [^\n]+\n", re.IGNORECASE | re.MULTILINE | re.DOTALL)
+DECLARE_STATEMENT_PATTERN = re.compile(r"(DECLARE|declare) [^;]+;", re.IGNORECASE | re.MULTILINE | re.DOTALL)
+DECLARE_BEFORE_SELECT_PATTERN = re.compile(r"(DECLARE|declare) (?:.(?!(SELECT|select)))")
+SET_TIME_ZONE_PATTERN = re.compile(r"(SET TIME ZONE|set time zone) '([^;]+)';", re.IGNORECASE)
+VOLT_WHERE_PATTERN = re.compile(
+    r"(where|and) \(select volt_tt_[a-z0-9]+\.fl[i|o]p as fl[i|o]p " r"from volt_tt_[a-z0-9]+\) = 1( and)?",
+    re.MULTILINE | re.IGNORECASE,
+)
+
+FORMAT_FUNCTION_PATTERN = re.compile(r" format\(", re.IGNORECASE)
+UNICODE_STRING_PATTERN = re.compile(r" N'", re.IGNORECASE)
+NEW_LINES_PATTERN = re.compile(r"[\n\t\r]+")
+NON_ASCII_PATTERN = re.compile(r"[^\x00-\x7f]")
+BACKTICK_PATTERN = re.compile(r"`")
+DOUBLE_BACKTICK_PATTERN = re.compile(r"``")
+DOUBLE_QUOTE_PATTERN = re.compile(r"\"")
+SPACES_PATTERN = re.compile(r" +")
+
+SELECT_KEYWORD_PATTERN = re.compile(r"\b(select)\b")
+FROM_KEYWORD_PATTERN = re.compile(r"\b(from)\b")
+MODIFYING_KEYWORD_PATTERN = re.compile(r"\b(insert|update|delete|create|set)\b")
+QUOTED_MODIFYING_KEYWORD_PATTERN = re.compile(r"[`'\"](insert|update|delete|create|set)[`'\"]")
+
+# name -> pattern, e.g. for benchmark_sql_patterns
+PATTERNS: Dict[str, re.Pattern] = {
+    name[: -len("_PATTERN")].lower(): pattern for name, pattern in globals().items() if name.endswith("_PATTERN")
+}
+
+# The re.sub calls of these patterns used to pass the flags positionally, as the count: they were compiled without
+# the flags, and replaced at most as many matches as the flags' value (e.g. 2 for re.IGNORECASE, 26 for
+# re.IGNORECASE | re.MULTILINE | re.DOTALL). With legacy_flags, substitute keeps that behavior, so the cleaned
+# queries are the ones the datasets and models were built with.
+_LEGACY_SUBSTITUTIONS: Dict[re.Pattern, Tuple[re.Pattern, int]] = {
+    pattern: (re.compile(pattern.pattern), pattern.flags & ~re.UNICODE)
+    for pattern in (
+        COMMENT_AT_END_PATTERN,
+        BLOCK_COMMENT_PATTERN,
+        DECLARE_LINE_PATTERN,
+        DECLARE_STATEMENT_PATTERN,
+        UNICODE_STRING_PATTERN,
+    )
+}
+
+
+def substitute(pattern: re.Pattern, replacement: str, text: str, legacy_flags: bool = True) -> str:
+    """
+    pattern.sub(replacement, text), or for the patterns whose flags used to be passed as the count, the substitution
+    they used to make if `legacy_flags` is set.
+    """
+    if legacy_flags and pattern in _LEGACY_SUBSTITUTIONS:
+        legacy_pattern, count = _LEGACY_SUBSTITUTIONS[pattern]
+        return legacy_pattern.sub(replacement, text, count)
+    return pattern.sub(replacement, text)
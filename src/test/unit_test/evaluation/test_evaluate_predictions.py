@@ -0,0 +1,38 @@
+import importlib.util
+import unittest
+
+from src.evaluation.sede_gold import load_sede_gold_index
+from src.metrics.partial_match_eval.batch_scorer import SCORED
+
+SEDE_VAL = "data/sede/val.jsonl"
+
+
+@unittest.skipUnless(importlib.util.find_spec("allennlp"), "evaluate_predictions needs allennlp")
+class TestEvaluatePredictions(unittest.TestCase):
+    def test_unparsable_gold_is_skipped(self):
+        # pylint: disable=import-outside-toplevel
+        from src.evaluation.evaluate_predictions import Shard, _evaluate_shard
+
+        gold_index = load_sede_gold_index([SEDE_VAL])
+        # the gold SQL of 3055 and 7753 is cleaned but cannot be parsed
+        query_ids = ["1308", "3055", "7753", "1233"]
+        gold_lines = [gold_index[int(query_id)] for query_id in query_ids]
+        shard = Shard(["select tagname from tags"] * 4, gold_lines, None, query_ids)
+        jsql_options = {"backend": "python"}
+
+        shard_metrics = _evaluate_shard(shard, jsql_options, jsql_instrumentation=False, skip_unparsable_gold=True)
+        self.assertEqual(shard_metrics.unparsable_gold_count, 2)
+        self.assertEqual(shard_metrics.shard.query_ids, ["1308", "1233"])
+        self.assertEqual(shard_metrics.shard.gold_lines, [gold_lines[0], gold_lines[3]])
+        self.assertEqual(shard_metrics.batch_scores.status.tolist(), [SCORED, SCORED])
+        self.assertEqual(len(shard_metrics.parsable), 2)
+
+        # without skipping, the rows are kept and left out of the partial match scores only
+        shard_metrics = _evaluate_shard(shard, jsql_options, jsql_instrumentation=False)
+        self.assertEqual(shard_metrics.unparsable_gold_count, 0)
+        self.assertEqual(shard_metrics.shard, shard)
+        self.assertEqual(shard_metrics.batch_scores.counted.tolist(), [True, False, False, True])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,30 @@
+import csv
+import os
+import tempfile
+import unittest
+
+from src.evaluation.query_report import QUERY_REPORT_COLUMNS, QueryReportWriter
+
+
+class TestQueryReport(unittest.TestCase):
+    def test_write_csv(self):
+        columns = {name: [None, None] for name in QUERY_REPORT_COLUMNS}
+        columns.update({"row": [0, 1], "gold_sql": ["select 1", "select a, b"], "pcm_f1": [0.5, float("nan")]})
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "report.csv")
+            with QueryReportWriter(path) as report_writer:
+                report_writer.write(columns)
+                report_writer.write({name: values[:1] for name, values in columns.items()})
+            with open(path, "r", newline="") as in_fp:
+                rows = list(csv.DictReader(in_fp))
+
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(list(rows[0]), list(QUERY_REPORT_COLUMNS))
+        self.assertEqual(rows[1]["gold_sql"], "select a, b")
+        self.assertEqual(rows[0]["pcm_f1"], "0.5")
+        # NaN scores are written as empty cells
+        self.assertEqual(rows[1]["pcm_f1"], "")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,70 @@
+import json
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+
+from src.evaluation.sede_gold import load_sede_gold_index, read_sede_rows
+
+SEDE_VAL = "data/sede/val.jsonl"
+
+
+class TestSedeGold(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.gold_path = os.path.join(self.temp_dir.name, "test.jsonl")
+        self.cache_path = os.path.join(self.temp_dir.name, "gold_cache.json")
+        with open(self.gold_path, "w") as out_fp:
+            out_fp.write(json.dumps({"QuerySetId": 1, "QueryBody": "SELECT TOP ##N:int?10## Id FROM Posts"}) + "\n")
+            out_fp.write(json.dumps({"QuerySetId": 2, "QueryBody": "UPDATE Posts SET Score = 1"}) + "\n")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_load_sede_gold_index(self):
+        gold_index = load_sede_gold_index([self.gold_path], self.cache_path)
+        self.assertEqual(set(gold_index), {1, 2})
+        self.assertTrue(gold_index[1].startswith("select top"))
+
+        # the cleaned gold is read from the cache while the SEDE file does not change
+        with open(self.cache_path, "r") as in_fp:
+            cached = json.load(in_fp)
+        cached["gold"]["1"] = "select 1"
+        with open(self.cache_path, "w") as out_fp:
+            json.dump(cached, out_fp)
+        self.assertEqual(load_sede_gold_index([self.gold_path], self.cache_path)[1], "select 1")
+
+        with open(self.gold_path, "a") as out_fp:
+            out_fp.write(json.dumps({"QuerySetId": 3, "QueryBody": "SELECT Id FROM Users"}) + "\n")
+        gold_index = load_sede_gold_index([self.gold_path], self.cache_path)
+        self.assertEqual(gold_index[3], "select id from users")
+        self.assertTrue(gold_index[1].startswith("select top"))
+
+    def test_read_sede_rows(self):
+        gold_index = load_sede_gold_index([SEDE_VAL])
+        # 1 is not in the val set
+        predictions_path = os.path.join(self.temp_dir.name, "val_predictions.sql")
+        with open(predictions_path, "w") as out_fp:
+            out_fp.write("3055\tselect id from posts\n")
+            out_fp.write("7753\tSELECT  Id FROM Users\n")
+            out_fp.write("\n")
+            out_fp.write("select id from posts\n")
+            out_fp.write("id\tselect id from posts\n")
+            out_fp.write("1\tselect id from posts\n")
+            out_fp.write("26416\t\n")
+
+        output = StringIO()
+        with redirect_stdout(output):
+            rows = list(read_sede_rows(predictions_path, gold_index))
+        self.assertEqual([row[3] for row in rows], ["3055", "7753", "26416"])
+        self.assertEqual(rows[1][:3], ("select id from users", gold_index[7753], None))
+        self.assertEqual(rows[2][0], "a")
+        self.assertIn("Skipped malformed line 4 of", output.getvalue())
+        self.assertIn("Skipped malformed line 5 of", output.getvalue())
+        self.assertIn("Skipped 2 malformed lines", output.getvalue())
+        self.assertIn("Skipped 1 predictions without a gold SQL", output.getvalue())
+
+
+if __name__ == "__main__":
+    unittest.main()
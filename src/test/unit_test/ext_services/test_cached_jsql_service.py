@@ -0,0 +1,124 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+from typing import Dict, Optional
+
+from src.ext_services.abstract_jsql_service import AbstractJSQLService
+from src.ext_services.cached_jsql_service import CachedJSQLService
+from src.ext_services.python_jsql_service import PythonJSQLService
+from src.ext_services.rest_jsql_service import RestJSQLService
+
+
+class _CountingService(AbstractJSQLService):
+    def __init__(self):
+        self.calls = 0
+
+    def call_jsql(self, sql: str) -> Optional[Dict]:
+        self.calls += 1
+        if sql == "invalid":
+            return None
+        return {"selectBody": {"fromItem": {"name": sql}}}
+
+
+class TestCachedJSQLService(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.cache_path = os.path.join(self.temp_dir.name, "jsql_cache.sqlite")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_cache_persists_between_instances(self):
+        inner_service = _CountingService()
+        service = CachedJSQLService(inner_service, self.cache_path)
+        self.assertEqual(service.call_jsql("posts"), {"selectBody": {"fromItem": {"name": "posts"}}})
+        self.assertIsNone(service.call_jsql("invalid"))
+        service.close()
+
+        service = CachedJSQLService(inner_service, self.cache_path)
+        self.assertEqual(service.call_jsql("posts"), {"selectBody": {"fromItem": {"name": "posts"}}})
+        self.assertIsNone(service.call_jsql("invalid"))
+        self.assertEqual(inner_service.calls, 2)
+        self.assertEqual(service.get_cache_stats()["hits"], 2)
+        service.close()
+
+    def test_parser_version_is_part_of_the_key(self):
+        inner_service = _CountingService()
+        CachedJSQLService(inner_service, self.cache_path, parser_version="1").call_jsql("posts")
+        CachedJSQLService(inner_service, self.cache_path, parser_version="2").call_jsql("posts")
+        self.assertEqual(inner_service.calls, 2)
+
+    def test_backends_do_not_share_entries(self):
+        service = CachedJSQLService(PythonJSQLService(), self.cache_path)
+        self.assertIsNotNone(service.call_jsql("select id from posts"))
+        service.close()
+
+        # nothing listens on the port, so only a cache hit could return the output of the Python parser
+        service = CachedJSQLService(RestJSQLService("http://localhost:1/sqltojson", timeout=0.5), self.cache_path)
+        with self.assertRaises(Exception):
+            service.call_jsql("select id from posts")
+        self.assertEqual(service.get_cache_stats()["hits"], 0)
+        self.assertEqual(service.get_cache_stats()["misses"], 1)
+        service.close()
+
+    def test_eviction(self):
+        service = CachedJSQLService(_CountingService(), self.cache_path, max_entries=10)
+        for index in range(25):
+            service.call_jsql(f"table_{index}")
+        stats = service.get_cache_stats()
+        self.assertLessEqual(stats["entries"], 10)
+        self.assertEqual(stats["misses"], 25)
+        self.assertEqual(stats["evictions"], 25 - stats["entries"])
+        service.close()
+
+    def test_call_jsql_batch_only_sends_misses(self):
+        inner_service = _CountingService()
+        service = CachedJSQLService(inner_service, self.cache_path)
+        service.call_jsql("posts")
+        outputs = service.call_jsql_batch(["posts", "users", "invalid"])
+        self.assertEqual(outputs[1], {"selectBody": {"fromItem": {"name": "users"}}})
+        self.assertIsNone(outputs[2])
+        self.assertEqual(inner_service.calls, 3)
+        service.close()
+
+    def _last_access(self, sql: str, service: CachedJSQLService) -> float:
+        with sqlite3.connect(self.cache_path) as connection:
+            return connection.execute(
+                "SELECT last_access FROM jsql_cache WHERE key = ?", (service._key(sql),)
+            ).fetchone()[0]
+
+    def test_hits_are_written_in_batches(self):
+        service = CachedJSQLService(_CountingService(), self.cache_path, access_flush_size=3)
+        service.call_jsql("posts")
+        stored_access = self._last_access("posts", service)
+        service.call_jsql("posts")
+        service.call_jsql("posts")
+        self.assertEqual(self._last_access("posts", service), stored_access)
+        # written with the next insert
+        service.call_jsql("users")
+        written_access = self._last_access("posts", service)
+        self.assertGreater(written_access, stored_access)
+        # or once 3 hits are pending
+        service.call_jsql("posts")
+        service.call_jsql("posts")
+        self.assertEqual(self._last_access("posts", service), written_access)
+        service.call_jsql("users")
+        self.assertGreater(self._last_access("posts", service), written_access)
+        # or on close
+        service.call_jsql("users")
+        service.close()
+        self.assertGreater(self._last_access("users", service), self._last_access("posts", service))
+
+    def test_eviction_keeps_recent_hits(self):
+        service = CachedJSQLService(_CountingService(), self.cache_path, max_entries=10)
+        service.call_jsql("posts")
+        for index in range(9):
+            service.call_jsql(f"table_{index}")
+        # the hit makes posts the most recently used entry, it is written with the next insert, before eviction
+        service.call_jsql("posts")
+        service.call_jsql("users")
+        inner_calls = service._jsql_service.calls
+        service.call_jsql("posts")
+        self.assertEqual(service._jsql_service.calls, inner_calls)
+        service.close()
@@ -0,0 +1,68 @@
+import pickle
+import unittest
+
+from src.ext_services.jsql_instrumentation import JSQLInstrumentation, FAILURE_TIMEOUT, RESERVOIR_SIZE
+
+
+class TestJSQLInstrumentation(unittest.TestCase):
+    def test_get_stats(self):
+        instrumentation = JSQLInstrumentation()
+        for latency in range(1, 101):
+            instrumentation.record_latency("jsql_http", latency / 1000)
+        instrumentation.record_payload_size("jsql_request", 10)
+        instrumentation.record_payload_size("jsql_request", 30)
+        instrumentation.record_failure(FAILURE_TIMEOUT)
+
+        stats = instrumentation.get_stats(reset=True)
+        self.assertEqual(stats["jsql_http_count"], 100)
+        self.assertAlmostEqual(stats["jsql_http_p50_ms"], 50.5)
+        self.assertAlmostEqual(stats["jsql_http_p99_ms"], 99.01)
+        self.assertEqual(stats["jsql_request_mean_bytes"], 20)
+        self.assertEqual(stats["jsql_request_total_bytes"], 40)
+        self.assertEqual(stats["jsql_failures_timeout"], 1)
+        self.assertEqual(instrumentation.get_stats(), {})
+
+    def test_disabled_records_nothing(self):
+        instrumentation = JSQLInstrumentation(enabled=False)
+        with instrumentation.timer("jsql_reader"):
+            pass
+        instrumentation.record_failure(FAILURE_TIMEOUT)
+        self.assertEqual(instrumentation.get_stats(), {})
+
+    def test_merge_pickled(self):
+        instrumentation = JSQLInstrumentation()
+        instrumentation.record_latency("jsql_call", 0.001)
+        instrumentation.record_failure(FAILURE_TIMEOUT)
+        other = pickle.loads(pickle.dumps(instrumentation))
+        other.record_latency("jsql_call", 0.003)
+
+        instrumentation.merge(other)
+        stats = instrumentation.get_stats()
+        self.assertEqual(stats["jsql_call_count"], 3)
+        self.assertAlmostEqual(stats["jsql_call_total_s"], 0.005)
+        self.assertEqual(stats["jsql_failures_timeout"], 2)
+
+    def test_latencies_are_sampled(self):
+        instrumentation = JSQLInstrumentation()
+        for latency in range(1, 100001):
+            instrumentation.record_latency("jsql_http", latency / 100000)
+        other = JSQLInstrumentation()
+        for _ in range(100000):
+            other.record_latency("jsql_http", 2.0)
+        instrumentation.merge(pickle.loads(pickle.dumps(other)))
+
+        sample = instrumentation._latencies["jsql_http"].sample
+        self.assertEqual(len(sample), RESERVOIR_SIZE)
+        # half of the merged sample comes from each instance, and the first half is spread over its latencies
+        first_sample = sorted(latency for latency in sample if latency < 2.0)
+        self.assertEqual(len(first_sample), RESERVOIR_SIZE // 2)
+        self.assertAlmostEqual(first_sample[len(first_sample) // 2], 0.5, delta=0.05)
+
+        stats = instrumentation.get_stats()
+        self.assertEqual(stats["jsql_http_count"], 200000)
+        self.assertAlmostEqual(stats["jsql_http_total_s"], 50000.5 + 200000, places=3)
+        self.assertEqual(stats["jsql_http_p95_ms"], 2000)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,108 @@
+import asyncio
+import time
+import unittest
+from typing import Dict, Optional
+
+from src.ext_services.abstract_jsql_service import AbstractJSQLService
+from src.ext_services.jsql_instrumentation import JSQLInstrumentation
+from src.ext_services.jsql_parser import JSQLParser
+
+
+class _SlowTableService(AbstractJSQLService):
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.calls = 0
+
+    def call_jsql(self, sql: str) -> Optional[Dict]:
+        self.calls += 1
+        time.sleep(self.delay)
+        if sql == "invalid":
+            return None
+        return {"selectBody": {"fromItem": {"name": sql}}}
+
+
+class TestJSQLParser(unittest.TestCase):
+    def test_translate_batch_concurrent_keeps_order(self):
+        sql_list = [f"table_{index}" for index in range(20)] + ["invalid"]
+        sequential = JSQLParser(_SlowTableService()).translate_batch(sql_list, clean=False)
+        concurrent = JSQLParser(_SlowTableService(delay=0.01), max_workers=8).translate_batch(sql_list, clean=False)
+        self.assertEqual(sequential, concurrent)
+        self.assertEqual(concurrent[3]["select_body_0"][0]["from_items"], ["table_3"])
+        self.assertIsNone(concurrent[-1])
+
+    def test_translate_batch_async_matches_translate_batch(self):
+        sql_list = [f"table_{index}" for index in range(20)] + ["invalid"]
+        parser = JSQLParser(_SlowTableService(delay=0.01))
+        translated = asyncio.run(parser.translate_batch_async(sql_list, clean=False, max_in_flight=8))
+        self.assertEqual(translated, parser.translate_batch(sql_list, clean=False))
+
+    def test_translate_batch_deduplicates_and_caches(self):
+        service = _SlowTableService()
+        parser = JSQLParser(service, lru_cache_size=2)
+        translated = parser.translate_batch(["posts", "users", "posts", "posts"], clean=False)
+        self.assertEqual(service.calls, 2)
+        self.assertIs(translated[0], translated[2])
+
+        parser.translate_batch(["posts", "users"], clean=False)
+        self.assertEqual(service.calls, 2)
+
+        parser.translate("votes", clean=False)
+        self.assertEqual(service.calls, 3)
+        stats = parser.get_cache_stats()
+        self.assertEqual(stats["deduplicated"], 2)
+        self.assertEqual(stats["hits"], 2)
+        self.assertEqual(stats["evictions"], 1)
+        self.assertEqual(stats["size"], 2)
+
+    def test_disabled_cache_has_no_stats(self):
+        service = _SlowTableService()
+        parser = JSQLParser(service)
+        parser.translate_batch(["posts", "posts"], clean=False)
+        parser.translate("posts", clean=False)
+        self.assertEqual(service.calls, 2)
+        self.assertEqual(parser.get_cache_stats(), {"capacity": 0, "deduplicated": 1})
+
+    def test_cache_key_contains_translate_options(self):
+        service = _SlowTableService()
+        parser = JSQLParser(service, lru_cache_size=10)
+        parser.translate("posts", clean=False)
+        parser.translate("posts", clean=False, anonymize_values=True)
+        self.assertEqual(service.calls, 2)
+
+    def test_translate_multi_matches_translate_batch(self):
+        service = _SlowTableService()
+        parser = JSQLParser(service, lru_cache_size=10)
+        sql_list = ["posts", "users", "posts", "invalid"]
+        translations = parser.translate_multi(sql_list, clean=False, parse_on_clause=(False, True))
+        self.assertEqual(service.calls, 3)
+        self.assertEqual(set(translations), {(False, False), (False, True), (True, False), (True, True)})
+        for (anonymize_values, parse_on_clause), translated in translations.items():
+            self.assertEqual(
+                translated,
+                JSQLParser(_SlowTableService()).translate_batch(
+                    sql_list, clean=False, anonymize_values=anonymize_values, parse_on_clause=parse_on_clause
+                ),
+            )
+
+        # every variant was cached by the single parse
+        parser.translate_batch(["posts", "users"], clean=False, anonymize_values=True, parse_on_clause=False)
+        self.assertEqual(service.calls, 3)
+
+    def test_compact_items(self):
+        parser = JSQLParser(_SlowTableService(), compact_items=True)
+        translations = parser.translate_multi(["posts"], clean=False)
+        self.assertEqual(translations[(False, True)][0]["select_body_0"][0]["from_items"], ("posts",))
+        # the variants share the items they have in common
+        self.assertIs(
+            translations[(False, True)][0]["select_body_0"][0]["from_items"],
+            translations[(True, True)][0]["select_body_0"][0]["from_items"],
+        )
+
+    def test_instrumentation(self):
+        parser = JSQLParser(_SlowTableService(), instrumentation=JSQLInstrumentation())
+        parser.translate_batch(["select id from posts", "select " + "(" * 20 + "1" + ")" * 20])
+        stats = parser.get_instrumentation_stats()
+        self.assertEqual(stats["jsql_batch_call_count"], 1)
+        self.assertEqual(stats["jsql_reader_count"], 1)
+        self.assertEqual(stats["jsql_failures_preprocess_none"], 1)
+        self.assertEqual(JSQLParser(_SlowTableService()).get_instrumentation_stats(), {})
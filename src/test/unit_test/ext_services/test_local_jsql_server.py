@@ -0,0 +1,45 @@
+import os
+import tempfile
+import unittest
+from typing import Dict, Optional
+
+from src.ext_services.abstract_jsql_service import AbstractJSQLService, JSQLServiceError
+from src.ext_services.local_jsql_server import LocalJSQLServer
+from src.ext_services.replay_jsql_service import ReplayJSQLService
+from src.ext_services.rest_jsql_service import RestJSQLService
+
+
+class _TableService(AbstractJSQLService):
+    def call_jsql(self, sql: str) -> Optional[Dict]:
+        if sql == "invalid":
+            return None
+        return {"selectBody": {"fromItem": {"name": sql}}}
+
+
+class TestLocalJSQLServer(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.fixtures_path = os.path.join(self.temp_dir.name, "jsql_responses.json")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_record_and_replay(self):
+        recorder = ReplayJSQLService(self.fixtures_path, recorded_service=_TableService())
+        self.assertEqual(recorder.call_jsql("posts"), {"selectBody": {"fromItem": {"name": "posts"}}})
+        self.assertIsNone(recorder.call_jsql("invalid"))
+
+        replay = ReplayJSQLService(self.fixtures_path)
+        self.assertEqual(replay.call_jsql("posts"), {"selectBody": {"fromItem": {"name": "posts"}}})
+        self.assertIsNone(replay.call_jsql("invalid"))
+        with self.assertRaises(JSQLServiceError):
+            replay.call_jsql("users")
+
+    def test_rest_service_against_local_server(self):
+        with LocalJSQLServer(_TableService()) as server:
+            service = RestJSQLService(entry_point=server.entry_point)
+            self.assertEqual(service.call_jsql("posts"), {"selectBody": {"fromItem": {"name": "posts"}}})
+            self.assertIsNone(service.call_jsql("invalid"))
+            outputs = service.call_jsql_batch(["posts", "invalid"])
+            self.assertEqual(outputs, [{"selectBody": {"fromItem": {"name": "posts"}}}, None])
+            service.close()
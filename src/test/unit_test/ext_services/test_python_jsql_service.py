@@ -0,0 +1,68 @@
+import json
+import os
+import unittest
+
+from src.ext_services.jsql_parser import JSQLParser
+from src.ext_services.python_jsql_service import PythonJSQLService
+from src.ext_services.replay_jsql_service import ReplayJSQLService
+from src.metrics.partial_match_eval.jsql_reader import JSQLReader
+from src.test.unit_test.jsql_test_utils import FIXTURES_PATH
+
+
+class TestPythonJSQLService(unittest.TestCase):
+    def setUp(self):
+        self.service = PythonJSQLService()
+        self.parser = JSQLParser.create(backend="python")
+
+    def test_invalid_sql_returns_none(self):
+        self.assertIsNone(self.service.call_jsql("select from where"))
+        self.assertIsNone(self.service.call_jsql("update posts set score = 1"))
+        self.assertIsNone(self.parser.translate("select id from posts where"))
+
+    def test_truncated_sql_returns_none(self):
+        for sql in ["select p.", "select p.q.", "select p.*, q.", "select id from posts p where p."]:
+            with self.subTest(sql=sql):
+                self.assertIsNone(self.service.call_jsql(sql))
+
+    def test_translate_clauses(self):
+        translated = self.parser.translate(
+            """
+            select top 10 p.id, count(*) as answers from posts p
+            inner join posts a on a.parentid = p.id
+            where p.score > 10 and p.tags like '%sql%'
+            group by p.id having count(*) > 1 order by answers desc
+        """,
+            parse_on_clause=False,
+        )
+        body = translated["select_body_0"][0]
+        self.assertEqual(body["top_items"], ["10"])
+        self.assertEqual(body["from_items"], ["posts", "posts", ["posts", "posts"]])
+        self.assertEqual(body["select_items"][:4], ["id", "count", "*", ["count", "*"]])
+        self.assertEqual(body["groupby_items"], ["id"])
+        self.assertIn([["score"], ["10"], ">"], body["where_items"])
+        self.assertIn("LIKE", body["where_items"])
+        self.assertEqual(body["order_items"][:2], ["answers", "desc"])
+
+    def test_get_all_tables(self):
+        parsed_sql = self.service.call_jsql("select * from posts p join users u on p.owneruserid = u.id")
+        self.assertEqual(JSQLReader.get_all_tables(parsed_sql), {"p": "posts", "u": "users"})
+
+    def test_union_and_with(self):
+        translated = self.parser.translate(
+            "with q as (select id from posts) select id from q union all select id from users", clean=False
+        )
+        self.assertEqual(len(translated), 3)
+
+    @unittest.skipUnless(os.path.exists(FIXTURES_PATH), "no recorded JSQL service responses")
+    def test_parity_with_recorded_responses(self):
+        with open(FIXTURES_PATH, "r") as in_fp:
+            sql_list = list(json.load(in_fp).keys())
+
+        recorded_parser = JSQLParser(ReplayJSQLService(FIXTURES_PATH))
+        for sql in sql_list:
+            with self.subTest(sql=sql):
+                self.assertEqual(self.parser.translate(sql, clean=False), recorded_parser.translate(sql, clean=False))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,196 @@
+import asyncio
+import json
+import socket
+import threading
+import time
+import unittest
+from unittest import mock
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from src.ext_services.abstract_jsql_service import JSQLServiceError, JSQLCircuitOpenError
+from src.ext_services.jsql_instrumentation import JSQLInstrumentation
+from src.ext_services.rest_jsql_service import RestJSQLService
+
+
+def _echo(sql: str) -> dict:
+    if sql == "invalid":
+        return {"timestamp": "2021-04-01T00:00:00.000+00:00", "status": 500}
+    return {"selectBody": {"sql": sql}}
+
+
+class _EchoHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    supports_batch = True
+
+    def do_POST(self):  # pylint: disable=invalid-name
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        if self.path.endswith("/batch"):
+            if not self.supports_batch:
+                self.send_response(404)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            results = [{"error": "empty"} if not sql else {"output": _echo(sql)} for sql in body["sqls"]]
+            payload = json.dumps({"results": results}).encode("utf-8")
+        else:
+            payload = json.dumps(_echo(body["sql"])).encode("utf-8")
+        # "status 503" is answered with that status
+        status = int(body["sql"].split()[1]) if body.get("sql", "").startswith("status ") else 200
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestRestJSQLService(unittest.TestCase):
+    def setUp(self):
+        _EchoHandler.supports_batch = True
+        self.server = ThreadingHTTPServer(("localhost", 0), _EchoHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.service = RestJSQLService(entry_point=f"http://localhost:{self.server.server_port}/sqltojson")
+
+    def tearDown(self):
+        self.service.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_call_jsql(self):
+        output = self.service.call_jsql("select 1")
+        self.assertEqual(output, {"selectBody": {"sql": "select 1"}})
+
+    def test_connection_is_reused(self):
+        for _ in range(5):
+            self.service.call_jsql("select 1")
+        stats = self.service.get_connection_stats()
+        self.assertEqual(stats["requests"], 5)
+        self.assertEqual(stats["new_connections"], 1)
+        self.assertEqual(stats["reused_connections"], 4)
+
+    def test_call_jsql_batch_async(self):
+        outputs = asyncio.run(self.service.call_jsql_batch_async(["select 1", "select 2"]))
+        self.assertEqual(outputs, [{"selectBody": {"sql": "select 1"}}, {"selectBody": {"sql": "select 2"}}])
+
+    def test_call_jsql_batch(self):
+        outputs = self.service.call_jsql_batch(["select 1", "invalid", ""])
+        self.assertEqual(outputs[0], {"selectBody": {"sql": "select 1"}})
+        self.assertIsNone(outputs[1])
+        self.assertIsInstance(outputs[2], JSQLServiceError)
+        self.assertEqual(self.service.get_connection_stats()["requests"], 1)
+
+    def test_call_jsql_batch_falls_back_to_single_calls(self):
+        _EchoHandler.supports_batch = False
+        outputs = self.service.call_jsql_batch(["select 1", "invalid", "select 2"])
+        self.assertEqual(outputs, [{"selectBody": {"sql": "select 1"}}, None, {"selectBody": {"sql": "select 2"}}])
+        self.service.call_jsql_batch(["select 3"])
+        # the batch endpoint is tried only once
+        self.assertEqual(self.service.get_connection_stats()["requests"], 5)
+
+    def test_check_health(self):
+        self.assertTrue(self.service.check_health())
+
+    def test_instrumentation(self):
+        service = RestJSQLService(
+            entry_point=f"http://localhost:{self.server.server_port}/sqltojson", instrumentation=JSQLInstrumentation()
+        )
+        service.call_jsql("select 1")
+        service.call_jsql("invalid")
+        stats = service._instrumentation.get_stats()  # pylint: disable=protected-access
+        self.assertEqual(stats["jsql_http_count"], 2)
+        self.assertEqual(stats["jsql_request_total_bytes"], len('{"sql": "select 1"}') + len('{"sql": "invalid"}'))
+        self.assertEqual(stats["jsql_failures_error_payload"], 1)
+        service.close()
+
+
+def _unused_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("localhost", 0))
+        return sock.getsockname()[1]
+
+
+class TestRestJSQLServiceCircuitBreaker(unittest.TestCase):
+    def test_circuit_opens_after_consecutive_failures(self):
+        service = RestJSQLService(
+            entry_point=f"http://localhost:{_unused_port()}/sqltojson", failure_threshold=2, reset_timeout=60
+        )
+        # a failed health check counts as a failure too
+        self.assertFalse(service.check_health())
+        with self.assertRaises(Exception):
+            service.call_jsql("select 1")
+        with self.assertRaises(JSQLCircuitOpenError):
+            service.call_jsql("select 1")
+        outputs = service.call_jsql_batch(["select 1", "select 2"])
+        self.assertTrue(all(isinstance(output, JSQLCircuitOpenError) for output in outputs))
+        # the whole batch is a single short-circuited call
+        self.assertEqual(service.get_short_circuited_count(), 2)
+        service.close()
+
+    def test_circuit_closes_after_successful_probe(self):
+        port = _unused_port()
+        service = RestJSQLService(
+            entry_point=f"http://localhost:{port}/sqltojson", failure_threshold=1, reset_timeout=0.1
+        )
+        with self.assertRaises(Exception):
+            service.call_jsql("select 1")
+        with self.assertRaises(JSQLCircuitOpenError):
+            service.call_jsql("select 1")
+
+        server = ThreadingHTTPServer(("localhost", port), _EchoHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        time.sleep(0.1)
+        self.assertEqual(service.call_jsql("select 1"), {"selectBody": {"sql": "select 1"}})
+        self.assertEqual(service.call_jsql("select 2"), {"selectBody": {"sql": "select 2"}})
+        service.close()
+        server.shutdown()
+        server.server_close()
+
+    def _start_server(self) -> str:
+        server = ThreadingHTTPServer(("localhost", 0), _EchoHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        return f"http://localhost:{server.server_port}/sqltojson"
+
+    def test_only_unavailable_service_opens_circuit(self):
+        service = RestJSQLService(entry_point=self._start_server(), failure_threshold=2, reset_timeout=60)
+        # the error of a query, not of the service
+        for _ in range(3):
+            with self.assertRaises(JSQLServiceError):
+                service.call_jsql("status 500")
+        self.assertEqual(service.call_jsql("select 1"), {"selectBody": {"sql": "select 1"}})
+        for _ in range(2):
+            with self.assertRaises(JSQLServiceError):
+                service.call_jsql("status 503")
+        with self.assertRaises(JSQLCircuitOpenError):
+            service.call_jsql("select 1")
+        service.close()
+
+    def test_any_exception_of_probe_reopens_circuit(self):
+        service = RestJSQLService(entry_point=self._start_server(), failure_threshold=1, reset_timeout=0.1)
+        with self.assertRaises(JSQLServiceError):
+            service.call_jsql("status 503")
+        time.sleep(0.1)
+        with mock.patch.object(service._session, "post", side_effect=requests.exceptions.ChunkedEncodingError()):
+            with self.assertRaises(requests.exceptions.ChunkedEncodingError):
+                service.call_jsql("select 1")
+        # the probe failed, so the circuit is open again instead of half-open with the probe slot taken
+        with self.assertRaises(JSQLCircuitOpenError):
+            service.call_jsql("select 1")
+        time.sleep(0.1)
+        self.assertEqual(service.call_jsql("select 1"), {"selectBody": {"sql": "select 1"}})
+        service.close()
+
+    def test_any_request_exception_fails_health_check(self):
+        service = RestJSQLService(entry_point=self._start_server())
+        for exception in (requests.exceptions.ChunkedEncodingError(), requests.exceptions.InvalidURL()):
+            with self.subTest(exception=type(exception).__name__):
+                with mock.patch.object(service._session, "post", side_effect=exception):
+                    self.assertFalse(service.check_health())
+        self.assertTrue(service.check_health())
+        service.close()
+        self.assertFalse(RestJSQLService(entry_point="http://[invalid/sqltojson").check_health())
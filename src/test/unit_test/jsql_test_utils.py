@@ -0,0 +1,32 @@
+import os
+
+from src.ext_services.jsql_parser import JSQLParser
+from src.ext_services.replay_jsql_service import ReplayJSQLService
+from src.ext_services.rest_jsql_service import RestJSQLService
+
+FIXTURES_PATH = os.path.join(os.path.dirname(os.path.realpath(__file__)), "fixtures", "jsql_responses.json")
+
+
+def create_test_jsql_parser() -> JSQLParser:
+    """
+    The JSQL service used by the tests is selected with the JSQL_MODE environment variable:
+    - replay: only the responses recorded in FIXTURES_PATH are used, no JSQL service is needed
+    - record: like replay, but missing responses are taken from the JSQL service and added to FIXTURES_PATH
+    - live: the JSQL service running on port 8079 is used
+    - python: the in-process Python parser is used instead of the JSQL service
+    By default, the recorded responses are replayed if there are any, otherwise the Python parser is used, so the
+    tests do not need the JSQL service.
+    """
+    default_mode = "replay" if os.path.exists(FIXTURES_PATH) else "python"
+    mode = os.environ.get("JSQL_MODE", default_mode)
+
+    if mode == "replay":
+        return JSQLParser.create(ReplayJSQLService(FIXTURES_PATH))
+    if mode == "record":
+        os.makedirs(os.path.dirname(FIXTURES_PATH), exist_ok=True)
+        return JSQLParser.create(ReplayJSQLService(FIXTURES_PATH, recorded_service=RestJSQLService()))
+    if mode == "live":
+        return JSQLParser.create()
+    if mode == "python":
+        return JSQLParser.create(backend="python")
+    raise ValueError(f"JSQL_MODE {mode} is not supported")
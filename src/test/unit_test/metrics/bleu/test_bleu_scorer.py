@@ -0,0 +1,45 @@
+import unittest
+
+from sacrebleu import corpus_bleu
+
+from src.metrics.bleu.bleu_scorer import BleuScorer
+
+PREDICTED = [
+    "select * from posts",
+    "SELECT id FROM users WHERE reputation > 100",
+    "select count(*) from posts where score > 10 group by id",
+    "select a",
+    "select id, title from posts order by score desc",
+]
+GOLD = [
+    "select * from posts",
+    "select id from users where reputation > 1000",
+    "select count(*) from posts where score > 5",
+    "select top 10 * from users",
+    "select title, id from posts order by creationdate desc",
+]
+
+
+class TestBleuScorer(unittest.TestCase):
+    def test_incremental_matches_corpus_bleu(self):
+        for lowercase in (True, False):
+            scorer = BleuScorer(lowercase=lowercase, incremental=True)
+            for start in range(0, len(PREDICTED), 2):
+                scorer(PREDICTED[start : start + 2], GOLD[start : start + 2])
+                expected = corpus_bleu(PREDICTED[: start + 2], [GOLD[: start + 2]], lowercase=lowercase).score
+                self.assertEqual(scorer.get_metric()["BLEU"], round(expected, 4))
+
+    def test_incremental_matches_default_mode(self):
+        scorer = BleuScorer()
+        incremental_scorer = BleuScorer(incremental=True)
+        scorer(PREDICTED, GOLD)
+        incremental_scorer(PREDICTED, GOLD)
+        self.assertEqual(incremental_scorer.get_metric(), scorer.get_metric())
+
+    def test_reset(self):
+        scorer = BleuScorer(incremental=True)
+        scorer(PREDICTED, GOLD)
+        scorer.get_metric(reset=True)
+        scorer(PREDICTED[:1], GOLD[:1])
+        self.assertEqual(scorer.get_metric(reset=True)["BLEU"], 100.0)
+        self.assertEqual(scorer.get_metric()["BLEU"], 0.0)
@@ -0,0 +1,92 @@
+import math
+import unittest
+
+import numpy as np
+
+from src.ext_services.python_jsql_service import PythonJSQLService
+from src.metrics.partial_match_eval.batch_scorer import JSQL_ERROR, SCORED, BatchScores, ScoreAccumulator, score_batch
+from src.metrics.partial_match_eval.evaluate import evaluate
+from src.metrics.partial_match_eval.iterative_jsql_reader import IterativeJSQLReader
+
+QUERIES = [
+    "select * from posts",
+    "select top 10 p.id, count(*) as answers from posts p inner join posts a on a.parentid = p.id "
+    "where p.score > 10 and p.tags like '%sql%' group by p.id having count(*) > 1 order by answers desc",
+    "select id from users where id in (select owneruserid from posts where posttypeid in (1, 2))",
+    "select id, count(*) from posts where score > 10 group by id order by id",
+    "select id from posts union select id from users",
+]
+
+
+def _translate(sql: str) -> dict:
+    parsed_sql = PythonJSQLService().call_jsql(sql.replace("'", '"'))
+    return IterativeJSQLReader.parse_sql_to_parsed_body(parsed_sql, anonymize_values=False, parse_on_clause=False)
+
+
+class TestBatchScorer(unittest.TestCase):
+    def setUp(self):
+        translated = [_translate(sql) for sql in QUERIES]
+        self.gold = [gold for gold in translated for _ in range(len(translated) + 1)] + [None]
+        self.predicted = [predicted for _ in translated for predicted in translated + [None]] + [None]
+
+    def test_same_scores_as_evaluate(self):
+        for punish_invalid_sql in (False, True):
+            batch_scores = score_batch(self.gold, self.predicted, punish_invalid_sql=punish_invalid_sql)
+            f1_scores = evaluate(self.gold, self.predicted, punish_invalid_sql=punish_invalid_sql)
+            em_scores = evaluate(self.gold, self.predicted, punish_invalid_sql=punish_invalid_sql, exact_match=True)
+            for index, (f1_score, em_score) in enumerate(zip(f1_scores, em_scores)):
+                with self.subTest(punish_invalid_sql=punish_invalid_sql, index=index):
+                    if f1_score == "JSQLError":
+                        self.assertTrue(math.isnan(batch_scores.pcm_f1_scores()[index]))
+                        self.assertFalse(batch_scores.counted[index])
+                    else:
+                        self.assertEqual(batch_scores.pcm_f1_scores()[index], f1_score)
+                        self.assertEqual(float(batch_scores.pcm_em_flags()[index]), em_score)
+
+            f1_scores = [score for score in f1_scores if score != "JSQLError"]
+            em_scores = [score for score in em_scores if score != "JSQLError"]
+            self.assertAlmostEqual(batch_scores.pcm_f1(), sum(f1_scores) / len(f1_scores))
+            self.assertAlmostEqual(batch_scores.pcm_em(), sum(em_scores) / len(em_scores))
+
+    def test_clause_f1(self):
+        batch_scores = score_batch(self.gold[:5], self.predicted[:5])
+        self.assertEqual(batch_scores.f1.shape, (5, 7))
+        self.assertEqual(batch_scores.clause_f1()["from_items"], sum(batch_scores.f1[:5, 2]) / 5)
+        self.assertIsNone(score_batch([None], [None]).pcm_f1())
+
+    def test_gold_parse_failure(self):
+        predicted = _translate(QUERIES[0])
+        for punish_invalid_sql in (False, True):
+            batch_scores = score_batch([None, predicted], [predicted, predicted], punish_invalid_sql=punish_invalid_sql)
+            with self.subTest(punish_invalid_sql=punish_invalid_sql):
+                self.assertEqual(batch_scores.status.tolist(), [JSQL_ERROR, SCORED])
+                self.assertEqual(batch_scores.pcm_f1(), 1.0)
+
+    def test_concatenate(self):
+        batch_scores = score_batch(self.gold, self.predicted, punish_invalid_sql=True)
+        shards = [
+            score_batch(self.gold[start : start + 7], self.predicted[start : start + 7], punish_invalid_sql=True)
+            for start in range(0, len(self.gold), 7)
+        ]
+        concatenated = BatchScores.concatenate(shards)
+        np.testing.assert_array_equal(concatenated.f1, batch_scores.f1)
+        np.testing.assert_array_equal(concatenated.status, batch_scores.status)
+        self.assertEqual(concatenated.pcm_f1(), batch_scores.pcm_f1())
+        self.assertEqual(len(BatchScores.concatenate([])), 0)
+
+    def test_score_accumulator(self):
+        batch_scores = score_batch(self.gold, self.predicted, punish_invalid_sql=True)
+        accumulator = ScoreAccumulator()
+        self.assertIsNone(accumulator.pcm_f1())
+        for start in range(0, len(self.gold), 7):
+            accumulator.add(
+                score_batch(self.gold[start : start + 7], self.predicted[start : start + 7], punish_invalid_sql=True)
+            )
+        self.assertAlmostEqual(accumulator.pcm_f1(), batch_scores.pcm_f1())
+        self.assertAlmostEqual(accumulator.pcm_em(), batch_scores.pcm_em())
+        for clause, score in batch_scores.clause_f1().items():
+            self.assertAlmostEqual(accumulator.clause_f1()[clause], score)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,13 +1,13 @@
 import unittest
 
 from src.metrics.partial_match_eval.evaluate import evaluate
-from src.ext_services.jsql_parser import JSQLParser
+from src.test.unit_test.jsql_test_utils import create_test_jsql_parser
 
 
 class TestEvaluate(unittest.TestCase):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self.parser = JSQLParser.create()
+        self.parser = create_test_jsql_parser()
 
     def test_evaluate_simple(self):
         parsed_gold = self.parser.translate("select first_name, last_name from customers")
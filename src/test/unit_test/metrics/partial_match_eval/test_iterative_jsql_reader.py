@@ -0,0 +1,78 @@
+import unittest
+
+from src.ext_services.python_jsql_service import PythonJSQLService
+from src.metrics.partial_match_eval.iterative_jsql_reader import IterativeJSQLReader
+from src.metrics.partial_match_eval.jsql_reader import JSQLReader
+
+QUERIES = [
+    "select * from posts",
+    "select top 10 p.id, count(*) as answers from posts p inner join posts a on a.parentid = p.id "
+    "where p.score > 10 and p.tags like '%sql%' group by p.id having count(*) > 1 order by answers desc",
+    "with q as (select id from posts) select id from q union all select id from users",
+    "select id from users where id in (select owneruserid from posts where posttypeid in (1, 2)) and not reputation = 1",
+    "select case when score > 0 then 'up' else 'down' end, row_number() over (order by score desc) from posts",
+    "select avg(cast(score as float)), dateadd(day, -30, creationdate) from posts where score between 1 and 10",
+    "select u.id from users u left join (select owneruserid, sum(score) s from posts group by owneruserid) t "
+    "on t.owneruserid = u.id where exists (select 1 from badges b where b.userid = u.id) limit 10",
+]
+
+
+class TestIterativeJSQLReader(unittest.TestCase):
+    def test_same_items_as_jsql_reader(self):
+        service = PythonJSQLService()
+        for sql in QUERIES:
+            parsed_sql = service.call_jsql(sql.replace("'", '"'))
+            self.assertIsNotNone(parsed_sql)
+            for anonymize_values in (False, True):
+                for parse_on_clause in (False, True):
+                    with self.subTest(sql=sql, anonymize_values=anonymize_values, parse_on_clause=parse_on_clause):
+                        self.assertEqual(
+                            IterativeJSQLReader.parse_sql_to_parsed_body(parsed_sql, anonymize_values, parse_on_clause),
+                            JSQLReader.parse_sql_to_parsed_body(parsed_sql, anonymize_values, parse_on_clause),
+                        )
+
+    def test_all_variants_in_one_walk(self):
+        service = PythonJSQLService()
+        variants = [(False, False), (False, True), (True, False), (True, True)]
+        for sql in QUERIES:
+            parsed_sql = service.call_jsql(sql.replace("'", '"'))
+            with self.subTest(sql=sql):
+                self.assertEqual(
+                    IterativeJSQLReader.parse_sql_to_parsed_bodies(parsed_sql, variants),
+                    [JSQLReader.parse_sql_to_parsed_body(parsed_sql, *variant) for variant in variants],
+                )
+
+    def test_deep_nesting(self):
+        # deeper than the recursion limit allows for JSQLReader
+        where = {"columnName": "a"}
+        for _ in range(1500):
+            where = {"leftExpression": where, "rightExpression": {"columnName": "b"}, "stringExpression": "AND"}
+        parsed_sql = {"selectBody": {"selectItems": [{"allColumns": True}], "fromItem": {"name": "t"}, "where": where}}
+
+        parsed_dict = IterativeJSQLReader.parse_sql_to_parsed_body(
+            parsed_sql, anonymize_values=False, parse_on_clause=True
+        )
+        where_items = parsed_dict["select_body_0"][0]["where_items"]
+        self.assertEqual(where_items[:3], ["a", "b", "AND"])
+        self.assertEqual(len(where_items), 1500 * 3 + 1)
+
+        # the walk of several variants does not recurse either
+        parsed_dicts = IterativeJSQLReader.parse_sql_to_parsed_bodies(parsed_sql, [(False, True), (True, True)])
+        for parsed_dict, first_items in zip(parsed_dicts, (["a", "b", "AND"], ["a", "terminal", "AND"])):
+            where_items = parsed_dict["select_body_0"][0]["where_items"]
+            self.assertEqual(where_items[:3], first_items)
+            self.assertEqual(len(where_items), 1500 * 3 + 1)
+
+    def test_single_variant_walk(self):
+        service = PythonJSQLService()
+        for sql in QUERIES:
+            parsed_sql = service.call_jsql(sql.replace("'", '"'))
+            with self.subTest(sql=sql):
+                self.assertEqual(
+                    IterativeJSQLReader.parse_sql_to_parsed_bodies(parsed_sql, [(True, False)]),
+                    [JSQLReader.parse_sql_to_parsed_body(parsed_sql, True, False)],
+                )
+
+
+if __name__ == "__main__":
+    unittest.main()
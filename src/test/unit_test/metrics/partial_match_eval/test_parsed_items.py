@@ -0,0 +1,62 @@
+import unittest
+
+from src.ext_services.python_jsql_service import PythonJSQLService
+from src.metrics.partial_match_eval.evaluate import calculate_score
+from src.metrics.partial_match_eval.iterative_jsql_reader import IterativeJSQLReader
+from src.metrics.partial_match_eval.parsed_items import ItemInterner
+
+QUERIES = [
+    "select * from posts",
+    "select top 10 p.id, count(*) as answers from posts p inner join posts a on a.parentid = p.id "
+    "where p.score > 10 and p.tags like '%sql%' group by p.id having count(*) > 1 order by answers desc",
+    "select id from users where id in (select owneruserid from posts where posttypeid in (1, 2)) and not reputation = 1",
+    "select id, count(*) from posts where score > 10 and p.tags like '%python%' group by id order by id",
+    "select case when score > 0 then 'up' else 'down' end, row_number() over (order by score desc) from posts",
+]
+
+
+def _translate(sql: str) -> dict:
+    parsed_sql = PythonJSQLService().call_jsql(sql.replace("'", '"'))
+    return IterativeJSQLReader.parse_sql_to_parsed_body(parsed_sql, anonymize_values=False, parse_on_clause=False)
+
+
+class TestParsedItems(unittest.TestCase):
+    def test_intern_parsed_body(self):
+        interner = ItemInterner()
+        parsed_dict = interner.intern_parsed_body(_translate("select count(id), name from users where id > 1"))
+        body_dict = parsed_dict["select_body_0"][0]
+        self.assertEqual(body_dict["from_items"], ("users",))
+        self.assertEqual(body_dict["select_items"][:3], ("id", "count", ("count", "id")))
+        self.assertEqual(body_dict["top_items"], ())
+        hash(body_dict["where_items"])
+
+        # equal items of different queries are the same object
+        other_dict = interner.intern_parsed_body(_translate("select name from users where id > 1"))
+        self.assertIs(other_dict["select_body_0"][0]["where_items"], body_dict["where_items"])
+        self.assertIs(other_dict["select_body_0"][0]["from_items"], body_dict["from_items"])
+
+    def test_same_scores_as_lists(self):
+        interner = ItemInterner()
+        translated = [_translate(sql) for sql in QUERIES]
+        compact = [interner.intern_parsed_body(parsed_dict) for parsed_dict in translated]
+        for gold_index, gold in enumerate(translated):
+            for predicted_index, predicted in enumerate(translated):
+                for exact_match in (False, True):
+                    with self.subTest(gold=gold_index, predicted=predicted_index, exact_match=exact_match):
+                        self.assertEqual(
+                            calculate_score(compact[gold_index], compact[predicted_index], exact_match=exact_match),
+                            calculate_score(gold, predicted, exact_match=exact_match),
+                        )
+
+    def test_deep_nesting(self):
+        items = ["a"]
+        for _ in range(1500):
+            items = items + ["b", "AND", [items, ["b"], "AND"]]
+        compact = ItemInterner().intern_item(items)
+        self.assertEqual(len(compact), 1500 * 3 + 1)
+        self.assertEqual(compact[:3], ("a", "b", "AND"))
+        self.assertEqual(compact[3][1], ("b",))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,7 +1,8 @@
+import random
 import unittest
 
 
-from src.metrics.partial_match_eval.utils import get_item_index_in_list
+from src.metrics.partial_match_eval.utils import get_item_index_in_list, count_matches
 
 
 class TestUtils(unittest.TestCase):
@@ -23,3 +24,38 @@ class TestUtils(unittest.TestCase):
             ["TagName", "MIN", ["MIN", "TagName"], "Owner", "COUNT", "*", ["COUNT", "*"]],
         )
         self.assertEqual(index, 1)
+
+    def test_count_matches(self):
+        gold_items = ["id", "count", ["count", "id"], "id"]
+        predicted_items = ["id", "id", "id", ["count", "id"]]
+        self.assertEqual(count_matches(gold_items, predicted_items), (3, 3))
+        self.assertEqual(count_matches(["a", "b"], [["a", "b"], ["b"]]), (2, 0))
+        self.assertEqual(count_matches([], ["a"]), (0, 0))
+
+    def test_count_matches_large_lists(self):
+        # long clauses are matched with indexes instead of the scans, with the same counts
+        def count_by_deleting(items, search_items):
+            items = list(items)
+            matched = 0
+            for search_item in search_items:
+                index = get_item_index_in_list(items, search_item)
+                if index > -1:
+                    del items[index]
+                    matched += 1
+            return matched
+
+        def create_item(rnd, depth):
+            if depth == 0 or rnd.random() < 0.6:
+                return rnd.choice("abcdef")
+            return [create_item(rnd, depth - 1) for _ in range(rnd.randint(1, 3))]
+
+        rnd = random.Random(0)
+        for case in range(200):
+            depth = 0 if case % 4 == 0 else 3
+            gold_items = [create_item(rnd, depth) for _ in range(rnd.randint(10, 40))]
+            predicted_items = [create_item(rnd, depth) for _ in range(rnd.randint(10, 40))]
+            with self.subTest(case=case):
+                self.assertEqual(
+                    count_matches(gold_items, predicted_items),
+                    (count_by_deleting(gold_items, predicted_items), count_by_deleting(predicted_items, gold_items)),
+                )
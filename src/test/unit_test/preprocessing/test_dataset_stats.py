@@ -0,0 +1,93 @@
+import json
+import os
+import tempfile
+import unittest
+from collections import Counter
+
+import srsly
+
+from src.preprocessing import sql_utils
+from src.preprocessing.dataset_stats import DatasetStats, calculate_dataset_stats, read_samples
+
+SEDE_VAL = "data/sede/val.jsonl"
+
+
+class TestDatasetStats(unittest.TestCase):
+    def test_nesting_depth_and_breadth(self):
+        for sql, expected in [
+            ("SELECT a FROM t", (1, 1)),
+            ("select a from t", (0, 0)),
+            ("SELECT a FROM t UNION SELECT b FROM s", (2, 1)),
+            (
+                "SELECT a FROM t WHERE b IN (SELECT b FROM s) AND c IN (SELECT c FROM u WHERE d = (SELECT 1))",
+                (3, 2),
+            ),
+            ("update t set a = 1", (0, 0)),
+        ]:
+            with self.subTest(sql=sql):
+                self.assertEqual(sql_utils.nesting_depth_and_breadth(sql_utils.standardise_blank_spaces(sql)), expected)
+
+    def test_add(self):
+        stats = DatasetStats(token_bucket_size=5)
+        stats.add("SELECT a FROM t")
+        stats.add("SELECT a FROM t WHERE b IN (SELECT b FROM s) AND c IN (SELECT c FROM u)")
+        stats.add("SELECT a FROM t WHERE b = 1))")
+        report = stats.get_report()
+        self.assertEqual(report["queries"], 3)
+        self.assertEqual(report["nesting"]["failures"], 1)
+        self.assertEqual(report["nesting"]["depth"], {1: 1, 2: 1})
+        self.assertEqual(report["nesting"]["breadth"], {1: 1, 2: 1})
+        self.assertEqual(report["nesting"]["mean_depth"], 1.5)
+        self.assertEqual(report["tokens"]["max"], 22)
+        self.assertEqual(report["tokens"]["mean"], 12)
+        self.assertEqual(report["tokens"]["histogram"], {0: 1, 10: 1, 20: 1})
+        self.assertNotIn("parse_failures", report)
+
+    def test_parse_failures_and_clauses(self):
+        stats = DatasetStats(jsql_backend="python")
+        stats.add("select top 10 a, count(*) from t where b > 1 group by a order by 2 desc")
+        stats.add("select a from t union select b from s where c = 1")
+        stats.add("select from where")
+        # a query that fails to clean is not a parsing failure
+        stats.add("/* only a comment */")
+        report = stats.get_report()
+        self.assertEqual(report["cleaning_failures"], 1)
+        self.assertEqual(report["parse_failures"], 1)
+        self.assertEqual(report["parse_failure_rate"], 1 / 3)
+        self.assertEqual(report["clauses"]["where_items"], 2)
+        self.assertEqual(report["clauses"]["groupby_items"], 1)
+        self.assertEqual(report["clauses"]["having_items"], 0)
+        self.assertEqual(report["clause_rates"]["top_items"], 0.5)
+
+    def test_merge(self):
+        queries = [sql_utils.get_sample_sql(sample) for sample in srsly.read_jsonl(SEDE_VAL)][:300]
+        stats = DatasetStats()
+        for sql in queries:
+            stats.add(sql)
+        merged = DatasetStats()
+        for start in range(0, len(queries), 70):
+            chunk_stats = DatasetStats()
+            for sql in queries[start : start + 70]:
+                chunk_stats.add(sql)
+            merged.merge(chunk_stats)
+        self.assertEqual(merged.get_report(), stats.get_report())
+
+    def test_calculate_dataset_stats(self):
+        report = calculate_dataset_stats([SEDE_VAL], chunk_size=200, jsql_backend=None)
+        self.assertEqual(report["files"][SEDE_VAL], report["total"])
+        self.assertEqual(calculate_dataset_stats([SEDE_VAL], workers=2, chunk_size=200, jsql_backend=None), report)
+
+        # the mean depth of calculate_nesting_level
+        nesting_levels = Counter()
+        sql_utils.calculate_nesting_level(srsly.read_jsonl(SEDE_VAL), nesting_levels)
+        mean = sum(level * count for level, count in nesting_levels.items()) / sum(nesting_levels.values())
+        self.assertAlmostEqual(report["total"]["nesting"]["mean_depth"], mean)
+
+    def test_read_spider_samples(self):
+        samples = [{"db_id": "farm", "query": "SELECT count(*) FROM farm"}, {"db_id": "farm", "query": "SELECT 1"}]
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, "dev.json")
+            with open(path, "w") as out_fp:
+                json.dump(samples, out_fp)
+            self.assertEqual(list(read_samples(path)), samples)
+            self.assertEqual(calculate_dataset_stats([path], jsql_backend=None)["total"]["queries"], 2)
@@ -0,0 +1,44 @@
+import unittest
+
+from src.preprocessing.sql_lexer import OPERATOR, STRING, TEXT, SqlToken, lex_sql, lex_strings, split_with_strings
+
+
+class TestSqlLexer(unittest.TestCase):
+    def test_lex_sql(self):
+        query = "select count(*) from t where a != 'x y' and b = \"it's\""
+        tokens = lex_sql(query)
+        self.assertEqual("".join(query[token.start : token.end] for token in tokens), query)
+        self.assertEqual(
+            [(token.kind, query[token.start : token.end]) for token in tokens if token.kind != TEXT],
+            [
+                (OPERATOR, "("),
+                (OPERATOR, "*"),
+                (OPERATOR, ")"),
+                (OPERATOR, "!="),
+                (STRING, "'x y'"),
+                (OPERATOR, "="),
+                (STRING, '"it\'s"'),
+            ],
+        )
+        self.assertEqual(tokens[-1], SqlToken(STRING, 48, 54, '"', True))
+
+    def test_unclosed_string(self):
+        self.assertEqual(
+            lex_sql("a = 'b c"),
+            [SqlToken(TEXT, 0, 2), SqlToken(OPERATOR, 2, 3), SqlToken(TEXT, 3, 4), SqlToken(STRING, 4, 8, "'", False)],
+        )
+        self.assertEqual(lex_strings("'"), [SqlToken(STRING, 0, 1, "'", False)])
+
+    def test_lex_strings(self):
+        query = "select 'a' , \"b\" from t where c like '%d''e%'"
+        self.assertEqual(lex_strings(query), [token for token in lex_sql(query) if token.kind == STRING])
+
+    def test_split_with_strings(self):
+        query = "where name = 'ab c' and x = 1"
+        parts = list(split_with_strings(query))
+        self.assertEqual([part for _, part, _ in parts], query.split())
+        strings = {part: string for _, part, string in parts}
+        self.assertEqual(strings["'ab"], SqlToken(STRING, 13, 19, "'", True))
+        self.assertEqual(strings["c'"], SqlToken(STRING, 13, 19, "'", True))
+        self.assertIsNone(strings["and"])
+        self.assertIsNone(strings["x"])
@@ -4,6 +4,7 @@ from collections import Counter
 import srsly
 import unittest
 
+from src.benchmarks.benchmark_preprocess_for_jsql import rewrite_tags_by_searching
 from src.preprocessing import sql_utils
 
 
@@ -78,3 +79,38 @@ class TestSqlUtils(unittest.TestCase):
             "WHERE LEN(Location) > 1 and RankNo <= '##MaximumRankNo##' ORDER BY location"
         )
         self.assertEqual(cleaned, expected)
+
+    def test_rewrite_tags_is_unchanged(self):
+        sql_list = [
+            "select [User Id], [user id] as [User Id] from users where [User Id]'x' = [A b][User Id]",
+            "select '[Post Link]' [a] from posts where tags like '%##tag:string?java##%' and id = ##id##",
+            "select top ##topn:int?200## id, percentile_cont(##p?0.5##) from posts",
+            "select top ( ##topn## ) id from posts where id > ##topn##",
+            "select top ##n:int?5## x top ##n:int?5##) y from t",
+            "select [[nested] alias] from t where [x] = '[y]'",
+            "##a##",
+        ]
+        sql_list += [line["QueryBody"] for line in srsly.read_jsonl("data/sede/val_original.jsonl")]
+        sql_list += [line["QueryBody"] for line in srsly.read_jsonl("data/sede/test_original.jsonl")]
+        for sql in sql_list:
+            with self.subTest(sql=sql):
+                self.assertEqual(sql_utils._rewrite_tags(sql), rewrite_tags_by_searching(sql))
+
+    def test_standardise_blank_spaces(self):
+        self.assertEqual(
+            sql_utils.standardise_blank_spaces(
+                "select count (*) from posts where title like '  %sql %' and body != \"x\""
+            ),
+            'select COUNT( * ) from posts where title like "%sql%" and body != "x"',
+        )
+        self.assertEqual(
+            sql_utils.standardise_blank_spaces("SELECT max(score), YEAR(CURDATE()) FROM posts WHERE tags = ' <sql> '"),
+            'SELECT MAX( score ) , YEAR(CURDATE()) FROM posts WHERE tags = "<sql>"',
+        )
+
+    def test_tokenize_sql_after_string(self):
+        # the quote of a string does not stay open after it
+        self.assertEqual(
+            sql_utils.tokenize_sql("SELECT T1.name FROM t AS T1 WHERE T1.name LIKE '%ab c%' AND T1.id = 1"),
+            "SELECT T1 . name FROM t AS T1 WHERE T1 . name LIKE '% ab c %' AND T1 . id = 1",
+        )
@@ -0,0 +1,26 @@
+import unittest
+
+import srsly
+
+from src.preprocessing.sql_utils import preprocess_for_jsql
+from src.sql_preprocessing.batch_cleaning import clean_batch
+from src.sql_preprocessing.sql_cleaning import clean_sql_query
+
+
+class TestBatchCleaning(unittest.TestCase):
+    def setUp(self):
+        self.queries = [line["QueryBody"] for line in srsly.read_jsonl("data/sede/val_original.jsonl")][:200]
+        self.queries += ["insert into a_table values (1, 2, 3)", "select *", ""]
+
+    def test_clean_batch(self):
+        expected = [clean_sql_query(query) for query in self.queries]
+        self.assertEqual(list(clean_batch(self.queries)), expected)
+        self.assertEqual(list(clean_batch(iter(self.queries), workers=2, chunksize=7)), expected)
+
+    def test_clean_batch_for_jsql(self):
+        expected = [preprocess_for_jsql(query) for query in self.queries]
+        cleaned = clean_batch((query for query in self.queries), workers=2, chunksize=50, cleaner=preprocess_for_jsql)
+        self.assertEqual(list(cleaned), expected)
+
+    def test_empty(self):
+        self.assertEqual(list(clean_batch([], workers=2)), [])
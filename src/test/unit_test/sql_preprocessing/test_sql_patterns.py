@@ -0,0 +1,49 @@
+import unittest
+
+from src.preprocessing.sql_utils import preprocess_for_jsql
+from src.sql_preprocessing.sql_cleaning import clean_sql_query
+from src.sql_preprocessing.sql_patterns import (
+    BLOCK_COMMENT_PATTERN,
+    DECLARE_STATEMENT_PATTERN,
+    PATTERNS,
+    UNICODE_STRING_PATTERN,
+    substitute,
+)
+
+
+class TestSqlPatterns(unittest.TestCase):
+    def test_registry(self):
+        self.assertIs(PATTERNS["unicode_string"], UNICODE_STRING_PATTERN)
+        self.assertIs(PATTERNS["block_comment"], BLOCK_COMMENT_PATTERN)
+
+    def test_substitute_with_legacy_flags(self):
+        # re.IGNORECASE used to be the count
+        sql = "select a from t where a = N'a' or a = N'b' or a = N'c' or a = n'd'"
+        self.assertEqual(
+            substitute(UNICODE_STRING_PATTERN, " '", sql),
+            "select a from t where a = 'a' or a = 'b' or a = N'c' or a = n'd'",
+        )
+        self.assertEqual(
+            substitute(UNICODE_STRING_PATTERN, " '", sql, legacy_flags=False),
+            "select a from t where a = 'a' or a = 'b' or a = 'c' or a = 'd'",
+        )
+
+        sql = "/* a */ " * 10 + "select 1"
+        self.assertEqual(substitute(BLOCK_COMMENT_PATTERN, "", sql), " " * 8 + "/* a */ /* a */ select 1")
+        self.assertEqual(substitute(BLOCK_COMMENT_PATTERN, "", sql, legacy_flags=False), " " * 10 + "select 1")
+
+        sql = "Declare @a int; declare @b int; select @a"
+        self.assertEqual(substitute(DECLARE_STATEMENT_PATTERN, " ", sql), "Declare @a int;   select @a")
+        self.assertEqual(substitute(DECLARE_STATEMENT_PATTERN, " ", sql, legacy_flags=False), "    select @a")
+
+    def test_cleaning_without_legacy_flags(self):
+        sql = "select id from users where name = N'a' or name = N'b' or name = N'c'"
+        self.assertEqual(preprocess_for_jsql(sql), "select id from users where name = 'a' or name = 'b' or name = N'c'")
+        self.assertEqual(
+            preprocess_for_jsql(sql, legacy_flags=False),
+            "select id from users where name = 'a' or name = 'b' or name = 'c'",
+        )
+
+        sql = " ".join(f"/* comment {index} */" for index in range(9)) + " select id from users"
+        self.assertEqual(clean_sql_query(sql), "/* comment 8 */ select id from users")
+        self.assertEqual(clean_sql_query(sql, legacy_flags=False), "select id from users")